@@ -7,7 +7,9 @@ from alembic import context
 
 # Import app settings and models
 from app.config.config import get_settings
+from app.config.logging import get_logger
 from app.internal.infrastructure.database.models import Base
+from app.internal.infrastructure.database.online_migration import set_timeouts
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -26,6 +28,8 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+logger = get_logger("migrations")
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -57,6 +61,16 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def report_progress(ctx, step, heads, run_args) -> None:
+    """Loga cada migration aplicada, com a revisao em que o banco ficou"""
+    logger.info(
+        "Migration %s: revision=%s, heads=%s",
+        "applied" if step.is_upgrade else "reverted",
+        step.up_revision_id,
+        ",".join(heads) or "base",
+    )
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
 
@@ -71,10 +85,21 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # DDL espera o lock por no maximo MIGRATION_LOCK_TIMEOUT_MS em vez de enfileirar o
+        # trafego atras dele; o make migrate-online refaz a migration que desistiu
+        set_timeouts(
+            connection,
+            settings.migration_lock_timeout_ms,
+            settings.migration_statement_timeout_ms,
+        )
+        connection.commit()
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            # uma transacao por migration: os locks de uma nao ficam presos ate o fim das outras
+            transaction_per_migration=True,
+            on_version_apply=report_progress,
         )
 
         with context.begin_transaction():
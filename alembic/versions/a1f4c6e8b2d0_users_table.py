@@ -0,0 +1,72 @@
+"""users table
+
+Cria a tabela users; no Postgres, com USERS_PARTITIONING=hash|range, ela ja nasce
+particionada por id (veja app/internal/infrastructure/database/partitioning.py). Bancos em
+que a users ja existia (criada fora das migrations) ficam como estao; pedir particionamento
+para uma users existente falha, porque converter a tabela e uma migracao de dados.
+
+Revision ID: a1f4c6e8b2d0
+Revises: b78c243a3254
+Create Date: 2026-10-18 03:58:21.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config.config import get_settings
+from app.internal.infrastructure.database import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f4c6e8b2d0'
+down_revision: Union[str, None] = 'b78c243a3254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    settings = get_settings()
+    partitioned = (
+        bind.dialect.name == 'postgresql' and settings.users_partitioning != partitioning.NONE
+    )
+    if sa.inspect(bind).has_table('users'):
+        if partitioned and not sa.inspect(bind).has_table('user_emails'):
+            raise RuntimeError(
+                f"USERS_PARTITIONING={settings.users_partitioning} needs a new users table, "
+                "but users already exists unpartitioned; convert it first or set "
+                "USERS_PARTITIONING=none"
+            )
+        return
+
+    if partitioned:
+        for statement in partitioning.partitioned_users_ddl(
+            settings.users_partitioning, settings.users_partitions, settings.users_partition_size
+        ):
+            op.execute(statement)
+        return
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=60), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql' and sa.inspect(bind).has_table('user_emails'):
+        for statement in partitioning.DROP_PARTITIONED_USERS:
+            op.execute(statement)
+        return
+
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,39 @@
+"""users search indexes
+
+Revision ID: c3a8d5e1f2b4
+Revises: 4e1f0c2a9d7b
+Create Date: 2026-10-18 14:05:12.731904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8d5e1f2b4'
+down_revision: Union[str, None] = '4e1f0c2a9d7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_users_name_lower ON users (lower(name) text_pattern_ops)')
+        op.execute('CREATE INDEX ix_users_name_trgm ON users USING gin (lower(name) gin_trgm_ops)')
+    else:
+        op.create_index('ix_users_name_lower', 'users', [sa.text('lower(name)')], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_users_name_trgm', table_name='users')
+    op.drop_index('ix_users_name_lower', table_name='users')
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_created_at', table_name='users')
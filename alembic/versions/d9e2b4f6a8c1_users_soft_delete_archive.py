@@ -0,0 +1,89 @@
+"""users soft delete and archive
+
+Revision ID: d9e2b4f6a8c1
+Revises: c3a8d5e1f2b4
+Create Date: 2026-10-18 16:42:08.519337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.internal.infrastructure.database import online_migration as online
+from app.internal.infrastructure.database import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e2b4f6a8c1'
+down_revision: Union[str, None] = 'c3a8d5e1f2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Cada create_index/drop_index online commita o que veio antes (autocommit_block). Se um
+# passo seguinte desiste por lock_timeout, o make migrate-online refaz a revision inteira,
+# entao todo passo ja commitado precisa ser idempotente.
+
+
+def upgrade() -> None:
+    # coluna nula sem default: no Postgres so altera o catalogo, sem reescrever a tabela
+    if not _has_column('users', 'deleted_at'):
+        op.add_column('users', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    # users e quente: CREATE INDEX CONCURRENTLY, fora da transacao da migration
+    online.create_index(op, 'ix_users_deleted_at', 'users', ['deleted_at'],
+                        where='deleted_at IS NOT NULL')
+    # email unico so entre os ativos: quem e removido libera o email na hora
+    if sa.inspect(op.get_bind()).has_table('user_emails'):
+        op.execute(partitioning.SOFT_DELETE_RELEASES_EMAIL)
+    else:
+        _replace_email_index(where='deleted_at IS NULL')
+
+    op.create_table(
+        'users_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(length=60), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_archive_email', 'users_archive', ['email'], unique=False)
+    op.create_index(
+        'ix_users_archive_archived_at', 'users_archive', ['archived_at'], unique=False
+    )
+
+
+def _replace_email_index(where=None) -> None:
+    """Troca ix_users_email; no Postgres o novo nasce CONCURRENTLY antes de o antigo sair"""
+    if op.get_bind().dialect.name == 'postgresql':
+        online.create_index(op, 'ix_users_email_next', 'users', ['email'], unique=True,
+                            where=where)
+        online.drop_index(op, 'ix_users_email', 'users')
+        # IF EXISTS: numa nova tentativa o rename pode ja ter entrado
+        op.execute('ALTER INDEX IF EXISTS ix_users_email_next RENAME TO ix_users_email')
+        return
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index('ix_users_email', 'users', ['email'], unique=True,
+                    sqlite_where=sa.text(where) if where else None)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('users_archive'):
+        op.drop_index('ix_users_archive_archived_at', table_name='users_archive')
+        op.drop_index('ix_users_archive_email', table_name='users_archive')
+        op.drop_table('users_archive')
+    # falha se um email removido ja foi reusado: arquive os removidos antes
+    if sa.inspect(op.get_bind()).has_table('user_emails'):
+        op.execute(partitioning.DROP_SOFT_DELETE_RELEASES_EMAIL)
+    else:
+        _replace_email_index()
+    online.drop_index(op, 'ix_users_deleted_at', 'users')
+    if _has_column('users', 'deleted_at'):
+        op.drop_column('users', 'deleted_at')
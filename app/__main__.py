@@ -0,0 +1,4 @@
+"""python -m app: production server (see app/server.py)"""
+from app.server import main
+
+main()
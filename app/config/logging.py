@@ -1,29 +1,200 @@
 """ configuration """
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import sys
-from typing import Optional
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional, Tuple
+
 from app.config.config import get_settings
 
 settings = get_settings()
 
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_root_handler: Optional[logging.Handler] = None
+_fork_hook_registered = False
+
+
+class TraceContextFilter(logging.Filter):
+    """Anexa trace_id/span_id do span atual; roda na thread que gerou o log"""
+
+    def __init__(self):
+        super().__init__()
+        # so instalado com tracing habilitado: sem ele o opentelemetry nem e importado
+        from opentelemetry import trace
+
+        self._current_span = trace.get_current_span
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span_context = self._current_span().get_span_context()
+        if span_context.is_valid:
+            record.trace_id = format(span_context.trace_id, "032x")
+            record.span_id = format(span_context.span_id, "016x")
+        else:
+            record.trace_id = None
+            record.span_id = None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Limita mensagens repetidas (mesmo logger e mesmo template) a `limit` por `interval`"""
+
+    def __init__(
+        self,
+        limit: int,
+        interval: float = 60.0,
+        level: int = logging.WARNING,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.level = level
+        self.clock = clock
+        # (logger, template) -> [inicio da janela, emitidas, suprimidas]
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+
+        key = (record.name, str(record.msg))
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com trace_id/span_id quando existe um span ativo"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "trace_id", None):
+            payload["trace_id"] = record.trace_id
+            payload["span_id"] = record.span_id
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta (e conta) registros quando a fila esta cheia, sem bloquear"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # resolve os args aqui, mas deixa o layout (texto ou JSON) para o handler de saida
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 def setup_logging() -> logging.Logger:
     """Configure and return the application logger"""
+    global _listener, _queue_handler, _root_handler, _fork_hook_registered
 
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
 
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        JsonFormatter() if settings.log_format == "json" else logging.Formatter(TEXT_FORMAT)
     )
 
+    # com log_async a escrita no stdout acontece numa thread propria; a request so enfileira
+    handler: logging.Handler = output
+    if settings.log_async:
+        _stop_listener()
+        handler = _queue_handler = DroppingQueueHandler(
+            queue.Queue(maxsize=settings.log_queue_size)
+        )
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+        if hasattr(os, "register_at_fork") and not _fork_hook_registered:
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+            _fork_hook_registered = True
+
+    if settings.tracing_enabled:
+        handler.addFilter(TraceContextFilter())
+    if settings.log_rate_limit_per_minute > 0:
+        handler.addFilter(RateLimitFilter(settings.log_rate_limit_per_minute))
+
+    # chamado de novo, troca o handler anterior (basicConfig nao faria nada com ele na raiz)
+    root = logging.getLogger()
+    if _root_handler is not None:
+        root.removeHandler(_root_handler)
+        _root_handler.close()
+    root.addHandler(handler)
+    root.setLevel(log_level)
+    _root_handler = handler
+
     logger = logging.getLogger("shape")
     logger.setLevel(log_level)
 
     return logger
 
 
+def _stop_listener() -> None:
+    """Esvazia a fila e encerra a thread de escrita (chamado tambem no atexit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork() -> None:
+    """O filho de um fork herda a fila mas nao a thread de escrita: recria as duas"""
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=settings.log_queue_size)
+    _listener = QueueListener(_queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """Get a logger instance"""
     if name:
@@ -0,0 +1,192 @@
+""" metrics configuration (prometheus text format) """
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.config.logging import get_logger
+
+logger = get_logger("metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# (nome, descricao, labels, valor)
+Gauge = Tuple[str, str, Dict[str, str], float]
+GaugeCollector = Callable[[], Iterable[Gauge]]
+
+
+class _Shard:
+    """Contadores de uma unica thread; so ela escreve, entao o registro nao precisa de lock"""
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.latency: Dict[Tuple[str, str], List[float]] = {}
+        self.in_flight = 0
+
+
+class MetricsRegistry:
+    """Metricas HTTP agregadas por rota, com um shard por thread"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        self._collectors: List[GaugeCollector] = []
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def request_started(self) -> None:
+        self._shard().in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float) -> None:
+        shard = self._shard()
+        shard.in_flight -= 1
+
+        key = (method, route, str(status))
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+
+        # [contagem por bucket..., +Inf, soma]
+        series = shard.latency.get((method, route))
+        if series is None:
+            series = shard.latency[(method, route)] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def add_collector(self, collector: GaugeCollector) -> None:
+        """Registra uma funcao chamada a cada scrape para gerar gauges (pool, fila, cache)"""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        requests: Dict[Tuple[str, str, str], int] = {}
+        latency: Dict[Tuple[str, str], List[float]] = {}
+        in_flight = 0
+        for shard in shards:
+            in_flight += shard.in_flight
+            for key, count in list(shard.requests.items()):
+                requests[key] = requests.get(key, 0) + count
+            for key, series in list(shard.latency.items()):
+                merged = latency.setdefault(key, [0.0] * len(series))
+                for i, value in enumerate(list(series)):
+                    merged[i] += value
+        return requests, latency, in_flight
+
+    def render(self) -> str:
+        requests, latency, in_flight = self.snapshot()
+        lines: List[str] = []
+
+        _header(lines, "http_requests_total", "Total HTTP requests", "counter")
+        for (method, route, status), count in sorted(requests.items()):
+            labels = {"method": method, "route": route, "status": status}
+            lines.append(_sample("http_requests_total", labels, count))
+
+        _header(lines, "http_request_errors_total", "HTTP responses with status >= 400", "counter")
+        for (method, route, status), count in sorted(requests.items()):
+            if int(status) >= 400:
+                labels = {"method": method, "route": route, "status": status}
+                lines.append(_sample("http_request_errors_total", labels, count))
+
+        _header(lines, "http_requests_in_flight", "HTTP requests being served", "gauge")
+        lines.append(_sample("http_requests_in_flight", {}, in_flight))
+
+        name = "http_request_duration_seconds"
+        _header(lines, name, "HTTP request latency", "histogram")
+        for (method, route), series in sorted(latency.items()):
+            labels = {"method": method, "route": route}
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(_sample(f"{name}_bucket", {**labels, "le": le}, cumulative))
+            lines.append(_sample(f"{name}_sum", labels, series[-1]))
+            lines.append(_sample(f"{name}_count", labels, cumulative))
+
+        seen = set()
+        for collector in self._collectors:
+            try:
+                gauges = list(collector())
+            except Exception as e:
+                logger.error("Metrics collector failed: error=%s", e)
+                continue
+            for gauge_name, description, labels, value in gauges:
+                if gauge_name not in seen:
+                    seen.add(gauge_name)
+                    _header(lines, gauge_name, description, "gauge")
+                lines.append(_sample(gauge_name, labels, value))
+
+        return "\n".join(lines) + "\n"
+
+
+def _header(lines: List[str], name: str, description: str, kind: str) -> None:
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        name = f"{name}{{{rendered}}}"
+    value = float(value)
+    return f"{name} {int(value)}" if value.is_integer() else f"{name} {value!r}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: mede a request ate o ultimo byte do corpo (inclui streaming)"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+        self.registry.request_started()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # o template da rota (ex: /users/{user_id}) mantem a cardinalidade baixa
+            route = scope.get("route")
+            self.registry.request_finished(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - start,
+            )
+
+
+@lru_cache()
+def get_metrics_registry() -> MetricsRegistry:
+    """Registro unico do processo"""
+    return MetricsRegistry()
+
+
+def instrument_metrics(app) -> None:
+    app.add_middleware(MetricsMiddleware, registry=get_metrics_registry())
+    logger.info("HTTP metrics middleware installed")
@@ -0,0 +1,64 @@
+""" trace samplers (importado so com o tracing habilitado) """
+import threading
+import time
+from typing import Callable
+
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+
+from app.config.config import Settings
+
+
+class RateLimitingSampler(Sampler):
+    """Amostra no maximo `rate` traces por segundo (token bucket)
+
+    O balde guarda pelo menos 1 token, senao um `rate` abaixo de 1 nunca amostraria nada.
+    """
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def should_sample(
+        self,
+        parent_context,
+        trace_id,
+        name,
+        kind=None,
+        attributes=None,
+        links=None,
+        trace_state=None,
+    ) -> SamplingResult:
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            sampled = self._tokens >= 1.0
+            if sampled:
+                self._tokens -= 1.0
+        if sampled:
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes)
+        return SamplingResult(Decision.DROP)
+
+    def get_description(self) -> str:
+        return f"RateLimitingSampler{{{self.rate}}}"
+
+
+def build_sampler(config: Settings) -> Sampler:
+    """Sampler da raiz do trace; spans com pai seguem a decisao do pai"""
+    if config.tracing_sampler == "ratio":
+        root = TraceIdRatioBased(config.tracing_sample_ratio)
+    elif config.tracing_sampler == "rate_limited":
+        root = RateLimitingSampler(config.tracing_rate_limit_per_second)
+    else:
+        raise ValueError(f"Unknown tracing sampler '{config.tracing_sampler}'")
+    return ParentBased(root)
@@ -0,0 +1,34 @@
+""" startup timing """
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+
+class StartupTimer:
+    """Duracao de cada fase do startup de um worker, para o log e o /metrics"""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self.clock() - start))
+
+    def mark(self, name: str) -> None:
+        """Fecha uma fase que comecou no fim da anterior (ou na criacao do timer)"""
+        end = self.started + sum(seconds for _, seconds in self.phases)
+        self.phases.append((name, self.clock() - end))
+
+    @property
+    def total(self) -> float:
+        return sum(seconds for _, seconds in self.phases)
+
+    def report(self) -> str:
+        parts = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases]
+        return ", ".join(parts + [f"total={self.total * 1000:.1f}ms"])
@@ -1,45 +1,89 @@
-""" tracing configuration """
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-
-from app.config.config import get_settings
+""" tracing configuration
+
+O SDK do OpenTelemetry, o exportador OTLP (gRPC) e as instrumentacoes so sao importados
+com TRACING_ENABLED=true: desabilitado, importar este modulo nao carrega nada deles.
+"""
+from typing import TYPE_CHECKING, Optional
+
+from app.config.config import Settings, get_settings
 from app.config.logging import get_logger
 
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SpanExporter
+
 logger = get_logger("tracing")
 settings = get_settings()
 
 
-def setup_tracing():
-    """Configure tracing with OTLP exporter (Jaeger)"""
+def build_tracer_provider(
+    config: Settings, exporter: Optional["SpanExporter"] = None
+) -> Optional["TracerProvider"]:
+    """Cria o TracerProvider configurado, ou None com o tracing desabilitado"""
+    if not config.tracing_enabled:
+        return None
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    from app.config.sampling import build_sampler
 
     resource = Resource.create(
         {
-            "service.name": settings.app_name,
-            "service.version": settings.app_version,
+            "service.name": config.app_name,
+            "service.version": config.app_version,
         }
     )
+    provider = TracerProvider(resource=resource, sampler=build_sampler(config))
 
-    provider = TracerProvider(resource=resource)
+    if exporter is None:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 
-    otlp_exporter = OTLPSpanExporter(endpoint="http://localhost:4317", insecure=True)
-    processor = BatchSpanProcessor(otlp_exporter)
+        exporter = OTLPSpanExporter(endpoint=config.tracing_endpoint, insecure=True)
+    processor = BatchSpanProcessor(
+        exporter,
+        max_queue_size=config.tracing_max_queue_size,
+        max_export_batch_size=config.tracing_max_export_batch_size,
+        schedule_delay_millis=config.tracing_schedule_delay_ms,
+    )
     provider.add_span_processor(processor)
+    return provider
+
+
+def setup_tracing():
+    """Configure tracing with OTLP exporter (Jaeger)"""
+
+    provider = build_tracer_provider(settings)
+    if provider is None:
+        logger.info("Tracing disabled")
+        return
+
+    from opentelemetry import trace
 
     trace.set_tracer_provider(provider)
 
-    logger.info("Tracing configured with OTLP exporter (Jaeger)")
+    logger.info(
+        "Tracing configured with OTLP exporter: endpoint=%s, sampler=%s",
+        settings.tracing_endpoint,
+        provider.sampler.get_description(),
+    )
 
 
 def instrument_app(app):
+    # desabilitado nao instala nem o middleware: custo zero por request
+    if not settings.tracing_enabled:
+        return
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
     FastAPIInstrumentor.instrument_app(app)
     logger.info("FastAPI instrumented for tracing")
 
 
 def instrument_db(engine):
+    if not (settings.tracing_enabled and settings.tracing_instrument_db):
+        return
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
     SQLAlchemyInstrumentor().instrument(engine=engine)
     logger.info("SQLAlchemy instrumented for tracing")
@@ -15,3 +15,7 @@ class UserNotFoundError(DomainException):
 
 class ValidationError(DomainException):
     pass
+
+
+class VersionConflictError(DomainException):
+    pass
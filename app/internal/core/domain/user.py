@@ -1,11 +1,41 @@
 """user domain"""
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Optional, List
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    ContextManager,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+)
 
 from app.internal.core.domain.exceptions import ValidationError
 
+T = TypeVar("T")
 
+
+def _slotted(cls: Type[T]) -> Type[T]:
+    """Refaz a dataclass com __slots__, como o dataclass(slots=True) do 3.10 (o projeto roda no 3.9)
+
+    Entidades criadas por linha lida (listas, stream, versoes) ficam sem __dict__: menos memoria
+    e acesso a atributo mais rapido. Os defaults ja estao no __init__ gerado, entao saem da classe
+    (um atributo de classe com o nome de um slot e erro).
+    """
+    names = tuple(field.name for field in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items() if key not in names}
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = names
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+@_slotted
 @dataclass
 class User:
     """User Entity - Representa um user no dominio"""
@@ -13,15 +43,89 @@ class User:
     name: str
     email: str
     id: Optional[int] = None
+    updated_at: Optional[datetime] = None
 
     def validate(self) -> None:
         """Valida os campos do usuario"""
-        if not self.name:
+        self.validate_changes(name=self.name or "", email=self.email or "")
+
+    @staticmethod
+    def validate_changes(name: Optional[str] = None, email: Optional[str] = None) -> None:
+        """Valida apenas os campos informados (update parcial)"""
+        if name is not None and not name:
             raise ValidationError("Name is required")
-        if not self.email:
-            raise ValidationError("Email is required")
-        if "@" not in self.email:
-            raise ValidationError("Invalid email format")
+        if email is not None:
+            if not email:
+                raise ValidationError("Email is required")
+            if "@" not in email:
+                raise ValidationError("Invalid email format")
+
+
+@dataclass
+class BulkCreateResult:
+    """Resultado de uma linha da importacao em lote"""
+
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    INVALID = "invalid"
+
+    status: str
+    email: Optional[str] = None
+    user: Optional[User] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class UserBatch:
+    """Resultado de uma busca por varios ids: usuarios na ordem pedida e ids inexistentes"""
+
+    users: List[User]
+    missing: List[int]
+
+
+@_slotted
+@dataclass
+class UserVersion:
+    """Identifica o estado de um usuario sem carregar a linha inteira (ETag / If-Match)"""
+
+    id: int
+    updated_at: Optional[datetime]
+
+
+@_slotted
+@dataclass
+class PageVersion:
+    """Resumo barato de uma pagina de GET /users, usado no ETag da colecao"""
+
+    count: int
+    last_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def of(cls, users: List[User]) -> "PageVersion":
+        """Mesmo resumo calculado a partir de uma pagina ja carregada"""
+        if not users:
+            return cls(count=0)
+        updated = [user.updated_at for user in users if user.updated_at is not None]
+        return cls(
+            count=len(users),
+            last_id=users[-1].id,
+            updated_at=max(updated) if updated else None,
+        )
+
+
+@dataclass
+class UserSearch:
+    """Filtros da busca de usuarios; campos None nao filtram"""
+
+    PREFIX = "prefix"
+    CONTAINS = "contains"
+
+    email: Optional[str] = None
+    name: Optional[str] = None
+    name_match: str = PREFIX
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
 
 
 class UserRepository(ABC):
@@ -33,8 +137,23 @@ class UserRepository(ABC):
         pass
 
     @abstractmethod
-    def list(self) -> List[User]:
-        """Lista todos os usuarios do repositório"""
+    def create_many(self, users: List[User]) -> List[User]:
+        """Insere em lote ignorando emails ja existentes; retorna apenas os criados"""
+        pass
+
+    @abstractmethod
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        """Lista usuarios ordenados por id, a partir do cursor `after` (keyset)"""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> Iterator[User]:
+        """Percorre todos os usuarios em lotes, sem carregar a tabela inteira"""
+        pass
+
+    @abstractmethod
+    def search(self, criteria: UserSearch, limit: int, after: Optional[int] = None) -> List[User]:
+        """Busca usuarios pelos filtros, ordenados por id a partir do cursor `after`"""
         pass
 
     @abstractmethod
@@ -42,12 +161,134 @@ class UserRepository(ABC):
         """Busca um usuario pelo id"""
         pass
 
+    @abstractmethod
+    def get_many(self, user_ids: List[int]) -> List[User]:
+        """Busca varios usuarios de uma vez; ids inexistentes ficam de fora, sem ordem garantida"""
+        pass
+
+    @abstractmethod
+    def get_version(self, user_id: int) -> Optional[UserVersion]:
+        """Busca so o id e o updated_at do usuario"""
+        pass
+
+    @abstractmethod
+    def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        """Resumo (count, ultimo id, max updated_at) da pagina que list() retornaria"""
+        pass
+
     @abstractmethod
     def update(self, user: User) -> User:
         """Atualiza um usuario no repositório"""
         pass
 
+    @abstractmethod
+    def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        """Atualiza apenas os campos informados, sem buscar o usuario antes
+
+        Com `expected`, so atualiza se o usuario ainda estiver nessa versao
+        (senao VersionConflictError).
+        """
+        pass
+
     @abstractmethod
     def delete(self, user_id: int) -> bool:
         """Remove um usuario do repositório"""
         pass
+
+    @abstractmethod
+    def transaction(self) -> ContextManager[None]:
+        """Adia os commits das escritas ate o fim do bloco: um unico commit, ou rollback de tudo
+
+        Um erro dentro do bloco invalida a transacao inteira, mesmo que seja tratado.
+        """
+        pass
+
+
+class AsyncUserRepository(ABC):
+    """Interface async para o repositório de usuarios"""
+
+    @abstractmethod
+    async def create(self, user: User) -> User:
+        """Adiciona um usuario ao repositório"""
+        pass
+
+    @abstractmethod
+    async def create_many(self, users: List[User]) -> List[User]:
+        """Insere em lote ignorando emails ja existentes; retorna apenas os criados"""
+        pass
+
+    @abstractmethod
+    async def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        """Lista usuarios ordenados por id, a partir do cursor `after` (keyset)"""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        """Percorre todos os usuarios em lotes, sem carregar a tabela inteira"""
+        pass
+
+    @abstractmethod
+    async def search(
+        self, criteria: UserSearch, limit: int, after: Optional[int] = None
+    ) -> List[User]:
+        """Busca usuarios pelos filtros, ordenados por id a partir do cursor `after`"""
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, id: int) -> Optional[User]:
+        """Busca um usuario pelo id"""
+        pass
+
+    @abstractmethod
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        """Busca varios usuarios de uma vez; ids inexistentes ficam de fora, sem ordem garantida"""
+        pass
+
+    @abstractmethod
+    async def get_version(self, user_id: int) -> Optional[UserVersion]:
+        """Busca so o id e o updated_at do usuario"""
+        pass
+
+    @abstractmethod
+    async def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        """Resumo (count, ultimo id, max updated_at) da pagina que list() retornaria"""
+        pass
+
+    @abstractmethod
+    async def update(self, user: User) -> User:
+        """Atualiza um usuario no repositório"""
+        pass
+
+    @abstractmethod
+    async def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        """Atualiza apenas os campos informados, sem buscar o usuario antes
+
+        Com `expected`, so atualiza se o usuario ainda estiver nessa versao
+        (senao VersionConflictError).
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, user_id: int) -> bool:
+        """Remove um usuario do repositório"""
+        pass
+
+    @abstractmethod
+    def transaction(self) -> AsyncContextManager[None]:
+        """Adia os commits das escritas ate o fim do bloco: um unico commit, ou rollback de tudo
+
+        Um erro dentro do bloco invalida a transacao inteira, mesmo que seja tratado.
+        """
+        pass
@@ -0,0 +1,123 @@
+"""DataLoader de usuarios: lookups individuais agrupados num unico get_many"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.internal.core.domain.user import User
+
+BatchFetch = Callable[[List[int]], List[User]]
+AsyncBatchFetch = Callable[[List[int]], Awaitable[List[User]]]
+
+
+class DeferredUser:
+    """Usuario agendado por UserLoader.load; result() dispara o lote pendente"""
+
+    __slots__ = ("_loader", "_user_id")
+
+    def __init__(self, loader: "UserLoader", user_id: int):
+        self._loader = loader
+        self._user_id = user_id
+
+    def result(self) -> Optional[User]:
+        return self._loader._resolve(self._user_id)
+
+
+class UserLoader:
+    """Versao sync: load() so enfileira o id; o primeiro result() busca todos os pendentes
+
+    Guarda os usuarios ja carregados, entao vale por request/job (nao e thread-safe).
+    """
+
+    def __init__(self, fetch: BatchFetch):
+        self._fetch = fetch
+        self._users: Dict[int, Optional[User]] = {}
+        self._pending: Dict[int, None] = {}
+        self.batches = 0
+
+    def load(self, user_id: int) -> DeferredUser:
+        if user_id not in self._users:
+            self._pending[user_id] = None
+        return DeferredUser(self, user_id)
+
+    def load_many(self, user_ids: List[int]) -> List[Optional[User]]:
+        deferred = [self.load(user_id) for user_id in user_ids]
+        return [item.result() for item in deferred]
+
+    def prime(self, user: User) -> None:
+        """Registra um usuario ja carregado por outro caminho"""
+        self._users[user.id] = user
+        self._pending.pop(user.id, None)
+
+    def dispatch(self) -> None:
+        if not self._pending:
+            return
+        user_ids, self._pending = list(self._pending), {}
+        self.batches += 1
+        found = {user.id: user for user in self._fetch(user_ids)}
+        for user_id in user_ids:
+            self._users[user_id] = found.get(user_id)
+
+    def _resolve(self, user_id: int) -> Optional[User]:
+        if user_id not in self._users:
+            self._pending[user_id] = None
+            self.dispatch()
+        return self._users[user_id]
+
+
+class AsyncUserLoader:
+    """Versao asyncio: os load() feitos na mesma volta do event loop viram um get_many
+
+    Um lote por vez: o fetch usa a sessao da request, que nao aceita duas queries ao mesmo
+    tempo, entao os load() feitos durante uma busca esperam por ela e viram o proximo lote.
+    """
+
+    def __init__(self, fetch: AsyncBatchFetch):
+        self._fetch = fetch
+        self._lock = asyncio.Lock()
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._pending: List[int] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self.batches = 0
+
+    def load(self, user_id: int) -> "asyncio.Future[Optional[User]]":
+        future = self._futures.get(user_id)
+        if future is not None and not future.cancelled():
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._futures[user_id] = loop.create_future()
+        self._pending.append(user_id)
+        if self._dispatch_task is None:
+            # a task so roda depois das coroutines ja agendadas nesta volta do loop
+            self._dispatch_task = loop.create_task(self._dispatch())
+        return future
+
+    async def load_many(self, user_ids: List[int]) -> List[Optional[User]]:
+        return list(await asyncio.gather(*(self.load(user_id) for user_id in user_ids)))
+
+    def prime(self, user: User) -> None:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(user)
+        self._futures[user.id] = future
+
+    async def _dispatch(self) -> None:
+        async with self._lock:
+            user_ids, self._pending = self._pending, []
+            self._dispatch_task = None
+            if user_ids:
+                await self._fetch_batch(user_ids)
+
+    async def _fetch_batch(self, user_ids: List[int]) -> None:
+        self.batches += 1
+        try:
+            found = {user.id: user for user in await self._fetch(user_ids)}
+        except Exception as e:
+            for user_id in user_ids:
+                future = self._futures.pop(user_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for user_id in user_ids:
+            future = self._futures[user_id]
+            if not future.done():
+                future.set_result(found.get(user_id))
@@ -1,25 +1,235 @@
 """ user service """
-from typing import List, Optional
-from app.internal.core.domain.user import User, UserRepository
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    ContextManager,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from app.internal.core.domain.exceptions import ValidationError
+from app.internal.core.domain.user import (
+    AsyncUserRepository,
+    BulkCreateResult,
+    PageVersion,
+    User,
+    UserBatch,
+    UserRepository,
+    UserSearch,
+    UserVersion,
+)
+from app.internal.core.services.single_flight import AsyncSingleFlight, SingleFlight
+from app.internal.core.services.user_loader import AsyncUserLoader, UserLoader
+
+
+def _partition_bulk(
+    users: List[User],
+) -> Tuple[List[Optional[BulkCreateResult]], List[Tuple[int, User]]]:
+    """Valida o lote e separa invalidos e emails repetidos dentro do proprio lote"""
+    results: List[Optional[BulkCreateResult]] = [None] * len(users)
+    pending: List[Tuple[int, User]] = []
+    seen = set()
+    for index, user in enumerate(users):
+        try:
+            user.validate()
+        except ValidationError as e:
+            results[index] = BulkCreateResult(BulkCreateResult.INVALID, user.email, error=str(e))
+            continue
+        if user.email in seen:
+            results[index] = BulkCreateResult(
+                BulkCreateResult.DUPLICATE, user.email, error="Duplicate email in batch"
+            )
+            continue
+        seen.add(user.email)
+        pending.append((index, user))
+    return results, pending
+
+
+def _merge_bulk(
+    results: List[Optional[BulkCreateResult]],
+    pending: List[Tuple[int, User]],
+    created: List[User],
+) -> List[BulkCreateResult]:
+    by_email = {user.email: user for user in created}
+    for index, user in pending:
+        created_user = by_email.get(user.email)
+        if created_user:
+            results[index] = BulkCreateResult(
+                BulkCreateResult.CREATED, user.email, user=created_user
+            )
+        else:
+            results[index] = BulkCreateResult(
+                BulkCreateResult.DUPLICATE, user.email, error=f"Email '{user.email}' already exists"
+            )
+    return results
+
+
+def _validate_search(criteria: UserSearch) -> None:
+    if criteria.name_match not in (UserSearch.PREFIX, UserSearch.CONTAINS):
+        raise ValidationError(f"Invalid name match '{criteria.name_match}'")
+    if criteria.name is not None and not criteria.name.strip():
+        raise ValidationError("Name filter must not be empty")
+    if (
+        criteria.created_from is not None
+        and criteria.created_to is not None
+        and criteria.created_from > criteria.created_to
+    ):
+        raise ValidationError("created_from must be before created_to")
+
+
+def _order_batch(user_ids: List[int], users: List[User]) -> UserBatch:
+    """Usuarios na ordem dos ids pedidos (sem repetir) e os ids que nao existem"""
+    by_id = {user.id: user for user in users}
+    batch = UserBatch(users=[], missing=[])
+    for user_id in dict.fromkeys(user_ids):
+        user = by_id.get(user_id)
+        if user is None:
+            batch.missing.append(user_id)
+        else:
+            batch.users.append(user)
+    return batch
 
 
 class UserService:
-    def __init__(self, user_repo: UserRepository):
+    def __init__(self, user_repo: UserRepository, flights: Optional[SingleFlight] = None):
         self.user_repo = user_repo
+        # compartilhado entre requests: leituras identicas e simultaneas viram uma so query
+        self.flights = flights
 
     def create(self, user: User) -> User:
         user.validate()
         return self.user_repo.create(user)
 
-    def list(self) -> List[User]:
-        return self.user_repo.list()
+    def create_many(self, users: List[User]) -> List[BulkCreateResult]:
+        results, pending = _partition_bulk(users)
+        created = self.user_repo.create_many([user for _, user in pending]) if pending else []
+        return _merge_bulk(results, pending, created)
+
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        if self.flights is None:
+            return self.user_repo.list(limit=limit, after=after)
+        return self.flights.do(
+            ("list", limit, after), lambda: self.user_repo.list(limit=limit, after=after)
+        )
+
+    def stream(self, batch_size: int = 1000) -> Iterator[User]:
+        return self.user_repo.iter_all(batch_size=batch_size)
+
+    def search(self, criteria: UserSearch, limit: int, after: Optional[int] = None) -> List[User]:
+        _validate_search(criteria)
+        return self.user_repo.search(criteria, limit=limit, after=after)
 
     def get_by_id(self, user_id: int) -> Optional[User]:
-        return self.user_repo.get_by_id(user_id)
+        if self.flights is None:
+            return self.user_repo.get_by_id(user_id)
+        return self.flights.do(("get", user_id), lambda: self.user_repo.get_by_id(user_id))
+
+    def get_many(self, user_ids: List[int]) -> UserBatch:
+        return _order_batch(user_ids, self.user_repo.get_many(user_ids) if user_ids else [])
+
+    def loader(self) -> UserLoader:
+        """DataLoader para chamadores internos: varios load(id) viram um get_many"""
+        return UserLoader(self.user_repo.get_many)
+
+    def get_version(self, user_id: int) -> Optional[UserVersion]:
+        return self.user_repo.get_version(user_id)
+
+    def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        return self.user_repo.page_version(limit, after=after)
 
     def update(self, user: User) -> User:
         user.validate()
         return self.user_repo.update(user)
 
+    def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        User.validate_changes(name=name, email=email)
+        return self.user_repo.patch(user_id, name=name, email=email, expected=expected)
+
     def delete(self, id: int) -> bool:
         return self.user_repo.delete(id)
+
+    def unit_of_work(self) -> ContextManager[None]:
+        """Varias escritas, um unico commit no fim do bloco (rollback de todas se falhar)
+
+        with service.unit_of_work():
+            service.create(user)
+            service.patch(other_id, name="...")
+        """
+        return self.user_repo.transaction()
+
+
+class AsyncUserService:
+    def __init__(self, user_repo: AsyncUserRepository, flights: Optional[AsyncSingleFlight] = None):
+        self.user_repo = user_repo
+        self.flights = flights
+
+    async def create(self, user: User) -> User:
+        user.validate()
+        return await self.user_repo.create(user)
+
+    async def create_many(self, users: List[User]) -> List[BulkCreateResult]:
+        results, pending = _partition_bulk(users)
+        created = await self.user_repo.create_many([user for _, user in pending]) if pending else []
+        return _merge_bulk(results, pending, created)
+
+    async def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        if self.flights is None:
+            return await self.user_repo.list(limit=limit, after=after)
+        return await self.flights.do(
+            ("list", limit, after), lambda: self.user_repo.list(limit=limit, after=after)
+        )
+
+    def stream(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        return self.user_repo.iter_all(batch_size=batch_size)
+
+    async def search(
+        self, criteria: UserSearch, limit: int, after: Optional[int] = None
+    ) -> List[User]:
+        _validate_search(criteria)
+        return await self.user_repo.search(criteria, limit=limit, after=after)
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        if self.flights is None:
+            return await self.user_repo.get_by_id(user_id)
+        return await self.flights.do(("get", user_id), lambda: self.user_repo.get_by_id(user_id))
+
+    async def get_many(self, user_ids: List[int]) -> UserBatch:
+        users = await self.user_repo.get_many(user_ids) if user_ids else []
+        return _order_batch(user_ids, users)
+
+    def loader(self) -> AsyncUserLoader:
+        return AsyncUserLoader(self.user_repo.get_many)
+
+    async def get_version(self, user_id: int) -> Optional[UserVersion]:
+        return await self.user_repo.get_version(user_id)
+
+    async def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        return await self.user_repo.page_version(limit, after=after)
+
+    async def update(self, user: User) -> User:
+        user.validate()
+        return await self.user_repo.update(user)
+
+    async def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        User.validate_changes(name=name, email=email)
+        return await self.user_repo.patch(user_id, name=name, email=email, expected=expected)
+
+    async def delete(self, id: int) -> bool:
+        return await self.user_repo.delete(id)
+
+    def unit_of_work(self) -> AsyncContextManager[None]:
+        """async with service.unit_of_work(): ... (um unico commit no fim do bloco)"""
+        return self.user_repo.transaction()
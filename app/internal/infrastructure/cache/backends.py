@@ -0,0 +1,110 @@
+""" cache backends """
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class CacheBackend(ABC):
+    """Interface para os backends de cache (valores sao dicts serializaveis em JSON)"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna o valor ou None se a chave nao existe / expirou"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        """Grava o valor com expiracao em segundos"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a chave (sem erro se nao existir)"""
+        pass
+
+
+class InMemoryCache(CacheBackend):
+    """LRU limitado com TTL, local ao processo"""
+
+    def __init__(self, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache(CacheBackend):
+    """Cache compartilhado entre workers sobre um client estilo redis (get/set(px=)/delete)"""
+
+    def __init__(self, client: Any, prefix: str = "shape:"):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str) -> "SharedCache":
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
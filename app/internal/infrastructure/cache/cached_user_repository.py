@@ -0,0 +1,297 @@
+""" read-through cache for the user repository """
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.internal.core.domain.user import (
+    AsyncUserRepository,
+    PageVersion,
+    User,
+    UserRepository,
+    UserSearch,
+    UserVersion,
+)
+from app.internal.infrastructure.cache.backends import CacheBackend
+
+# marcador de lookup negativo (usuario inexistente)
+_NOT_FOUND: dict = {}
+
+
+class _UserEntries:
+    """Entradas user:{id} do cache, comuns aos repositorios sync e async
+
+    O cache e por processo quando o backend e em memoria, entao o TTL limita
+    por quanto tempo outro worker pode servir um valor antigo apos uma escrita.
+    """
+
+    def __init__(self, cache: CacheBackend, ttl: float, negative_ttl: float):
+        self.cache = cache
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # ids escritos dentro de transaction(), invalidados de novo depois do commit
+        self._pending: Optional[Set[int]] = None
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    def _invalidate(self, user_id: int) -> None:
+        self.cache.delete(self._key(user_id))
+        if self._pending is not None:
+            self._pending.add(user_id)
+
+    def _flush_pending(self) -> None:
+        pending, self._pending = self._pending, None
+        for user_id in pending:
+            self.cache.delete(self._key(user_id))
+
+    @staticmethod
+    def _dump(user: User) -> dict:
+        # valores do cache precisam ser JSON (backend compartilhado)
+        updated_at = user.updated_at.isoformat() if user.updated_at else None
+        return {"id": user.id, "name": user.name, "email": user.email, "updated_at": updated_at}
+
+    @staticmethod
+    def _load(cached: dict) -> User:
+        updated_at = cached.get("updated_at")
+        return User(
+            id=cached["id"],
+            name=cached["name"],
+            email=cached["email"],
+            updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+        )
+
+    def _lookup(self, user_id: int) -> Tuple[bool, Optional[User]]:
+        """(hit, usuario); um hit com None e um lookup negativo"""
+        cached = self.cache.get(self._key(user_id))
+        if cached is None:
+            return False, None
+        return True, self._load(cached) if cached else None
+
+    def _store(self, user_id: int, user: Optional[User]) -> None:
+        if user is None:
+            self.cache.set(self._key(user_id), _NOT_FOUND, self.negative_ttl)
+        else:
+            self.cache.set(self._key(user_id), self._dump(user), self.ttl)
+
+    def _split(self, user_ids: Iterable[int]) -> Tuple[List[User], List[int]]:
+        """Usuarios no cache e ids que precisam ir ao repositorio"""
+        users: List[User] = []
+        misses: List[int] = []
+        for user_id in dict.fromkeys(user_ids):
+            hit, user = self._lookup(user_id)
+            if not hit:
+                misses.append(user_id)
+            elif user is not None:
+                users.append(user)
+        return users, misses
+
+    def _store_many(self, misses: List[int], found: List[User]) -> None:
+        for user in found:
+            self._store(user.id, user)
+        for user_id in set(misses).difference(user.id for user in found):
+            self._store(user_id, None)
+
+    def _version(self, user: Optional[User]) -> Optional[UserVersion]:
+        return UserVersion(id=user.id, updated_at=user.updated_at) if user else None
+
+
+class CachedUserRepository(_UserEntries, UserRepository):
+    """Decorator de UserRepository que cacheia get_by_id e invalida nas escritas"""
+
+    def __init__(
+        self,
+        repo: UserRepository,
+        cache: CacheBackend,
+        ttl: float = 30.0,
+        negative_ttl: float = 2.0,
+    ):
+        super().__init__(cache, ttl, negative_ttl)
+        self.repo = repo
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        # antes do commit outra request ainda le (e cacheia) a linha antiga
+        if self._pending is not None:
+            with self.repo.transaction():
+                yield
+            return
+        self._pending = set()
+        try:
+            with self.repo.transaction():
+                yield
+        finally:
+            self._flush_pending()
+
+    def create(self, user: User) -> User:
+        created_user = self.repo.create(user)
+        self._invalidate(created_user.id)
+        return created_user
+
+    def create_many(self, users: List[User]) -> List[User]:
+        created = self.repo.create_many(users)
+        for user in created:
+            self._invalidate(user.id)
+        return created
+
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        return self.repo.list(limit=limit, after=after)
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[User]:
+        return self.repo.iter_all(batch_size=batch_size)
+
+    def search(self, criteria: UserSearch, limit: int, after: Optional[int] = None) -> List[User]:
+        return self.repo.search(criteria, limit=limit, after=after)
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        hit, user = self._lookup(user_id)
+        if hit:
+            return user
+        user = self.repo.get_by_id(user_id)
+        self._store(user_id, user)
+        return user
+
+    def get_many(self, user_ids: List[int]) -> List[User]:
+        # mesmas entradas de get_by_id: so os ids fora do cache vao ao repositorio
+        users, misses = self._split(user_ids)
+        if not misses:
+            return users
+        found = self.repo.get_many(misses)
+        self._store_many(misses, found)
+        return users + found
+
+    def get_version(self, user_id: int) -> Optional[UserVersion]:
+        # a versao sai da mesma entrada de get_by_id, entao GET e 304 nunca divergem
+        hit, user = self._lookup(user_id)
+        if hit:
+            return self._version(user)
+        return self.repo.get_version(user_id)
+
+    def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        return self.repo.page_version(limit, after=after)
+
+    def update(self, user: User) -> User:
+        try:
+            return self.repo.update(user)
+        finally:
+            self._invalidate(user.id)
+
+    def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        try:
+            return self.repo.patch(user_id, name=name, email=email, expected=expected)
+        finally:
+            self._invalidate(user_id)
+
+    def delete(self, user_id: int) -> bool:
+        try:
+            return self.repo.delete(user_id)
+        finally:
+            self._invalidate(user_id)
+
+
+class AsyncCachedUserRepository(_UserEntries, AsyncUserRepository):
+    """Mesmo cache para o AsyncUserRepository (DB_ASYNC=true)
+
+    O backend continua sincrono: em memoria e so um dict; no compartilhado cada operacao e
+    um round trip curto ao redis feito no event loop.
+    """
+
+    def __init__(
+        self,
+        repo: AsyncUserRepository,
+        cache: CacheBackend,
+        ttl: float = 30.0,
+        negative_ttl: float = 2.0,
+    ):
+        super().__init__(cache, ttl, negative_ttl)
+        self.repo = repo
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        if self._pending is not None:
+            async with self.repo.transaction():
+                yield
+            return
+        self._pending = set()
+        try:
+            async with self.repo.transaction():
+                yield
+        finally:
+            self._flush_pending()
+
+    async def create(self, user: User) -> User:
+        created_user = await self.repo.create(user)
+        self._invalidate(created_user.id)
+        return created_user
+
+    async def create_many(self, users: List[User]) -> List[User]:
+        created = await self.repo.create_many(users)
+        for user in created:
+            self._invalidate(user.id)
+        return created
+
+    async def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        return await self.repo.list(limit=limit, after=after)
+
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        return self.repo.iter_all(batch_size=batch_size)
+
+    async def search(
+        self, criteria: UserSearch, limit: int, after: Optional[int] = None
+    ) -> List[User]:
+        return await self.repo.search(criteria, limit=limit, after=after)
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        hit, user = self._lookup(user_id)
+        if hit:
+            return user
+        user = await self.repo.get_by_id(user_id)
+        self._store(user_id, user)
+        return user
+
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        users, misses = self._split(user_ids)
+        if not misses:
+            return users
+        found = await self.repo.get_many(misses)
+        self._store_many(misses, found)
+        return users + found
+
+    async def get_version(self, user_id: int) -> Optional[UserVersion]:
+        hit, user = self._lookup(user_id)
+        if hit:
+            return self._version(user)
+        return await self.repo.get_version(user_id)
+
+    async def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        return await self.repo.page_version(limit, after=after)
+
+    async def update(self, user: User) -> User:
+        try:
+            return await self.repo.update(user)
+        finally:
+            self._invalidate(user.id)
+
+    async def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        try:
+            return await self.repo.patch(user_id, name=name, email=email, expected=expected)
+        finally:
+            self._invalidate(user_id)
+
+    async def delete(self, user_id: int) -> bool:
+        try:
+            return await self.repo.delete(user_id)
+        finally:
+            self._invalidate(user_id)
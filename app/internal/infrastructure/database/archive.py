@@ -0,0 +1,136 @@
+"""arquivamento: usuarios removidos (ou inativos) saem da tabela users em lotes"""
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import Select, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.internal.infrastructure.database.models import UserArchiveModel, UserModel
+from app.config.logging import get_logger
+
+logger = get_logger("infrastructure.archive")
+
+_ARCHIVE_COLUMNS = ("id", "name", "email", "created_at", "updated_at", "deleted_at")
+
+
+@dataclass
+class ArchiveStats:
+    batches: int = 0
+    archived: int = 0
+
+
+def deleted_batch_statement(dialect_name: str, deleted_before: datetime, limit: int) -> Select:
+    """Ids removidos antes de `deleted_before`, pelo indice parcial ix_users_deleted_at"""
+    stmt = (
+        select(UserModel.id)
+        .where(UserModel.deleted_at < deleted_before)
+        .order_by(UserModel.id)
+        .limit(limit)
+    )
+    if dialect_name == "postgresql":
+        # duas execucoes ao mesmo tempo pegam lotes diferentes em vez de esperar
+        stmt = stmt.with_for_update(skip_locked=True)
+    return stmt
+
+
+def inactive_window_statement(
+    dialect_name: str, after: int, until: int, inactive_before: datetime
+) -> Select:
+    """Ids sem update desde `inactive_before` na faixa (after, until]
+
+    updated_at nao tem indice (custaria os HOT updates), entao a busca anda pelo id em
+    janelas: cada query le no maximo uma janela da PK, e so das particoes dela.
+    """
+    stmt = select(UserModel.id).where(
+        UserModel.id > after,
+        UserModel.id <= until,
+        UserModel.deleted_at.is_(None),
+        UserModel.updated_at < inactive_before,
+    )
+    if dialect_name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+    return stmt
+
+
+class UserArchiver:
+    """Move usuarios para users_archive, uma transacao curta por lote de `batch_size`
+
+    Lotes pequenos seguram poucos locks e geram pouco WAL por commit; a pausa entre eles
+    deixa espaco para o trafego e para o autovacuum acompanhar os DELETEs.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = 1000,
+        pause: float = 0.1,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.pause = pause
+        self.sleep = sleep
+
+    def run(
+        self,
+        deleted_before: datetime,
+        inactive_before: Optional[datetime] = None,
+        max_batches: Optional[int] = None,
+    ) -> ArchiveStats:
+        """Arquiva ate acabar (ou ate `max_batches` lotes de removidos)"""
+        stats = ArchiveStats()
+        while max_batches is None or stats.batches < max_batches:
+            archived = self._archive_deleted(deleted_before)
+            self._count(stats, archived)
+            if archived < self.batch_size:
+                break
+            self.sleep(self.pause)
+
+        if inactive_before is not None:
+            with self.session_factory() as db:
+                max_id = db.execute(select(func.max(UserModel.id))).scalar() or 0
+            for after in range(0, max_id, self.batch_size):
+                archived = self._archive_inactive(after, after + self.batch_size, inactive_before)
+                self._count(stats, archived)
+                if archived:
+                    self.sleep(self.pause)
+
+        logger.info("Users archived: archived=%s, batches=%s", stats.archived, stats.batches)
+        return stats
+
+    @staticmethod
+    def _count(stats: ArchiveStats, archived: int) -> None:
+        if archived:
+            stats.batches += 1
+            stats.archived += archived
+
+    def _archive_deleted(self, deleted_before: datetime) -> int:
+        with self.session_factory() as db, db.begin():
+            dialect_name = db.get_bind().dialect.name
+            stmt = deleted_batch_statement(dialect_name, deleted_before, self.batch_size)
+            return self._move(db, list(db.execute(stmt).scalars()))
+
+    def _archive_inactive(self, after: int, until: int, inactive_before: datetime) -> int:
+        with self.session_factory() as db, db.begin():
+            dialect_name = db.get_bind().dialect.name
+            stmt = inactive_window_statement(dialect_name, after, until, inactive_before)
+            return self._move(db, list(db.execute(stmt).scalars()))
+
+    @staticmethod
+    def _move(db: Session, user_ids: List[int]) -> int:
+        """Copia e apaga as linhas na mesma transacao"""
+        if not user_ids:
+            return 0
+        archived_at = literal(datetime.utcnow(), UserArchiveModel.archived_at.type)
+        rows = select(
+            *(getattr(UserModel, column) for column in _ARCHIVE_COLUMNS), archived_at
+        ).where(UserModel.id.in_(user_ids))
+        db.execute(insert(UserArchiveModel).from_select([*_ARCHIVE_COLUMNS, "archived_at"], rows))
+        db.execute(
+            delete(UserModel)
+            .where(UserModel.id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        )
+        return len(user_ids)
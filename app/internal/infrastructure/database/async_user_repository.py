@@ -0,0 +1,215 @@
+""" async user repository """
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+
+from app.internal.core.domain.user import (
+    AsyncUserRepository,
+    PageVersion,
+    User,
+    UserSearch,
+    UserVersion,
+)
+from app.internal.core.domain.exceptions import (
+    DuplicateEmailError,
+    UserNotFoundError,
+    VersionConflictError,
+)
+from app.internal.infrastructure.database.models import UserModel
+from app.internal.infrastructure.database.user_repository import (
+    DELETE_BY_ID,
+    GET_BY_ID,
+    GET_VERSION,
+    check_expected,
+    get_many_statement,
+    id_chunks,
+    EXISTING_EMAILS,
+    duplicate_on_insert,
+    ignores_duplicates,
+    insert_user_statement,
+    insert_users_statement,
+    is_duplicate_email,
+    new_user_rows,
+    list_params,
+    list_statement,
+    page_version_statement,
+    patch_params,
+    patch_statement,
+    row_to_entity,
+    search_statement,
+    select_users,
+)
+from app.config.logging import get_logger
+
+logger = get_logger("infrastructure.async_user_repository")
+
+
+class AsyncUserRepoImpl(AsyncUserRepository):
+    """async user repository implementation (AsyncSession + asyncpg)"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.autocommit = True
+
+    async def _commit(self) -> None:
+        if self.autocommit:
+            await self.db.commit()
+
+    async def _rollback(self) -> None:
+        if self.autocommit:
+            await self.db.rollback()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        if not self.autocommit:
+            yield
+            return
+        self.autocommit = False
+        try:
+            yield
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+        finally:
+            self.autocommit = True
+
+    async def create(self, user: User) -> User:
+        dialect_name = self.db.get_bind().dialect.name
+        stmt = insert_user_statement(dialect_name, user)
+        try:
+            row = (await self.db.execute(stmt)).first()
+            await self._commit()
+        except IntegrityError as e:
+            await self._rollback()
+            if duplicate_on_insert(dialect_name, e):
+                raise DuplicateEmailError(f"Email '{user.email}' already exists")
+            logger.error("Error on user creation: email=%s, error=%s", user.email, e)
+            raise
+        except Exception as e:
+            await self._rollback()
+            logger.error("Error on user creation: email=%s, error=%s", user.email, e)
+            raise
+
+        if row is None:
+            raise DuplicateEmailError(f"Email '{user.email}' already exists")
+        return row_to_entity(row)
+
+    async def create_many(self, users: List[User]) -> List[User]:
+        if not users:
+            return []
+        dialect_name = self.db.get_bind().dialect.name
+        rows = [{"name": user.name, "email": user.email} for user in users]
+        try:
+            if not ignores_duplicates(dialect_name):
+                emails = [row["email"] for row in rows]
+                existing = await self.db.scalars(EXISTING_EMAILS, {"emails": emails})
+                rows = new_user_rows(rows, existing)
+            created = []
+            if rows:
+                created = (await self.db.execute(insert_users_statement(dialect_name, rows))).all()
+            await self._commit()
+        except Exception as e:
+            await self._rollback()
+            logger.error("Error on bulk user creation: count=%s, error=%s", len(users), e)
+            raise
+
+        return [row_to_entity(row) for row in created]
+
+    async def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        stmt = list_statement(after is not None, limit is not None)
+        result = await self.db.execute(stmt, list_params(limit, after))
+        return [row_to_entity(row) for row in result]
+
+    async def iter_all(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        stmt = select_users().order_by(UserModel.id).execution_options(yield_per=batch_size)
+        result = await self.db.stream(stmt)
+        async for row in result:
+            yield row_to_entity(row)
+
+    async def search(
+        self, criteria: UserSearch, limit: int, after: Optional[int] = None
+    ) -> List[User]:
+        stmt = search_statement(self.db.get_bind().dialect.name, criteria, limit, after)
+        result = await self.db.execute(stmt)
+        return [row_to_entity(row) for row in result]
+
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        row = (await self.db.execute(GET_BY_ID, {"user_id": user_id})).first()
+        if row is None:
+            return None
+        return row_to_entity(row)
+
+    async def get_many(self, user_ids: List[int]) -> List[User]:
+        stmt = get_many_statement(self.db.get_bind().dialect.name)
+        users: List[User] = []
+        for chunk in id_chunks(user_ids):
+            result = await self.db.execute(stmt, {"ids": chunk})
+            users.extend(row_to_entity(row) for row in result)
+        return users
+
+    async def get_version(self, user_id: int) -> Optional[UserVersion]:
+        row = (await self.db.execute(GET_VERSION, {"user_id": user_id})).first()
+        if row is None:
+            return None
+        return UserVersion(id=row.id, updated_at=row.updated_at)
+
+    async def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        stmt = page_version_statement(after is not None)
+        result = await self.db.execute(stmt, list_params(limit, after))
+        count, last_id, updated_at = result.one()
+        return PageVersion(count=count, last_id=last_id, updated_at=updated_at)
+
+    async def update(self, user: User) -> User:
+        return await self.patch(user.id, name=user.name, email=user.email)
+
+    async def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        values = {
+            key: value for key, value in (("name", name), ("email", email)) if value is not None
+        }
+        if not values:
+            user = await self.get_by_id(user_id)
+            if not user:
+                raise UserNotFoundError(f"User with id {user_id} not found")
+            check_expected(user, expected)
+            return user
+
+        stmt = patch_statement(tuple(values), expected is not None)
+        try:
+            row = (await self.db.execute(stmt, patch_params(user_id, values, expected))).first()
+            await self._commit()
+        except IntegrityError as e:
+            await self._rollback()
+            logger.error("Database integrity error on user update: id=%s, error=%s", user_id, e)
+            if is_duplicate_email(e):
+                raise DuplicateEmailError(f"Email '{email}' already exists")
+            raise
+
+        if row is None:
+            if expected is not None and await self.get_version(user_id) is not None:
+                logger.warning("Stale version on user update: id=%s", user_id)
+                raise VersionConflictError(f"User with id {user_id} was modified")
+            logger.error("User not found for update: id=%s", user_id)
+            raise UserNotFoundError(f"User with id {user_id} not found")
+        return row_to_entity(row)
+
+    async def delete(self, user_id: int) -> bool:
+        try:
+            row = (
+                await self.db.execute(DELETE_BY_ID, {"user_id": user_id, "now": datetime.utcnow()})
+            ).first()
+            await self._commit()
+        except Exception as e:
+            await self._rollback()
+            logger.error("Error deleting user from database: id=%s, error=%s", user_id, e)
+            raise
+
+        return row is not None
@@ -1,33 +1,442 @@
 """ connection and sesssion management """
-from typing import Generator
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import os
+import threading
+import time
+import weakref
+from contextlib import ExitStack
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, Generator, List, Optional
+from sqlalchemy import Select, create_engine, exc, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.engine.interfaces import CacheStats
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
-from app.config.config import get_settings
+from app.config.config import Settings, get_settings
 from app.config.logging import get_logger
 
+if TYPE_CHECKING:
+    # o modo async (e o sqlalchemy.ext.asyncio) so e importado com DB_ASYNC=true
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
 logger = get_logger("infrastructure.database")
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.db_url,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    pool_recycle=1800,
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    connects: int = 0  # conexoes novas abertas pelo pool
+    connect_seconds: float = 0.0
+
+
+_pool_stats: "weakref.WeakKeyDictionary[Engine, PoolStats]" = weakref.WeakKeyDictionary()
+
+_CONNECT_STARTED = "shape_connect_started"
+
+
+def track_pool(target: Engine) -> PoolStats:
+    """Conta os checkouts do pool e quanto tempo leva abrir cada conexao nova
+
+    Usa os eventos do pool: do_connect marca o inicio, connect mede e loga as aberturas
+    mais lentas que DB_SLOW_CONNECT_MS. A espera por uma conexao ocupada nao tem evento;
+    ela aparece em db_pool_checked_out / db_pool_overflow e no timeout do pool.
+    """
+    stats = _pool_stats.get(target)
+    if stats is not None:
+        return stats
+    stats = _pool_stats[target] = PoolStats()
+    lock = threading.Lock()
+
+    def connect_started(dialect, connection_record, cargs, cparams) -> None:
+        if connection_record is not None:
+            connection_record.info[_CONNECT_STARTED] = time.perf_counter()
+
+    def connected(dbapi_connection, connection_record) -> None:
+        started = connection_record.info.pop(_CONNECT_STARTED, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            stats.connects += 1
+            stats.connect_seconds += elapsed
+        if 0 < settings.db_slow_connect_ms <= elapsed * 1000:
+            logger.warning(
+                "Slow connection open: connect_ms=%.1f, pool=%s",
+                elapsed * 1000,
+                target.pool.status(),
+            )
+
+    def checked_out(dbapi_connection, connection_record, connection_proxy) -> None:
+        with lock:
+            stats.checkouts += 1
+
+    event.listen(target, "do_connect", connect_started)
+    event.listen(target, "connect", connected)
+    event.listen(target, "checkout", checked_out)
+    return stats
+
+
+def pool_stats(target: Engine) -> Optional[PoolStats]:
+    return _pool_stats.get(target)
+
+
+@dataclass
+class CompiledCacheStats:
+    hits: int = 0
+    misses: int = 0
+    uncached: int = 0  # sem cache key ou com o cache desligado: compila a cada execucao
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses + self.uncached
+        return self.hits / total if total else 0.0
+
+
+_compiled_cache_stats: "weakref.WeakKeyDictionary[Engine, CompiledCacheStats]" = (
+    weakref.WeakKeyDictionary()
+)
+
+_CACHE_RESULTS = {
+    CacheStats.CACHE_HIT: "hits",
+    CacheStats.CACHE_MISS: "misses",
+    CacheStats.NO_CACHE_KEY: "uncached",
+    CacheStats.CACHING_DISABLED: "uncached",
+}
+
+
+def track_compiled_cache(target: Engine) -> CompiledCacheStats:
+    """Conta, por execucao, se o SQL veio do compiled cache do engine
+
+    DDL e exec_driver_sql tambem nao tem cache key e contam como uncached.
+    """
+    stats = _compiled_cache_stats.get(target)
+    if stats is not None:
+        return stats
+    stats = _compiled_cache_stats[target] = CompiledCacheStats()
+
+    def count(conn, cursor, statement, parameters, context, executemany) -> None:
+        field = _CACHE_RESULTS.get(getattr(context, "cache_hit", None))
+        if field is not None:
+            # sem lock: um incremento perdido entre threads nao muda a taxa
+            setattr(stats, field, getattr(stats, field) + 1)
+
+    event.listen(target, "before_cursor_execute", count)
+    return stats
+
+
+def compiled_cache_stats(target: Engine) -> Optional[CompiledCacheStats]:
+    return _compiled_cache_stats.get(target)
+
+
+class ReplicaSet:
+    """Replicas de leitura em round robin, com health check
+
+    Um erro de conexao numa replica a tira do rodizio por `retry_seconds`; depois disso
+    ela so volta se responder a um SELECT 1. Sem replica saudavel, `pick` devolve None
+    e a leitura vai para o primario.
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        retry_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        # engine -> instante a partir do qual vale tentar de novo
+        self._down: Dict[Engine, float] = {}
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        for replica in self.engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or isinstance(
+            context.sqlalchemy_exception, (exc.OperationalError, exc.InterfaceError)
+        ):
+            self.mark_down(context.engine)
+
+    def mark_down(self, replica: Engine) -> None:
+        with self._lock:
+            if replica not in self._down:
+                logger.warning("Read replica marked down: url=%s", replica.url)
+            self._down[replica] = self.clock() + self.retry_seconds
+
+    def is_healthy(self, replica: Engine) -> bool:
+        return replica not in self._down
+
+    def pick(self) -> Optional[Engine]:
+        for _ in range(len(self.engines)):
+            replica = self.engines[next(self._next) % len(self.engines)]
+            with self._lock:
+                retry_at = self._down.get(replica)
+                if retry_at is None:
+                    return replica
+                if self.clock() < retry_at:
+                    continue
+                # so uma thread testa a replica; as outras seguem pulando ate o resultado
+                self._down[replica] = self.clock() + self.retry_seconds
+            if self._check(replica):
+                return replica
+        return None
+
+    def _check(self, replica: Engine) -> bool:
+        try:
+            with replica.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning("Read replica still down: url=%s, error=%s", replica.url, e)
+            return False
+        with self._lock:
+            self._down.pop(replica, None)
+        logger.info("Read replica back in rotation: url=%s", replica.url)
+        return True
+
+
+class RoutingSession(Session):
+    """Session que manda as leituras para uma replica
+
+    Fica no primario: flush, DML, SELECT ... FOR UPDATE, tudo depois da primeira escrita
+    da sessao (read-your-writes) e sessoes abertas com use_primary=True. A replica e
+    escolhida uma vez por sessao, entao a sessao usa no maximo uma conexao de replica.
+    """
+
+    def __init__(
+        self, *args, replicas: Optional[ReplicaSet] = None, use_primary: bool = False, **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.use_primary = use_primary
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas is not None and not self.use_primary:
+            if self._flushing or (clause is not None and not _is_read(clause)):
+                self.use_primary = True
+            elif clause is not None:
+                if self._replica is None or not self.replicas.is_healthy(self._replica):
+                    self._replica = self.replicas.pick()
+                if self._replica is not None:
+                    return self._replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def _is_read(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def engine_options(url: str, config: Settings, pool_class=QueuePool) -> Dict[str, Any]:
+    """Argumentos de create_engine a partir das configuracoes DB_POOL_*
+
+    DB_POOL_MODE=null usa NullPool (uma conexao por checkout) para rodar atras de um
+    pooler externo como o PgBouncer; o pool de verdade fica nele.
+    """
+    if config.db_pool_mode == "null":
+        options: Dict[str, Any] = {"poolclass": NullPool}
+    elif config.db_pool_mode == "queue":
+        options = {
+            "poolclass": pool_class,
+            "pool_size": config.db_pool_size,
+            "max_overflow": config.db_max_overflow,
+            "pool_timeout": config.db_pool_timeout_seconds,
+            "pool_recycle": config.db_pool_recycle_seconds,
+            "pool_use_lifo": config.db_pool_use_lifo,
+            # um round trip a mais por checkout; com pool_recycle abaixo do timeout do
+            # servidor da para desligar
+            "pool_pre_ping": config.db_pool_pre_ping,
+        }
+    else:
+        raise ValueError(f"Unknown database pool mode '{config.db_pool_mode}'")
+
+    options["query_cache_size"] = config.db_compiled_cache_size
+    connect_args = _connect_args(make_url(url).get_driver_name(), config)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def prepared_statement_cache_size(config: Settings) -> int:
+    # o PgBouncer em modo transaction nao preserva prepared statements entre queries
+    if config.db_pool_mode == "null":
+        return 0
+    return config.db_prepared_statement_cache_size
+
+
+def _connect_args(driver: str, config: Settings) -> Dict[str, Any]:
+    connect_args: Dict[str, Any] = {}
+    timeout = config.db_statement_timeout_ms
+    prepared = prepared_statement_cache_size(config)
+    if driver in ("psycopg2", "psycopg"):
+        if timeout > 0:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+        # o psycopg 3 prepara no servidor as queries repetidas na conexao (a partir da
+        # quinta execucao); o psycopg2 nao tem prepared statements no servidor
+        if driver == "psycopg" and prepared == 0:
+            connect_args["prepare_threshold"] = None
+    elif driver == "asyncpg":
+        if timeout > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+        if prepared == 0:
+            connect_args["statement_cache_size"] = 0
+    return connect_args
+
+
+def _create_engine(url: str) -> Engine:
+    created = create_engine(url, **engine_options(url, settings))
+    track_compiled_cache(created)
+    track_pool(created)
+    return created
+
+
+engine = _create_engine(settings.db_url)
+
+replica_engines = [_create_engine(url) for url in settings.db_replica_urls]
+
+replicas = (
+    ReplicaSet(replica_engines, retry_seconds=settings.db_replica_retry_seconds)
+    if replica_engines
+    else None
 )
 
+# sempre no primario (fila de jobs, scripts)
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
 )
 
+# requests da API: leituras nas replicas quando DB_REPLICA_URLS esta configurado
+RoutingSessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replicas,
+)
+
+
+def _reset_pools_after_fork() -> None:
+    """Conexoes herdadas num fork pertencem ao pai: o filho comeca com pools vazios"""
+    engines = [engine, *replica_engines]
+    if get_async_engine.cache_info().currsize:
+        engines.append(get_async_engine().sync_engine)
+    if get_async_replica_engines.cache_info().currsize:
+        engines.extend(replica.sync_engine for replica in get_async_replica_engines())
+    for target in engines:
+        target.dispose(close=False)
+
+
+def warm_up_pool(target: Engine, connections: int) -> None:
+    """Abre `connections` conexoes ao mesmo tempo e devolve ao pool"""
+    with ExitStack() as stack:
+        for _ in range(connections):
+            stack.enter_context(target.connect())
+
+
+async def warm_up_async_pool(target: "AsyncEngine", connections: int) -> None:
+    opened = await asyncio.gather(
+        *(target.connect().start() for _ in range(connections)), return_exceptions=True
+    )
+    for conn in opened:
+        if not isinstance(conn, BaseException):
+            await conn.close()
+    errors = [conn for conn in opened if isinstance(conn, BaseException)]
+    if errors:
+        raise errors[0]
+
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+def warmup_connections() -> int:
+    """Conexoes abertas no startup: pool_size, ou nenhuma sem warm-up / com NullPool"""
+    if not settings.db_pool_warmup or settings.db_pool_mode != "queue":
+        return 0
+    return settings.db_pool_size
+
+
+def get_db(use_primary: bool = False) -> Generator[Session, None, None]:
+    db = RoutingSessionLocal(use_primary=use_primary)
     try:
         yield db
     finally:
         db.close()
+
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Converte a url sync (psycopg2) para o driver async equivalente"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _create_async_engine(url: str) -> "AsyncEngine":
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    parsed = make_url(url)
+    if parsed.get_driver_name() == "asyncpg":
+        # cache de prepared statements do SQLAlchemy por conexao asyncpg
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(prepared_statement_cache_size(settings))}
+        )
+    created = create_async_engine(
+        parsed, **engine_options(url, settings, pool_class=AsyncAdaptedQueuePool)
+    )
+    track_compiled_cache(created.sync_engine)
+    track_pool(created.sync_engine)
+    return created
+
+
+@lru_cache()
+def get_async_engine() -> "AsyncEngine":
+    """Engine async criada sob demanda, so exige o asyncpg quando o modo async esta ativo"""
+    return _create_async_engine(settings.async_db_url or to_async_url(settings.db_url))
+
+
+@lru_cache()
+def get_async_replica_engines() -> List["AsyncEngine"]:
+    return [_create_async_engine(to_async_url(url)) for url in settings.db_replica_urls]
+
+
+@lru_cache()
+def get_async_replicas() -> Optional[ReplicaSet]:
+    # o roteamento roda na Session sync por baixo da AsyncSession, com as sync_engine
+    engines = [replica.sync_engine for replica in get_async_replica_engines()]
+    if not engines:
+        return None
+    return ReplicaSet(engines, retry_seconds=settings.db_replica_retry_seconds)
+
+
+@lru_cache()
+def get_async_sessionmaker() -> "async_sessionmaker":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replicas=get_async_replicas(),
+    )
+
+
+if hasattr(os, "register_at_fork"):
+    # python -m app usa spawn; isto cobre servidores que fazem fork depois do import
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+async def get_async_db(use_primary: bool = False) -> AsyncGenerator["AsyncSession", None]:
+    async with get_async_sessionmaker()(use_primary=use_primary) as db:
+        yield db
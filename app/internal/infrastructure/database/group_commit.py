@@ -0,0 +1,235 @@
+"""group commit: escritas concorrentes de requests diferentes numa unica transacao"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.internal.core.domain.exceptions import DomainException
+from app.internal.core.domain.user import (
+    PageVersion,
+    User,
+    UserRepository,
+    UserSearch,
+    UserVersion,
+)
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.config.logging import get_logger
+
+logger = get_logger("infrastructure.group_commit")
+
+T = TypeVar("T")
+Write = Callable[[UserRepository], T]
+_Item = Tuple[Write, Future]
+
+_STOP = object()
+
+
+@dataclass
+class GroupCommitStats:
+    writes: int = 0
+    commits: int = 0
+    fallbacks: int = 0  # lotes desfeitos por erro do banco e refeitos uma escrita por vez
+
+
+class GroupCommitter:
+    """Uma thread junta as escritas que chegam dentro de `window` segundos e faz um so commit
+
+    Cada escrita espera no maximo a janela mais o commit do lote. Erros de dominio (email
+    repetido, usuario inexistente) nao abortam a transacao e voltam so para quem escreveu;
+    um erro do banco desfaz o lote, que e refeito com uma transacao por escrita.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        window: float = 0.002,
+        max_batch: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = GroupCommitStats()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, write: Write) -> T:
+        """Executa `write(repo)` no proximo lote e bloqueia ate o commit dele"""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((write, future))
+        return future.result()
+
+    def _ensure_started(self) -> None:
+        # thread criada na primeira escrita: ja no processo do worker, depois do fork
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Grava o que ja esta na fila e encerra a thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _collect(self, first: _Item) -> Tuple[List[_Item], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, batch: List[_Item]) -> None:
+        results = []
+        try:
+            with self._repository() as repo:
+                with repo.transaction():
+                    for write, future in batch:
+                        try:
+                            results.append((future, write(repo), None))
+                        except DomainException as e:
+                            # ex: DuplicateEmailError no patch vem de um IntegrityError, que
+                            # no postgres ja abortou a transacao do lote
+                            if repo.rollback_only:
+                                raise
+                            results.append((future, None, e))
+        except Exception as e:
+            logger.warning(
+                "Group commit failed, retrying writes one by one: size=%s, error=%s",
+                len(batch),
+                e,
+            )
+            self.stats.fallbacks += 1
+            for write, future in batch:
+                self._commit_one(write, future)
+            return
+
+        self.stats.commits += 1
+        self.stats.writes += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _commit_one(self, write: Write, future: Future) -> None:
+        try:
+            with self._repository() as repo:
+                with repo.transaction():
+                    result = write(repo)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self.stats.commits += 1
+        self.stats.writes += 1
+        future.set_result(result)
+
+    @contextmanager
+    def _repository(self) -> Iterator[UserRepoImpl]:
+        with self.session_factory() as db:
+            yield UserRepoImpl(db)
+
+
+class GroupCommitUserRepository(UserRepository):
+    """Decorator de UserRepository: escritas unitarias vao para o GroupCommitter
+
+    Leituras usam a sessao da request. Dentro de transaction() o chamador ja agrupa as
+    proprias escritas, entao elas vao direto para o repositorio da request: e o caso de
+    POST /users, cujo job do outbox precisa do mesmo commit, que por isso nunca e agrupado.
+    """
+
+    def __init__(self, repo: UserRepository, committer: GroupCommitter):
+        self.repo = repo
+        self.committer = committer
+        self._in_transaction = False
+
+    def _write(self, write: Write) -> T:
+        if self._in_transaction:
+            return write(self.repo)
+        return self.committer.submit(write)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if self._in_transaction:
+            yield
+            return
+        self._in_transaction = True
+        try:
+            with self.repo.transaction():
+                yield
+        finally:
+            self._in_transaction = False
+
+    def create(self, user: User) -> User:
+        return self._write(lambda repo: repo.create(user))
+
+    def create_many(self, users: List[User]) -> List[User]:
+        # ja e um lote numa transacao
+        return self.repo.create_many(users)
+
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        return self.repo.list(limit=limit, after=after)
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[User]:
+        return self.repo.iter_all(batch_size=batch_size)
+
+    def search(self, criteria: UserSearch, limit: int, after: Optional[int] = None) -> List[User]:
+        return self.repo.search(criteria, limit=limit, after=after)
+
+    def get_by_id(self, user_id: int) -> Optional[User]:
+        return self.repo.get_by_id(user_id)
+
+    def get_many(self, user_ids: List[int]) -> List[User]:
+        return self.repo.get_many(user_ids)
+
+    def get_version(self, user_id: int) -> Optional[UserVersion]:
+        return self.repo.get_version(user_id)
+
+    def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        return self.repo.page_version(limit, after=after)
+
+    def update(self, user: User) -> User:
+        return self._write(lambda repo: repo.update(user))
+
+    def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        return self._write(
+            lambda repo: repo.patch(user_id, name=name, email=email, expected=expected)
+        )
+
+    def delete(self, user_id: int) -> bool:
+        return self._write(lambda repo: repo.delete(user_id))
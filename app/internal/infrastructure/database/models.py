@@ -1,5 +1,5 @@
 """ sqlalchemy models """
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, func
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -11,12 +11,84 @@ class UserModel(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(60), nullable=False)
-    email = Column(
-        String(120),
-        unique=True,
-        nullable=False,
+    email = Column(String(120), nullable=False)
+    created_at = Column(
+        DateTime,
+        default=datetime.utcnow,
         index=True,
     )
+    updated_at = Column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
+    # soft delete: a linha some das leituras e o job de arquivamento a move para users_archive
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # email unico so entre os ativos: o soft delete libera o email na hora
+        Index(
+            "ix_users_email",
+            email,
+            unique=True,
+            postgresql_where=deleted_at.is_(None),
+            sqlite_where=deleted_at.is_(None),
+        ),
+        # indices da busca (GET /users/search); a migration c3a8d5e1f2b4 cria os mesmos
+        Index("ix_users_email_lower", func.lower(email)),
+        # text_pattern_ops: LIKE 'prefixo%' usa o indice em qualquer collation
+        Index(
+            "ix_users_name_lower",
+            func.lower(name).label("name_lower"),
+            postgresql_ops={"name_lower": "text_pattern_ops"},
+        ),
+        # trigramas para busca por substring; exige a extensao pg_trgm
+        Index(
+            "ix_users_name_trgm",
+            func.lower(name).label("name_lower"),
+            postgresql_using="gin",
+            postgresql_ops={"name_lower": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # so as linhas removidas, que o arquivamento le por deleted_at
+        Index(
+            "ix_users_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.isnot(None),
+            sqlite_where=deleted_at.isnot(None),
+        ),
+        # sem AUTOINCREMENT o SQLite reusa o maior id depois do arquivamento, e o id novo
+        # colidiria com o do usuario arquivado (no Postgres a sequence nunca volta)
+        {"sqlite_autoincrement": True},
+    )
+
+
+class UserArchiveModel(Base):
+    """Usuarios removidos (ou inativos) tirados da tabela users; o email nao e unico aqui"""
+
+    __tablename__ = "users_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(60), nullable=False)
+    email = Column(String(120), nullable=False, index=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class JobModel(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
     created_at = Column(
         DateTime,
         default=datetime.utcnow,
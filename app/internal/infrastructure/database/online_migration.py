@@ -0,0 +1,490 @@
+"""migrations online: DDL com lock_timeout e retry, indices CONCURRENTLY e backfill em lotes
+
+Uso dentro das migrations:
+
+    from app.internal.infrastructure.database import online_migration as online
+
+    online.create_index(op, "ix_users_deleted_at", "users", ["deleted_at"],
+                        where="deleted_at IS NOT NULL")
+    online.backfill(op, "users", "email_domain = lower(split_part(email, '@', 2))",
+                    where="email_domain IS NULL")
+
+e para aplicar, com retry quando um lock nao sai dentro do lock_timeout:
+
+    python -m app.internal.infrastructure.database.online_migration upgrade head
+"""
+import argparse
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from app.config.config import get_settings
+from app.config.logging import get_logger
+
+logger = get_logger("infrastructure.online_migration")
+
+T = TypeVar("T")
+
+# SQLSTATE lock_not_available (lock_timeout) e query_canceled (statement_timeout)
+LOCK_NOT_AVAILABLE = "55P03"
+QUERY_CANCELED = "57014"
+
+
+def is_lock_timeout(error: BaseException) -> bool:
+    """O DDL desistiu de esperar um lock: seguro refazer, a transacao foi desfeita"""
+    orig = getattr(error, "orig", error)
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return sqlstate == LOCK_NOT_AVAILABLE
+
+
+def run_with_retries(
+    fn: Callable[[], T],
+    retries: int,
+    backoff: float,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """Refaz `fn` quando ela falha por lock_timeout, com backoff exponencial e jitter
+
+    Esperar o lock com timeout curto e tentar de novo nao enfileira o trafego atras do DDL,
+    como aconteceria com um ALTER TABLE esperando indefinidamente.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except DBAPIError as e:
+            attempt += 1
+            if not is_lock_timeout(e) or attempt > retries:
+                raise
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+            logger.warning(
+                "Migration lock timeout, retrying: attempt=%s, retry_in=%.1fs", attempt, delay
+            )
+            sleep(delay)
+
+
+def set_timeouts(conn: Connection, lock_timeout_ms: int, statement_timeout_ms: int) -> None:
+    """lock_timeout/statement_timeout da sessao (so Postgres); 0 = sem limite"""
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text(f"SET lock_timeout = {int(lock_timeout_ms)}"))
+    conn.execute(text(f"SET statement_timeout = {int(statement_timeout_ms)}"))
+
+
+@contextmanager
+def _no_statement_timeout(conn: Connection) -> Iterator[None]:
+    # build de indice e longo por natureza; o lock_timeout continua valendo
+    previous = conn.execute(text("SHOW statement_timeout")).scalar_one()
+    conn.execute(text("SET statement_timeout = 0"))
+    try:
+        yield
+    finally:
+        conn.execute(
+            text("SELECT set_config('statement_timeout', :value, false)"), {"value": previous}
+        )
+
+
+def create_index_sql(
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    using: Optional[str] = None,
+    concurrently: bool = True,
+    only: bool = False,
+) -> str:
+    parts = ["CREATE", "UNIQUE" if unique else None, "INDEX"]
+    parts += ["CONCURRENTLY" if concurrently else None, "IF NOT EXISTS", name, "ON"]
+    parts += ["ONLY" if only else None, table, f"USING {using}" if using else None]
+    parts.append(f"({', '.join(columns)})")
+    if where:
+        parts.append(f"WHERE {where}")
+    return " ".join(part for part in parts if part)
+
+
+def _is_partitioned(conn: Connection, table: str) -> bool:
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = CAST(:table AS regclass)"), {"table": table}
+    ).scalar_one()
+    return relkind == "p"
+
+
+def _partitions(conn: Connection, table: str) -> List[str]:
+    return list(
+        conn.execute(
+            text(
+                "SELECT CAST(inhrelid AS regclass)::text FROM pg_inherits "
+                "WHERE inhparent = CAST(:table AS regclass) ORDER BY 1"
+            ),
+            {"table": table},
+        ).scalars()
+    )
+
+
+def _partition_key(conn: Connection, table: str) -> List[Optional[str]]:
+    """Colunas da chave de particionamento; None para uma chave que e expressao"""
+    return list(
+        conn.execute(
+            text(
+                "SELECT a.attname FROM pg_partitioned_table p "
+                "CROSS JOIN LATERAL unnest(p.partattrs::int2[]) WITH ORDINALITY AS k(attnum, n) "
+                "LEFT JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = k.attnum "
+                "WHERE p.partrelid = CAST(:table AS regclass) ORDER BY k.n"
+            ),
+            {"table": table},
+        ).scalars()
+    )
+
+
+def _column_name(column: str) -> Optional[str]:
+    # "email" ou "email text_pattern_ops" sao a coluna; "lower(email)" e expressao
+    name = column.split()[0] if column.strip() else ""
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.lower() if name.isidentifier() else None
+
+
+def missing_partition_key(
+    columns: Sequence[str], partition_key: Sequence[Optional[str]]
+) -> List[str]:
+    """Colunas da chave de particionamento fora de `columns`
+
+    Um indice unico numa tabela particionada precisa conter toda a chave (como coluna, nao
+    expressao), senao o Postgres recusa o indice do pai.
+    """
+    names = {_column_name(column) for column in columns} - {None}
+    return [key or "<expression>" for key in partition_key if key is None or key not in names]
+
+
+def _drop_invalid_index(conn: Connection, name: str, table: str) -> None:
+    """Um CONCURRENTLY interrompido deixa o indice INVALID: ele e refeito do zero
+
+    O nome so e unico dentro do schema, entao a busca fica no schema de `table`.
+    """
+    invalid = conn.execute(
+        text(
+            "SELECT quote_ident(n.nspname) || '.' || quote_ident(c.relname) "
+            "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = :name AND NOT i.indisvalid AND c.relkind = 'i' "
+            "AND c.relnamespace = "
+            "(SELECT relnamespace FROM pg_class WHERE oid = CAST(:table AS regclass))"
+        ),
+        {"name": name, "table": table},
+    ).scalar()
+    if invalid is not None:
+        logger.warning("Dropping invalid index left by an interrupted build: index=%s", invalid)
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {invalid}"))
+
+
+def create_index(
+    op,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    unique: bool = False,
+    where: Optional[str] = None,
+    using: Optional[str] = None,
+) -> None:
+    """CREATE INDEX CONCURRENTLY fora da transacao da migration (no Postgres)
+
+    `columns` sao expressoes SQL ("email", "lower(name)"). Tabela particionada nao aceita
+    CONCURRENTLY: o indice nasce no pai com ON ONLY, cada particao ganha o seu com
+    CONCURRENTLY e eles sao anexados ao do pai; se for `unique`, as colunas precisam incluir
+    a chave de particionamento (ValueError antes de qualquer DDL). Nos demais bancos e um
+    op.create_index.
+    """
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        import sqlalchemy as sa
+
+        op.create_index(
+            name,
+            table,
+            [sa.text(column) for column in columns],
+            unique=unique,
+            sqlite_where=sa.text(where) if where else None,
+        )
+        return
+
+    partitioned = _is_partitioned(conn, table)
+    if partitioned and unique:
+        missing = missing_partition_key(columns, _partition_key(conn, table))
+        if missing:
+            raise ValueError(
+                f"Unique index {name} on partitioned table {table} must include the partition "
+                f"key: missing {', '.join(missing)}"
+            )
+
+    started = time.monotonic()
+    with op.get_context().autocommit_block():
+        with _no_statement_timeout(conn):
+            if not partitioned:
+                _drop_invalid_index(conn, name, table)
+                conn.execute(text(create_index_sql(name, table, columns, unique, where, using)))
+            else:
+                # ON ONLY: so o catalogo do pai, fica invalido ate todas as particoes anexarem
+                conn.execute(
+                    text(
+                        create_index_sql(
+                            name,
+                            table,
+                            columns,
+                            unique,
+                            where,
+                            using,
+                            concurrently=False,
+                            only=True,
+                        )
+                    )
+                )
+                partitions = _partitions(conn, table)
+                for index, partition in enumerate(partitions, 1):
+                    child = f"{partition}_{name}"[:63]
+                    _drop_invalid_index(conn, child, partition)
+                    conn.execute(
+                        text(create_index_sql(child, partition, columns, unique, where, using))
+                    )
+                    conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+                    logger.info(
+                        "Index build progress: index=%s, partitions=%s/%s",
+                        name,
+                        index,
+                        len(partitions),
+                    )
+    logger.info("Index created: index=%s, seconds=%.1f", name, time.monotonic() - started)
+
+
+def drop_index(op, name: str, table: str) -> None:
+    """DROP INDEX CONCURRENTLY no Postgres (indice de tabela particionada: DROP comum)"""
+    conn = op.get_bind()
+    if conn.dialect.name != "postgresql":
+        op.drop_index(name, table_name=table)
+        return
+    with op.get_context().autocommit_block():
+        concurrently = "" if _is_partitioned(conn, table) else " CONCURRENTLY"
+        conn.execute(text(f"DROP INDEX{concurrently} IF EXISTS {name}"))
+
+
+class SimulatedReplica:
+    """Replica de mentira que aplica `rows_per_second` linhas por segundo
+
+    Cada lote escrito entra no backlog; o atraso e o backlog que ainda falta aplicar. Serve
+    para ver o backfill desacelerar localmente, sem uma replica de verdade.
+    """
+
+    def __init__(self, rows_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.rows_per_second = rows_per_second
+        self.clock = clock
+        self._backlog = 0.0
+        self._at = clock()
+
+    def _drain(self) -> None:
+        now = self.clock()
+        self._backlog = max(0.0, self._backlog - (now - self._at) * self.rows_per_second)
+        self._at = now
+
+    def wrote(self, rows: int) -> None:
+        self._drain()
+        self._backlog += rows
+
+    def lag(self) -> float:
+        self._drain()
+        return self._backlog / self.rows_per_second
+
+
+def postgres_replica_lag(conn: Connection) -> float:
+    """Maior replay_lag entre as replicas conectadas ao primario, em segundos"""
+    return float(
+        conn.execute(
+            text("SELECT coalesce(extract(epoch FROM max(replay_lag)), 0) FROM pg_stat_replication")
+        ).scalar_one()
+    )
+
+
+@dataclass
+class BackfillProgress:
+    table: str
+    max_id: int = 0
+    last_id: int = 0
+    rows: int = 0  # linhas atualizadas
+    batches: int = 0
+    lag_wait_seconds: float = 0.0
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.last_id / self.max_id if self.max_id else 100.0
+
+
+class Backfill:
+    """UPDATE em lotes pela PK (id), cada lote na propria transacao
+
+    O ritmo fica abaixo de `rows_per_second` (0 = sem limite) e para enquanto a replica
+    estiver mais de `max_lag` segundos atras. Rode em autocommit (o helper backfill() usa o
+    autocommit_block do alembic): uma transacao unica seguraria os locks de todas as linhas.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        table: str,
+        set_clause: str,
+        where: Optional[str] = None,
+        batch_size: int = 1000,
+        rows_per_second: float = 0.0,
+        max_lag: float = 5.0,
+        lag: Optional[Callable[[], float]] = None,
+        replica: Optional[SimulatedReplica] = None,
+        report_every: float = 5.0,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.conn = conn
+        self.table = table
+        self.set_clause = set_clause
+        self.where = where
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.max_lag = max_lag
+        self.replica = replica
+        if lag is None and replica is not None:
+            lag = replica.lag
+        self.lag = lag
+        self.report_every = report_every
+        self.sleep = sleep
+        self.clock = clock
+
+    def run(self) -> BackfillProgress:
+        progress = BackfillProgress(table=self.table)
+        progress.max_id = self.conn.execute(
+            text(f"SELECT coalesce(max(id), 0) FROM {self.table}")
+        ).scalar_one()
+        update = f"UPDATE {self.table} SET {self.set_clause} WHERE id > :after AND id <= :until"
+        if self.where:
+            update += f" AND ({self.where})"
+        next_id = text(
+            f"SELECT max(id) FROM (SELECT id FROM {self.table} WHERE id > :after "
+            f"ORDER BY id LIMIT :limit) AS batch"
+        )
+
+        started = reported = self.clock()
+        while progress.last_id < progress.max_id:
+            batch_started = self.clock()
+            until = self.conn.execute(
+                next_id, {"after": progress.last_id, "limit": self.batch_size}
+            ).scalar()
+            if until is None:
+                break
+            rows = self.conn.execute(
+                text(update), {"after": progress.last_id, "until": until}
+            ).rowcount
+            progress.last_id = until
+            progress.rows += max(rows, 0)
+            progress.batches += 1
+            if self.replica is not None:
+                self.replica.wrote(rows)
+
+            self._throttle(rows, self.clock() - batch_started)
+            self._wait_for_replica(progress)
+            if self.clock() - reported >= self.report_every:
+                reported = self.clock()
+                self._report(progress, reported - started)
+
+        self._report(progress, self.clock() - started)
+        return progress
+
+    def _throttle(self, rows: int, elapsed: float) -> None:
+        if self.rows_per_second > 0 and rows > 0:
+            remaining = rows / self.rows_per_second - elapsed
+            if remaining > 0:
+                self.sleep(remaining)
+
+    def _wait_for_replica(self, progress: BackfillProgress) -> None:
+        if self.lag is None:
+            return
+        waited = 0.0
+        lag = self.lag()
+        while lag > self.max_lag:
+            if waited == 0.0:
+                logger.info("Backfill paused for replica lag: table=%s, lag=%.1fs", self.table, lag)
+            pause = min(1.0, lag - self.max_lag)
+            self.sleep(pause)
+            waited += pause
+            lag = self.lag()
+        progress.lag_wait_seconds += waited
+
+    def _report(self, progress: BackfillProgress, elapsed: float) -> None:
+        rate = progress.rows / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            "Backfill progress: table=%s, ids=%s/%s (%.1f%%), rows=%s, rate=%.0f rows/s, "
+            "lag_wait=%.1fs",
+            self.table,
+            progress.last_id,
+            progress.max_id,
+            progress.percent,
+            progress.rows,
+            rate,
+            progress.lag_wait_seconds,
+        )
+
+
+def backfill(
+    op, table: str, set_clause: str, where: Optional[str] = None, **options
+) -> BackfillProgress:
+    """Backfill dentro de uma migration, com os limites de MIGRATION_BACKFILL_*"""
+    settings = get_settings()
+    options.setdefault("batch_size", settings.migration_backfill_batch_size)
+    options.setdefault("rows_per_second", settings.migration_backfill_rows_per_second)
+    options.setdefault("max_lag", settings.migration_max_replica_lag_seconds)
+    conn = op.get_bind()
+    if "lag" not in options and "replica" not in options:
+        if settings.migration_simulated_replica_rows_per_second > 0:
+            options["replica"] = SimulatedReplica(
+                settings.migration_simulated_replica_rows_per_second
+            )
+        elif conn.dialect.name == "postgresql":
+            options["lag"] = lambda: postgres_replica_lag(conn)
+    with op.get_context().autocommit_block():
+        return Backfill(conn, table, set_clause, where=where, **options).run()
+
+
+def upgrade(target: str = "head", config_file: str = "alembic.ini") -> None:
+    """alembic upgrade com retry por lock_timeout; como cada migration tem a propria
+    transacao, uma nova tentativa continua da migration que falhou"""
+    from alembic import command
+    from alembic.config import Config
+
+    settings = get_settings()
+    config = Config(config_file)
+    run_with_retries(
+        lambda: command.upgrade(config, target),
+        retries=settings.migration_retries,
+        backoff=settings.migration_retry_backoff_seconds,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lock-safe alembic upgrade")
+    parser.add_argument("command", choices=["upgrade"])
+    parser.add_argument("target", nargs="?", default="head")
+    parser.add_argument("-c", "--config", default="alembic.ini")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    upgrade(args.target, args.config)
+    logger.info(
+        "Online migration finished: target=%s, seconds=%.1f",
+        args.target,
+        time.monotonic() - started,
+    )
+
+
+if __name__ == "__main__":
+    main()
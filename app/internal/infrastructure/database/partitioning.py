@@ -0,0 +1,159 @@
+"""particionamento da tabela users no Postgres: hash ou range em id
+
+A chave de particao e o id porque e por ele que o repositorio le. O que cada layout poda:
+
+- hash: so igualdade (get por id, get_many com a lista de ids literal). Uma pagina por keyset
+  (id > :after ORDER BY id LIMIT n) le todas as particoes e faz merge do ORDER BY;
+- range: igualdade e tambem as paginas por keyset, que comecam na particao de :after.
+
+Para uma carga com muito GET /users paginado, range e o layout certo; hash so distribui melhor
+as escritas (ids novos caem sempre na ultima faixa do range).
+
+No Postgres um indice unico de tabela particionada precisa incluir a chave de particao, entao
+a unicidade do email fica na tabela user_emails, mantida por triggers:
+
+- INSERT com email repetido e ignorado (a linha nao entra e o RETURNING volta vazio), o mesmo
+  resultado do ON CONFLICT DO NOTHING do repositorio;
+- UPDATE para um email em uso falha com unique_violation na constraint ix_users_email, que
+  is_duplicate_email ja reconhece;
+- soft delete (deleted_at preenchido) e DELETE (arquivamento) liberam o email; o trigger do
+  soft delete vem da migration d9e2b4f6a8c1, que cria a coluna deleted_at.
+
+Triggers BEFORE ROW em tabela particionada exigem Postgres 13+.
+"""
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config.logging import get_logger
+
+logger = get_logger("infrastructure.partitioning")
+
+NONE = "none"
+HASH = "hash"
+RANGE = "range"
+STRATEGIES = (NONE, HASH, RANGE)
+
+_CREATE_USERS = """
+CREATE TABLE users (
+    id SERIAL NOT NULL,
+    name VARCHAR(60) NOT NULL,
+    email VARCHAR(120) NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE,
+    PRIMARY KEY (id)
+) PARTITION BY {strategy} (id)
+"""
+
+_EMAIL_TRIGGERS = [
+    "CREATE TABLE user_emails (email VARCHAR(120) PRIMARY KEY, user_id INTEGER NOT NULL)",
+    """
+CREATE FUNCTION users_claim_email() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.email = OLD.email THEN
+        RETURN NEW;
+    END IF;
+    INSERT INTO user_emails (email, user_id) VALUES (NEW.email, NEW.id) ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        IF TG_OP = 'INSERT' THEN
+            RETURN NULL;
+        END IF;
+        RAISE EXCEPTION 'duplicate key value violates unique constraint "ix_users_email"'
+            USING ERRCODE = 'unique_violation', CONSTRAINT = 'ix_users_email';
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM user_emails WHERE email = OLD.email;
+    END IF;
+    RETURN NEW;
+END $$
+""",
+    """
+CREATE FUNCTION users_release_email() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM user_emails WHERE email = OLD.email AND user_id = OLD.id;
+    RETURN OLD;
+END $$
+""",
+    "CREATE TRIGGER users_claim_email BEFORE INSERT OR UPDATE OF email ON users "
+    "FOR EACH ROW EXECUTE FUNCTION users_claim_email()",
+    "CREATE TRIGGER users_release_email AFTER DELETE ON users "
+    "FOR EACH ROW EXECUTE FUNCTION users_release_email()",
+]
+
+# o email de um usuario removido fica livre na hora, como no indice unico parcial
+# (WHERE deleted_at IS NULL) da tabela sem particionamento
+SOFT_DELETE_RELEASES_EMAIL = (
+    "CREATE TRIGGER users_soft_delete_release_email AFTER UPDATE OF deleted_at ON users "
+    "FOR EACH ROW WHEN (OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL) "
+    "EXECUTE FUNCTION users_release_email()"
+)
+DROP_SOFT_DELETE_RELEASES_EMAIL = "DROP TRIGGER users_soft_delete_release_email ON users"
+
+DROP_PARTITIONED_USERS = [
+    "DROP TABLE users",
+    "DROP TABLE user_emails",
+    "DROP FUNCTION users_claim_email()",
+    "DROP FUNCTION users_release_email()",
+]
+
+
+def partition_name(index: int) -> str:
+    return f"users_p{index:04d}"
+
+
+def range_partition_ddl(index: int, partition_size: int) -> str:
+    """Particao `index` com os ids [index * size, (index + 1) * size)"""
+    start = index * partition_size
+    return (
+        f"CREATE TABLE {partition_name(index)} PARTITION OF users "
+        f"FOR VALUES FROM ({start}) TO ({start + partition_size})"
+    )
+
+
+def partitioned_users_ddl(strategy: str, partitions: int, partition_size: int) -> List[str]:
+    """DDL da tabela users particionada, das particoes iniciais e da unicidade do email
+
+    hash: `partitions` particoes fixas, sem manutencao. range: `partitions` faixas de
+    `partition_size` ids; ensure_range_partitions cria as proximas antes de os ids chegarem.
+    """
+    if strategy == HASH:
+        ddl = [_CREATE_USERS.format(strategy="HASH")]
+        ddl.extend(
+            f"CREATE TABLE {partition_name(index)} PARTITION OF users "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {index})"
+            for index in range(partitions)
+        )
+    elif strategy == RANGE:
+        ddl = [_CREATE_USERS.format(strategy="RANGE")]
+        ddl.extend(range_partition_ddl(index, partition_size) for index in range(partitions))
+    else:
+        raise ValueError(f"Unknown users partitioning strategy '{strategy}'")
+    return ddl + _EMAIL_TRIGGERS
+
+
+def missing_range_partitions(
+    existing: int, max_id: int, partition_size: int, ahead: int
+) -> List[int]:
+    """Indices das particoes que faltam para cobrir `ahead` faixas alem do maior id"""
+    needed = max_id // partition_size + 1 + ahead
+    return list(range(existing, needed))
+
+
+def ensure_range_partitions(conn: Connection, partition_size: int, ahead: int = 2) -> List[str]:
+    """Cria as particoes range que faltam (particoes nomeadas users_pNNNN em sequencia)
+
+    Sem particao para o id o INSERT falha, entao rode com folga (o job de manutencao roda
+    junto com o arquivamento).
+    """
+    existing = conn.execute(
+        text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'users'::regclass")
+    ).scalar_one()
+    max_id = conn.execute(text("SELECT coalesce(max(id), 0) FROM users")).scalar_one()
+    created = []
+    for index in missing_range_partitions(existing, max_id, partition_size, ahead):
+        conn.execute(text(range_partition_ddl(index, partition_size)))
+        created.append(partition_name(index))
+    if created:
+        logger.info("Users partitions created: partitions=%s", ",".join(created))
+    return created
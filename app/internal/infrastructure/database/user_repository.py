@@ -1,91 +1,466 @@
 """ user repository """
-from typing import List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Select,
+    and_,
+    any_,
+    bindparam,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert, Update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from app.internal.core.domain.user import User, UserRepository
-from app.internal.core.domain.exceptions import DuplicateEmailError, UserNotFoundError
+from app.internal.core.domain.user import (
+    PageVersion,
+    User,
+    UserRepository,
+    UserSearch,
+    UserVersion,
+)
+from app.internal.core.domain.exceptions import (
+    DuplicateEmailError,
+    UserNotFoundError,
+    VersionConflictError,
+)
 from app.internal.infrastructure.database.models import UserModel
 from app.config.logging import get_logger
 
 logger = get_logger("infrastructure.user_repository")
 
+# na ordem dos campos de User: cada linha vira User(*row), sem hidratar um UserModel
+USER_COLUMNS = (UserModel.name, UserModel.email, UserModel.id, UserModel.updated_at)
+
+# ids por query em get_many; limita o array do postgres e fica abaixo do limite de
+# parametros do SQLite
+GET_MANY_CHUNK_SIZE = 1000
+
+# SQLSTATE unique_violation e o indice unico de email (migration c3a8d5e1f2b4)
+UNIQUE_VIOLATION = "23505"
+EMAIL_UNIQUE_INDEX = "ix_users_email"
+# codigo estendido SQLITE_CONSTRAINT_UNIQUE
+_SQLITE_CONSTRAINT_UNIQUE = 2067
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def ignores_duplicates(dialect_name: str) -> bool:
+    """O dialeto tem ON CONFLICT DO NOTHING (email repetido nao falha nem aborta a transacao)"""
+    return dialect_name in _UPSERT_INSERTS
+
+
+def insert_users_statement(dialect_name: str, rows: List[Dict[str, Any]]) -> Insert:
+    """INSERT ... RETURNING name, email, id, updated_at
+
+    No Postgres e no SQLite com ON CONFLICT DO NOTHING, sem alvo: o id vem da sequence, entao o
+    unico conflito possivel e o email, e a tabela particionada (sem indice unico de email, veja
+    partitioning.py) aceita o mesmo statement. Nos demais dialetos e um INSERT comum e o email
+    repetido sai como IntegrityError.
+    """
+    upsert = _UPSERT_INSERTS.get(dialect_name)
+    if upsert is None:
+        return insert(UserModel).values(rows).returning(*USER_COLUMNS)
+    return upsert(UserModel).values(rows).on_conflict_do_nothing().returning(*USER_COLUMNS)
+
+
+# emails ja em uso entre os ativos; create_many nos dialetos sem ON CONFLICT
+EXISTING_EMAILS = select(UserModel.email).where(
+    UserModel.email.in_(bindparam("emails", expanding=True)), UserModel.deleted_at.is_(None)
+)
+
+
+def new_user_rows(rows: List[Dict[str, Any]], existing: Iterable[str]) -> List[Dict[str, Any]]:
+    """Linhas cujo email nao esta em `existing` nem repete uma linha anterior do lote"""
+    seen = set(existing)
+    fresh = []
+    for row in rows:
+        if row["email"] not in seen:
+            seen.add(row["email"])
+            fresh.append(row)
+    return fresh
+
+
+def is_duplicate_email(error: IntegrityError) -> bool:
+    """Violacao do indice unico de email, pelo SQLSTATE e nome da constraint (sem ler a mensagem)
+
+    psycopg2 expoe pgcode/diag; o adaptador asyncpg do SQLAlchemy expoe pgcode e guarda o
+    erro original (com constraint_name) em __cause__.
+    """
+    orig = error.orig
+    sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if sqlstate is not None:
+        constraint = getattr(getattr(orig, "diag", None), "constraint_name", None) or getattr(
+            orig.__cause__, "constraint_name", None
+        )
+        return sqlstate == UNIQUE_VIOLATION and constraint in (None, EMAIL_UNIQUE_INDEX)
+    # o SQLite nao nomeia a constraint; o codigo estendido diz que e de unicidade
+    if getattr(orig, "sqlite_errorcode", None) == _SQLITE_CONSTRAINT_UNIQUE:
+        return "users.email" in str(orig)
+    return False
+
+
+def insert_user_statement(dialect_name: str, user: User) -> Insert:
+    """INSERT de um usuario; com ON CONFLICT o email repetido volta sem linha no RETURNING"""
+    row: Dict[str, Any] = {"name": user.name, "email": user.email}
+    if user.updated_at is not None:
+        row["updated_at"] = user.updated_at
+    return insert_users_statement(dialect_name, [row])
+
+
+def duplicate_on_insert(dialect_name: str, error: IntegrityError) -> bool:
+    """IntegrityError de um INSERT em users causado por email repetido
+
+    Sem ON CONFLICT o driver pode nao dizer qual constraint falhou, mas o id vem da sequence:
+    o unico conflito possivel no INSERT e o email.
+    """
+    return is_duplicate_email(error) or not ignores_duplicates(dialect_name)
+
+
+def row_to_entity(row) -> User:
+    """Linha de USER_COLUMNS -> User"""
+    return User(*row)
+
+
+# linhas com soft delete ficam fora de todas as leituras e escritas ate o arquivamento
+NOT_DELETED = UserModel.deleted_at.is_(None)
+
+
+def select_users() -> Select:
+    """SELECT so das colunas de USER_COLUMNS (sem ORM: sem identity map nem instrumentacao),
+    sem os usuarios removidos"""
+    return select(*USER_COLUMNS).where(NOT_DELETED)
+
+
+# Statements das rotas quentes montados uma vez, com os valores como bindparam: a execucao
+# so passa os parametros, sem reconstruir o statement, e o SQL compilado sai do compiled
+# cache do engine (a chave e a estrutura do statement, nao os valores).
+# Os INSERT ... ON CONFLICT do dialeto nao tem cache key no SQLAlchemy 2.0.23 e sao
+# compilados a cada execucao (contam como "uncached" em CompiledCacheStats).
+GET_BY_ID = select_users().where(UserModel.id == bindparam("user_id"))
+
+GET_VERSION = select(UserModel.id, UserModel.updated_at).where(
+    UserModel.id == bindparam("user_id"), NOT_DELETED
+)
+
+# soft delete: parametros user_id e now; a linha sai de fato no arquivamento
+DELETE_BY_ID = (
+    update(UserModel)
+    .where(UserModel.id == bindparam("user_id"), NOT_DELETED)
+    .values(deleted_at=bindparam("now"))
+    .returning(UserModel.id)
+    .execution_options(synchronize_session=False)
+)
+
+
+@lru_cache()
+def list_statement(paged: bool, limited: bool) -> Select:
+    """Pagina por keyset; parametros `after` (com paged) e `limit` (com limited)"""
+    stmt = select_users().order_by(UserModel.id)
+    if paged:
+        stmt = stmt.where(UserModel.id > bindparam("after"))
+    if limited:
+        stmt = stmt.limit(bindparam("limit"))
+    return stmt
+
+
+def list_params(limit: Optional[int], after: Optional[int]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if after is not None:
+        params["after"] = after
+    if limit is not None:
+        params["limit"] = limit
+    return params
+
+
+@lru_cache()
+def get_many_statement(dialect_name: str) -> Select:
+    """Parametro `ids`. WHERE id = ANY(:ids) no postgres: um unico parametro array, entao o
+    SQL e o mesmo para qualquer quantidade de ids; nos demais um IN expandido na execucao"""
+    if dialect_name == "postgresql":
+        ids = bindparam("ids", type_=postgresql.ARRAY(Integer))
+        return select_users().where(UserModel.id == any_(ids))
+    return select_users().where(UserModel.id.in_(bindparam("ids", expanding=True)))
+
+
+def id_chunks(user_ids: List[int], size: Optional[int] = None) -> Iterator[List[int]]:
+    """Ids sem repeticao (na ordem recebida) em lotes de ate `size` (GET_MANY_CHUNK_SIZE)"""
+    size = size or GET_MANY_CHUNK_SIZE
+    unique = list(dict.fromkeys(user_ids))
+    for start in range(0, len(unique), size):
+        yield unique[start : start + size]
+
+
+@lru_cache()
+def page_version_statement(paged: bool) -> Select:
+    """count/max(id)/max(updated_at) da pagina, lendo so id e updated_at; mesmos parametros
+    de list_statement (limit sempre)"""
+    page = select(UserModel.id, UserModel.updated_at).where(NOT_DELETED).order_by(UserModel.id)
+    if paged:
+        page = page.where(UserModel.id > bindparam("after"))
+    page = page.limit(bindparam("limit")).subquery()
+    return select(func.count(), func.max(page.c.id), func.max(page.c.updated_at))
+
+
+@lru_cache()
+def patch_statement(columns: Tuple[str, ...], versioned: bool) -> Update:
+    """UPDATE ... RETURNING das `columns`; com `versioned` vira um compare-and-set no
+    updated_at. Parametros em patch_params"""
+    stmt = update(UserModel).where(UserModel.id == bindparam("user_id"), NOT_DELETED)
+    if versioned:
+        # linhas sem updated_at tem ETag com 0 micros, que o If-Match traduz para None
+        expected = bindparam("expected_updated_at")
+        stmt = stmt.where(UserModel.updated_at.is_not_distinct_from(expected))
+    # o prefixo evita colidir com os bindparams que o UPDATE gera para as colunas
+    values = {column: bindparam(f"new_{column}") for column in columns}
+    return (
+        stmt.values(**values).returning(*USER_COLUMNS).execution_options(synchronize_session=False)
+    )
+
+
+def patch_params(
+    user_id: int, values: Dict[str, Any], expected: Optional[UserVersion]
+) -> Dict[str, Any]:
+    params = {f"new_{column}": value for column, value in values.items()}
+    params["user_id"] = user_id
+    if expected is not None:
+        params["expected_updated_at"] = expected.updated_at
+    return params
+
+
+def check_expected(user: User, expected: Optional[UserVersion]) -> None:
+    if expected is not None and user.updated_at != expected.updated_at:
+        raise VersionConflictError(f"User with id {user.id} was modified")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _name_filter(dialect_name: str, criteria: UserSearch) -> ColumnElement[bool]:
+    name = criteria.name.lower()
+    contains = criteria.name_match == UserSearch.CONTAINS
+    if dialect_name == "sqlite" and not criteria.name.isascii():
+        # o lower() do SQLite so converte ASCII: com acentos compara o nome como digitado,
+        # e o LIKE ignora so a caixa do ASCII
+        pattern = _escape_like(criteria.name)
+        return UserModel.name.like(f"%{pattern}%" if contains else f"{pattern}%", escape="\\")
+
+    lower_name = func.lower(UserModel.name)
+    if contains:
+        # postgres: ix_users_name_trgm (pg_trgm); nos demais bancos e um scan
+        return lower_name.like(f"%{_escape_like(name)}%", escape="\\")
+    if dialect_name == "sqlite":
+        # o SQLite nao usa indice de expressao com LIKE; o intervalo equivalente usa, e com
+        # o prefixo ASCII o ultimo caractere mais um nunca passa de U+10FFFF
+        upper = name[:-1] + chr(ord(name[-1]) + 1)
+        return and_(lower_name >= name, lower_name < upper)
+    # postgres: ix_users_name_lower (text_pattern_ops)
+    return lower_name.like(f"{_escape_like(name)}%", escape="\\")
+
+
+def search_statement(
+    dialect_name: str, criteria: UserSearch, limit: int, after: Optional[int] = None
+) -> Select:
+    """SELECT da busca, escrito para casar com os indices de UserModel"""
+    stmt = select_users().order_by(UserModel.id).limit(limit)
+    if after is not None:
+        stmt = stmt.where(UserModel.id > after)
+
+    if criteria.email is not None:
+        # ix_users_email_lower
+        stmt = stmt.where(func.lower(UserModel.email) == criteria.email.lower())
+
+    if criteria.name is not None:
+        stmt = stmt.where(_name_filter(dialect_name, criteria))
+
+    # ix_users_created_at
+    if criteria.created_from is not None:
+        stmt = stmt.where(UserModel.created_at >= criteria.created_from)
+    if criteria.created_to is not None:
+        stmt = stmt.where(UserModel.created_at < criteria.created_to)
+    return stmt
+
 
 class UserRepoImpl(UserRepository):
     """user repository implementation"""
 
     def __init__(self, db: Session):
         self.db = db
+        # False dentro de transaction(): as escritas so executam, o commit fica para o fim
+        self.autocommit = True
+        # uma escrita falhou no banco dentro de transaction(): o bloco nao pode mais
+        # ser commitado (no postgres a transacao ja foi abortada)
+        self.rollback_only = False
 
-    def create(self, user: User) -> User:
-        db_user = UserModel(
-            name=user.name,
-            email=user.email,
-        )
-        self.db.add(db_user)
+    def _commit(self) -> None:
+        if self.autocommit:
+            self.db.commit()
+
+    def _rollback(self) -> None:
+        if self.autocommit:
+            self.db.rollback()
+        else:
+            self.rollback_only = True
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if not self.autocommit:  # aninhada: o commit e do bloco de fora
+            yield
+            return
+        self.autocommit = False
+        self.rollback_only = False
         try:
+            yield
             self.db.commit()
-            self.db.refresh(db_user)
-        except IntegrityError as e:
+        except BaseException:
             self.db.rollback()
-            logger.error(
-                f"Database integrity error on user creation: email={user.email}, error={str(e)}"
-            )
-            if "unique constraint" in str(e).lower() or "duplicate key" in str(e).lower():
+            raise
+        finally:
+            self.autocommit = True
+
+    def create(self, user: User) -> User:
+        # com ON CONFLICT DO NOTHING o email repetido nao aborta a transacao nem gera rollback
+        dialect_name = self.db.get_bind().dialect.name
+        stmt = insert_user_statement(dialect_name, user)
+        try:
+            row = self.db.execute(stmt).first()
+            self._commit()
+        except IntegrityError as e:
+            self._rollback()
+            if duplicate_on_insert(dialect_name, e):
                 raise DuplicateEmailError(f"Email '{user.email}' already exists")
+            logger.error("Error on user creation: email=%s, error=%s", user.email, e)
+            raise
+        except Exception as e:
+            self._rollback()
+            logger.error("Error on user creation: email=%s, error=%s", user.email, e)
             raise
 
-        return self._to_entity(db_user)
+        if row is None:
+            raise DuplicateEmailError(f"Email '{user.email}' already exists")
+        return row_to_entity(row)
 
-    def list(self) -> List[User]:
-        users = self.db.query(UserModel).all()
-        return [self._to_entity(user) for user in users]
+    def create_many(self, users: List[User]) -> List[User]:
+        if not users:
+            return []
+        dialect_name = self.db.get_bind().dialect.name
+        rows = [{"name": user.name, "email": user.email} for user in users]
+        try:
+            if not ignores_duplicates(dialect_name):
+                emails = [row["email"] for row in rows]
+                rows = new_user_rows(rows, self.db.scalars(EXISTING_EMAILS, {"emails": emails}))
+            created = []
+            if rows:
+                created = self.db.execute(insert_users_statement(dialect_name, rows)).all()
+            self._commit()
+        except Exception as e:
+            self._rollback()
+            logger.error("Error on bulk user creation: count=%s, error=%s", len(users), e)
+            raise
+
+        return [row_to_entity(row) for row in created]
+
+    def list(self, limit: Optional[int] = None, after: Optional[int] = None) -> List[User]:
+        stmt = list_statement(after is not None, limit is not None)
+        return [row_to_entity(row) for row in self.db.execute(stmt, list_params(limit, after))]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[User]:
+        # yield_per habilita stream_results (server-side cursor no psycopg2),
+        # entao a memoria fica limitada a um lote por vez
+        stmt = select_users().order_by(UserModel.id).execution_options(yield_per=batch_size)
+        for row in self.db.execute(stmt):
+            yield row_to_entity(row)
+
+    def search(self, criteria: UserSearch, limit: int, after: Optional[int] = None) -> List[User]:
+        stmt = search_statement(self.db.get_bind().dialect.name, criteria, limit, after)
+        return [row_to_entity(row) for row in self.db.execute(stmt)]
 
     def get_by_id(self, user_id: int) -> Optional[User]:
-        user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not user:
+        row = self.db.execute(GET_BY_ID, {"user_id": user_id}).first()
+        if row is None:
+            return None
+        return row_to_entity(row)
+
+    def get_many(self, user_ids: List[int]) -> List[User]:
+        stmt = get_many_statement(self.db.get_bind().dialect.name)
+        users: List[User] = []
+        for chunk in id_chunks(user_ids):
+            rows = self.db.execute(stmt, {"ids": chunk})
+            users.extend(row_to_entity(row) for row in rows)
+        return users
+
+    def get_version(self, user_id: int) -> Optional[UserVersion]:
+        row = self.db.execute(GET_VERSION, {"user_id": user_id}).first()
+        if row is None:
             return None
-        return self._to_entity(user)
+        return UserVersion(id=row.id, updated_at=row.updated_at)
+
+    def page_version(self, limit: int, after: Optional[int] = None) -> PageVersion:
+        stmt = page_version_statement(after is not None)
+        count, last_id, updated_at = self.db.execute(stmt, list_params(limit, after)).one()
+        return PageVersion(count=count, last_id=last_id, updated_at=updated_at)
 
     def update(self, user: User) -> User:
-        db_user = self.db.query(UserModel).filter(UserModel.id == user.id).with_for_update().first()
-        if not db_user:
-            logger.error(f"User not found for update: id={user.id}")
-            raise UserNotFoundError(f"User with id {user.id} not found")
+        return self.patch(user.id, name=user.name, email=user.email)
 
-        db_user.name = user.name
-        db_user.email = user.email
+    def patch(
+        self,
+        user_id: int,
+        name: Optional[str] = None,
+        email: Optional[str] = None,
+        expected: Optional[UserVersion] = None,
+    ) -> User:
+        values = {
+            key: value for key, value in (("name", name), ("email", email)) if value is not None
+        }
+        if not values:
+            user = self.get_by_id(user_id)
+            if not user:
+                raise UserNotFoundError(f"User with id {user_id} not found")
+            check_expected(user, expected)
+            return user
 
+        # UPDATE ... RETURNING: uma unica ida ao banco, sem SELECT FOR UPDATE nem refresh
+        stmt = patch_statement(tuple(values), expected is not None)
         try:
-            self.db.commit()
-            self.db.refresh(db_user)
+            row = self.db.execute(stmt, patch_params(user_id, values, expected)).first()
+            self._commit()
         except IntegrityError as e:
-            self.db.rollback()
-            logger.error(f"Database integrity error on user update: id={user.id}, error={str(e)}")
-            if "unique constraint" in str(e).lower() or "duplicate key" in str(e).lower():
-                raise DuplicateEmailError(f"Email '{user.email}' already exists")
+            self._rollback()
+            logger.error("Database integrity error on user update: id=%s, error=%s", user_id, e)
+            if is_duplicate_email(e):
+                raise DuplicateEmailError(f"Email '{email}' already exists")
             raise
 
-        return self._to_entity(db_user)
+        if row is None:
+            if expected is not None and self.get_version(user_id) is not None:
+                logger.warning("Stale version on user update: id=%s", user_id)
+                raise VersionConflictError(f"User with id {user_id} was modified")
+            logger.error("User not found for update: id=%s", user_id)
+            raise UserNotFoundError(f"User with id {user_id} not found")
+        return row_to_entity(row)
 
     def delete(self, user_id: int) -> bool:
-        user = self.db.query(UserModel).filter(UserModel.id == user_id).first()
-        if not user:
-            return False
-
         try:
-            self.db.delete(user)
-            self.db.commit()
+            row = self.db.execute(
+                DELETE_BY_ID, {"user_id": user_id, "now": datetime.utcnow()}
+            ).first()
+            self._commit()
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error deleting user from database: id={user_id}, error={str(e)}")
+            self._rollback()
+            logger.error("Error deleting user from database: id=%s, error=%s", user_id, e)
             raise
 
-        return True
-
-    def _to_entity(self, user: UserModel) -> User:
-        return User(
-            id=user.id,
-            name=user.name,
-            email=user.email,
-        )
+        return row is not None
@@ -1,15 +1,27 @@
 """background tasks for email"""
 import time
+from typing import List, Tuple
 from app.config.logging import get_logger
 
 logger = get_logger("tasks.email")
 
 
 def send_welcome_email(email: str, name: str):
-    logger.info(f"Starting welcome email task: email={email}, name={name}")
+    logger.info("Starting welcome email task: email=%s, name=%s", email, name)
     try:
         time.sleep(2)
-        logger.info(f"Welcome email sent successfully: email={email}")
+        logger.info("Welcome email sent successfully: email=%s", email)
     except Exception as e:
-        logger.error(f"Failed to send welcome email: email={email}, error={str(e)}")
+        logger.error("Failed to send welcome email: email=%s, error=%s", email, e)
+        raise
+
+
+def send_welcome_emails(recipients: List[Tuple[str, str]]):
+    """Envia os emails de boas-vindas de uma importacao em lote numa unica task"""
+    logger.info("Starting welcome email batch: count=%s", len(recipients))
+    try:
+        time.sleep(2)
+        logger.info("Welcome email batch sent successfully: count=%s", len(recipients))
+    except Exception as e:
+        logger.error("Failed to send welcome email batch: count=%s, error=%s", len(recipients), e)
         raise
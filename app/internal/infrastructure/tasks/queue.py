@@ -0,0 +1,262 @@
+"""durable job queue"""
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.internal.infrastructure.database.models import JobModel
+from app.config.config import get_settings
+from app.config.logging import get_logger
+
+logger = get_logger("tasks.queue")
+settings = get_settings()
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+
+@dataclass
+class Job:
+    name: str
+    payload: Dict[str, Any]
+    id: Optional[int] = None
+    status: str = PENDING
+    attempts: int = 0
+    max_attempts: int = 5
+    run_at: datetime = field(default_factory=datetime.utcnow)
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+
+# jobs de backends sem banco esperando o commit da sessao do chamador (Session.info)
+_AFTER_COMMIT = "jobs_after_commit"
+
+
+def _enqueue_committed(session: Session) -> None:
+    for queue, name, payload in session.info.pop(_AFTER_COMMIT, []):
+        queue.enqueue(name, payload)
+
+
+def _discard_rolled_back(session: Session, previous_transaction: Any) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_AFTER_COMMIT, None)
+
+
+class JobQueue(ABC):
+    """Interface para os backends da fila de jobs"""
+
+    def __init__(self, max_attempts: int = 5, lock_timeout: float = 300.0):
+        self.max_attempts = max_attempts
+        self.lock_timeout = lock_timeout
+
+    @abstractmethod
+    def enqueue(self, name: str, payload: Dict[str, Any]) -> Job:
+        """Persiste um job pendente"""
+        pass
+
+    def enqueue_in(self, db: Any, name: str, payload: Dict[str, Any]) -> None:
+        """Grava o job na sessao `db` do chamador (outbox): entra no mesmo commit que as escritas
+        dele, ou sai no rollback. Backends sem banco enfileiram depois do commit de `db`."""
+        session = getattr(db, "sync_session", db)  # AsyncSession
+        session.info.setdefault(_AFTER_COMMIT, []).append((self, name, payload))
+        if not event.contains(session, "after_commit", _enqueue_committed):
+            event.listen(session, "after_commit", _enqueue_committed)
+            event.listen(session, "after_soft_rollback", _discard_rolled_back)
+
+    @abstractmethod
+    def claim(self, limit: int) -> List[Job]:
+        """Reserva ate `limit` jobs prontos (pendentes ou com lock expirado)"""
+        pass
+
+    @abstractmethod
+    def complete(self, job: Job) -> None:
+        """Marca o job como concluido"""
+        pass
+
+    @abstractmethod
+    def fail(self, job: Job, error: str, retry_at: Optional[datetime]) -> None:
+        """Reagenda o job para `retry_at`, ou move para dead-letter se retry_at for None"""
+        pass
+
+    @abstractmethod
+    def depth(self) -> int:
+        """Quantidade de jobs pendentes"""
+        pass
+
+
+class InMemoryJobQueue(JobQueue):
+    """Fila em memoria (testes e execucao local com worker no proprio processo)"""
+
+    def __init__(self, max_attempts: int = 5, lock_timeout: float = 300.0):
+        super().__init__(max_attempts=max_attempts, lock_timeout=lock_timeout)
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def enqueue(self, name: str, payload: Dict[str, Any]) -> Job:
+        job = Job(name=name, payload=payload, id=next(self._ids), max_attempts=self.max_attempts)
+        with self._lock:
+            self.jobs[job.id] = job
+        return replace(job)
+
+    def claim(self, limit: int) -> List[Job]:
+        now = datetime.utcnow()
+        claimed = []
+        with self._lock:
+            for job in sorted(self.jobs.values(), key=lambda j: j.run_at):
+                if len(claimed) >= limit:
+                    break
+                if _is_ready(job, now):
+                    job.status = RUNNING
+                    job.attempts += 1
+                    job.locked_until = now + timedelta(seconds=self.lock_timeout)
+                    claimed.append(replace(job))
+        return claimed
+
+    def complete(self, job: Job) -> None:
+        with self._lock:
+            self.jobs[job.id].status = DONE
+            self.jobs[job.id].locked_until = None
+
+    def fail(self, job: Job, error: str, retry_at: Optional[datetime]) -> None:
+        with self._lock:
+            stored = self.jobs[job.id]
+            stored.last_error = error
+            stored.locked_until = None
+            if retry_at is None:
+                stored.status = DEAD
+            else:
+                stored.status = PENDING
+                stored.run_at = retry_at
+
+    def depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.status == PENDING)
+
+
+def _is_ready(job: Job, now: datetime) -> bool:
+    if job.status == PENDING:
+        return job.run_at <= now
+    return job.status == RUNNING and job.locked_until is not None and job.locked_until < now
+
+
+class DatabaseJobQueue(JobQueue):
+    """Fila persistida na tabela `jobs`; sobrevive a restarts e e compartilhada entre workers"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_attempts: int = 5,
+        lock_timeout: float = 300.0,
+    ):
+        super().__init__(max_attempts=max_attempts, lock_timeout=lock_timeout)
+        self.session_factory = session_factory
+
+    def enqueue(self, name: str, payload: Dict[str, Any]) -> Job:
+        with self.session_factory() as db:
+            db_job = self._new_job(name, payload)
+            db.add(db_job)
+            db.flush()
+            job = self._to_job(db_job)
+            db.commit()
+            return job
+
+    def enqueue_in(self, db: Any, name: str, payload: Dict[str, Any]) -> None:
+        # Session ou AsyncSession: add() nao faz I/O, o INSERT sai no flush/commit do chamador
+        db.add(self._new_job(name, payload))
+
+    def claim(self, limit: int) -> List[Job]:
+        now = datetime.utcnow()
+        ready = or_(
+            and_(JobModel.status == PENDING, JobModel.run_at <= now),
+            and_(JobModel.status == RUNNING, JobModel.locked_until < now),
+        )
+        # SKIP LOCKED deixa varios workers reservarem lotes diferentes em paralelo
+        stmt = (
+            select(JobModel)
+            .where(ready)
+            .order_by(JobModel.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        with self.session_factory() as db:
+            db_jobs = db.scalars(stmt).all()
+            for db_job in db_jobs:
+                db_job.status = RUNNING
+                db_job.attempts += 1
+                db_job.locked_until = now + timedelta(seconds=self.lock_timeout)
+            db.flush()
+            jobs = [self._to_job(db_job) for db_job in db_jobs]
+            db.commit()
+            return jobs
+
+    def complete(self, job: Job) -> None:
+        self._update(job.id, status=DONE, locked_until=None)
+
+    def fail(self, job: Job, error: str, retry_at: Optional[datetime]) -> None:
+        if retry_at is None:
+            self._update(job.id, status=DEAD, locked_until=None, last_error=error)
+        else:
+            self._update(
+                job.id, status=PENDING, locked_until=None, last_error=error, run_at=retry_at
+            )
+
+    def depth(self) -> int:
+        with self.session_factory() as db:
+            return db.scalar(
+                select(func.count()).select_from(JobModel).where(JobModel.status == PENDING)
+            )
+
+    def _update(self, job_id: int, **values: Any) -> None:
+        with self.session_factory() as db:
+            db.execute(update(JobModel).where(JobModel.id == job_id).values(**values))
+            db.commit()
+
+    def _new_job(self, name: str, payload: Dict[str, Any]) -> JobModel:
+        return JobModel(
+            name=name,
+            payload=payload,
+            status=PENDING,
+            attempts=0,
+            max_attempts=self.max_attempts,
+            run_at=datetime.utcnow(),
+        )
+
+    def _to_job(self, db_job: JobModel) -> Job:
+        return Job(
+            id=db_job.id,
+            name=db_job.name,
+            payload=db_job.payload,
+            status=db_job.status,
+            attempts=db_job.attempts,
+            max_attempts=db_job.max_attempts,
+            run_at=db_job.run_at,
+            locked_until=db_job.locked_until,
+            last_error=db_job.last_error,
+        )
+
+
+def create_job_queue(backend: str) -> JobQueue:
+    """Cria a fila configurada: `database` (padrao, duravel) ou `memory`"""
+    if backend == "memory":
+        return InMemoryJobQueue(
+            max_attempts=settings.job_max_attempts,
+            lock_timeout=settings.job_lock_timeout_seconds,
+        )
+    if backend != "database":
+        raise ValueError(f"Unknown job queue backend '{backend}'")
+
+    from app.internal.infrastructure.database.connection import SessionLocal
+
+    return DatabaseJobQueue(
+        SessionLocal,
+        max_attempts=settings.job_max_attempts,
+        lock_timeout=settings.job_lock_timeout_seconds,
+    )
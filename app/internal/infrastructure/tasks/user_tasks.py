@@ -0,0 +1,42 @@
+"""background tasks for the users table (archive and partition upkeep)
+
+    python -m app.internal.infrastructure.tasks.user_tasks
+"""
+from datetime import datetime, timedelta
+
+from app.internal.infrastructure.database import partitioning
+from app.internal.infrastructure.database.archive import ArchiveStats, UserArchiver
+from app.config.config import get_settings
+from app.config.logging import get_logger, setup_logging
+
+logger = get_logger("tasks.users")
+settings = get_settings()
+
+
+def archive_users() -> ArchiveStats:
+    """Arquiva os usuarios removidos (e os inativos, se configurado) e, com particionamento
+    range, cria as proximas particoes"""
+    from app.internal.infrastructure.database.connection import SessionLocal, engine
+
+    if settings.users_partitioning == partitioning.RANGE and engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            partitioning.ensure_range_partitions(conn, settings.users_partition_size)
+
+    now = datetime.utcnow()
+    inactive_before = None
+    if settings.users_archive_inactive_days > 0:
+        inactive_before = now - timedelta(days=settings.users_archive_inactive_days)
+    archiver = UserArchiver(
+        SessionLocal,
+        batch_size=settings.users_archive_batch_size,
+        pause=settings.users_archive_pause_ms / 1000,
+    )
+    return archiver.run(
+        deleted_before=now - timedelta(days=settings.users_archive_after_days),
+        inactive_before=inactive_before,
+    )
+
+
+if __name__ == "__main__":
+    setup_logging()
+    archive_users()
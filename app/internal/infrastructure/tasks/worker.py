@@ -0,0 +1,161 @@
+"""job worker
+
+    python -m app.internal.infrastructure.tasks.worker --concurrency 8
+"""
+import argparse
+import random
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from app.internal.infrastructure.tasks.email_tasks import send_welcome_email, send_welcome_emails
+from app.internal.infrastructure.tasks.queue import Job, JobQueue, create_job_queue
+from app.internal.infrastructure.tasks.user_tasks import archive_users
+from app.config.config import get_settings
+from app.config.logging import get_logger, setup_logging
+
+logger = get_logger("tasks.worker")
+settings = get_settings()
+
+
+def default_handlers() -> Dict[str, Callable[..., None]]:
+    return {
+        "send_welcome_email": send_welcome_email,
+        "send_welcome_emails": send_welcome_emails,
+        "archive_users": archive_users,
+    }
+
+
+class Worker:
+    """Consome a fila em lotes e executa os jobs num pool de threads"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, Callable[..., None]],
+        concurrency: int = 4,
+        batch_size: int = 4,
+        poll_interval: float = 1.0,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="job-worker"
+        )
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Reserva um lote, executa em paralelo e retorna quantos jobs foram processados"""
+        jobs = self.queue.claim(self.batch_size)
+        list(self._executor.map(self._execute, jobs))
+        return len(jobs)
+
+    def run(self) -> None:
+        logger.info(
+            "Job worker started: concurrency=%s, batch_size=%s", self.concurrency, self.batch_size
+        )
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error("Job worker failed to claim jobs: error=%s", e)
+                processed = 0
+            if processed == 0:
+                self._stop.wait(self.poll_interval)
+        self._executor.shutdown(wait=True)
+        logger.info("Job worker stopped")
+
+    def start(self) -> threading.Thread:
+        """Roda o worker numa thread daemon (backend em memoria, no processo da API)"""
+        self._thread = threading.Thread(target=self.run, name="job-worker-loop", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job.name)
+        if handler is None:
+            logger.error("Unknown job moved to dead-letter: id=%s, name=%s", job.id, job.name)
+            self.queue.fail(job, f"Unknown job '{job.name}'", retry_at=None)
+            return
+
+        try:
+            handler(**job.payload)
+        except Exception as e:
+            retry_at = self._retry_at(job)
+            if retry_at is None:
+                logger.error(
+                    "Job moved to dead-letter: id=%s, name=%s, attempts=%s, error=%s",
+                    job.id,
+                    job.name,
+                    job.attempts,
+                    e,
+                )
+            else:
+                logger.warning(
+                    "Job failed, retrying: id=%s, name=%s, attempts=%s, retry_at=%s, error=%s",
+                    job.id,
+                    job.name,
+                    job.attempts,
+                    retry_at.isoformat(),
+                    e,
+                )
+            self.queue.fail(job, str(e), retry_at)
+            return
+
+        self.queue.complete(job)
+
+    def _retry_at(self, job: Job) -> Optional[datetime]:
+        if job.attempts >= job.max_attempts:
+            return None
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+        # jitter evita que jobs que falharam juntos voltem todos no mesmo instante
+        delay *= random.uniform(0.5, 1.0)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+
+def create_worker(queue: JobQueue, concurrency: Optional[int] = None) -> Worker:
+    return Worker(
+        queue,
+        default_handlers(),
+        concurrency=concurrency or settings.job_worker_concurrency,
+        batch_size=settings.job_worker_batch_size,
+        poll_interval=settings.job_worker_poll_interval_seconds,
+        backoff_base=settings.job_retry_backoff_seconds,
+        backoff_max=settings.job_retry_backoff_max_seconds,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shape job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    args = parser.parse_args()
+
+    setup_logging()
+    worker = create_worker(create_job_queue("database"), concurrency=args.concurrency)
+
+    def _shutdown(signum, _frame):
+        logger.info("Job worker received signal %s, finishing current batch", signum)
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""async user handlers (DB_ASYNC=true)"""
+from fastapi import Depends, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, List, Optional
+
+from app.internal.core.services.user_service import AsyncUserService
+from app.internal.core.domain.user import BulkCreateResult, User, UserSearch
+from app.internal.interfaces.dto.user import (
+    BulkImportResponse,
+    UserBatchResponse,
+    UserRequest,
+    UserUpdate,
+    UserResponse,
+)
+from app.internal.interfaces.api.conditional import is_conditional, parse_if_match
+from app.internal.interfaces.api.responses import dump_user
+from app.internal.interfaces.api.idempotency import IDEMPOTENCY_HEADER, IdempotencyStore
+from app.internal.interfaces.api.bulk import BulkImportReport, read_bulk_batches
+from app.internal.interfaces.api.dependencies import (
+    get_async_db_session,
+    get_async_user_service,
+    get_batch_ids,
+    get_idempotency_store,
+    get_job_queue,
+    get_user_search,
+)
+from app.internal.interfaces.api.user_routes import (
+    CREATE_OPERATION,
+    bad_request,
+    batch_response,
+    created_body,
+    domain_errors,
+    page_not_modified,
+    page_response,
+    search_response,
+    user_not_found,
+    user_not_modified,
+    user_response,
+    users_router,
+    welcome_email,
+    welcome_emails,
+)
+from app.internal.infrastructure.tasks.queue import JobQueue
+from app.config.config import get_settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+settings = get_settings()
+
+router = users_router()
+
+
+async def _create_batch(
+    service: AsyncUserService, queue: JobQueue, db: "AsyncSession", users: List[User]
+) -> List[BulkCreateResult]:
+    # os emails de boas-vindas do lote entram no mesmo commit que os usuarios (outbox)
+    async with service.unit_of_work():
+        results = await service.create_many(users)
+        job = welcome_emails(results)
+        if job:
+            queue.enqueue_in(db, *job)
+    return results
+
+
+@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def create(
+    data: UserRequest,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias=IDEMPOTENCY_HEADER,
+        max_length=255,
+        description="Retries devolvem o 201 original",
+    ),
+    service: AsyncUserService = Depends(get_async_user_service),
+    queue: JobQueue = Depends(get_job_queue),
+    db: "AsyncSession" = Depends(get_async_db_session),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
+):
+    payload = data.model_dump()
+    if idempotency_key:
+        replayed = await run_in_threadpool(
+            idempotency.replay, CREATE_OPERATION, idempotency_key, payload
+        )
+        if replayed is not None:
+            return replayed
+
+    with domain_errors("POST /users", email=data.email):
+        # outbox: o job do email e gravado na mesma transacao do usuario, nunca um sem o outro
+        async with service.unit_of_work():
+            created_user = await service.create(User(name=data.name, email=data.email))
+            queue.enqueue_in(db, *welcome_email(created_user))
+
+    if idempotency_key:
+        await run_in_threadpool(
+            idempotency.save,
+            CREATE_OPERATION,
+            idempotency_key,
+            payload,
+            status.HTTP_201_CREATED,
+            created_body(created_user),
+        )
+    return created_user
+
+
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_create(
+    request: Request,
+    service: AsyncUserService = Depends(get_async_user_service),
+    queue: JobQueue = Depends(get_job_queue),
+    db: "AsyncSession" = Depends(get_async_db_session),
+):
+    report = BulkImportReport()
+    try:
+        async for batch in read_bulk_batches(request, settings.users_bulk_batch_size):
+            indexes, users = report.prepare(batch)
+            if users:
+                report.record(indexes, await _create_batch(service, queue, db, users))
+    except ValueError as e:
+        raise bad_request("POST /users/bulk", e)
+
+    return report.response()
+
+
+async def _ndjson(users: AsyncIterable[User]) -> AsyncIterator[bytes]:
+    async for user in users:
+        yield dump_user(user) + b"\n"
+
+
+@router.get("/", response_model=List[UserResponse])
+async def list_all(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.users_page_size, ge=1, le=settings.users_max_page_size),
+    after: Optional[int] = Query(None, ge=0, description="Cursor: id do ultimo usuario recebido"),
+    stream: bool = Query(False, description="Retorna todos os usuarios em NDJSON"),
+    service: AsyncUserService = Depends(get_async_user_service),
+):
+    if stream:
+        users = service.stream(batch_size=settings.users_stream_batch_size)
+        return StreamingResponse(_ndjson(users), media_type="application/x-ndjson")
+
+    # 304 sai de um agregado sobre (id, updated_at) da pagina, sem carregar as linhas
+    if is_conditional(request):
+        version = await service.page_version(limit, after=after)
+        cached = page_not_modified(request, limit, after, version)
+        if cached is not None:
+            return cached
+
+    return page_response(response, await service.list(limit=limit, after=after), limit, after)
+
+
+@router.get("/search", response_model=List[UserResponse])
+async def search(
+    response: Response,
+    criteria: UserSearch = Depends(get_user_search),
+    limit: int = Query(settings.users_page_size, ge=1, le=settings.users_max_page_size),
+    after: Optional[int] = Query(None, ge=0, description="Cursor: id do ultimo usuario recebido"),
+    service: AsyncUserService = Depends(get_async_user_service),
+):
+    with domain_errors("GET /users/search"):
+        users = await service.search(criteria, limit=limit, after=after)
+    return search_response(response, users, limit)
+
+
+@router.get("/batch", response_model=UserBatchResponse)
+async def batch_get(
+    user_ids: List[int] = Depends(get_batch_ids),
+    service: AsyncUserService = Depends(get_async_user_service),
+):
+    return batch_response(await service.get_many(user_ids))
+
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    service: AsyncUserService = Depends(get_async_user_service),
+):
+    # requests condicionais leem so (id, updated_at); o 304 nao carrega nem serializa o usuario
+    if is_conditional(request):
+        cached = user_not_modified(request, await service.get_version(user_id))
+        if cached is not None:
+            return cached
+
+    user = await service.get_by_id(user_id)
+    if not user:
+        raise user_not_found(f"GET /users/{user_id}", user_id)
+    return user_response(response, user)
+
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update(
+    user_id: int,
+    data: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag de GET /users/{id}"),
+    service: AsyncUserService = Depends(get_async_user_service),
+):
+    with domain_errors(f"PUT /users/{user_id}", email=data.email):
+        expected = parse_if_match(if_match, user_id)
+        user = await service.patch(user_id, name=data.name, email=data.email, expected=expected)
+    return user_response(response, user)
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete(user_id: int, service: AsyncUserService = Depends(get_async_user_service)):
+    if not await service.delete(user_id):
+        raise user_not_found(f"DELETE /users/{user_id}", user_id)
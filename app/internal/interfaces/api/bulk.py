@@ -0,0 +1,135 @@
+"""bulk import helpers shared by the sync and async user handlers"""
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import Request
+from pydantic import ValidationError as PydanticValidationError
+
+from app.internal.core.domain.user import BulkCreateResult, User
+from app.internal.interfaces.dto.user import BulkImportResponse, BulkImportRow, UserRequest
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class _InvalidLine:
+    def __init__(self, error: str):
+        self.error = error
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+    if buffer.strip():
+        yield _decode_line(buffer)
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _InvalidLine(f"Invalid JSON: {e}")
+
+
+async def read_bulk_batches(
+    request: Request, batch_size: int
+) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """Le um array JSON ou um stream NDJSON e entrega lotes de (indice, item)
+
+    NDJSON e consumido incrementalmente, entao o corpo nunca fica inteiro em memoria.
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        items: AsyncIterator[Any] = _iter_ndjson(request)
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise ValueError("Body must be a JSON array or NDJSON")
+        if not isinstance(payload, list):
+            raise ValueError("Body must be a JSON array or NDJSON")
+        items = _iter_list(payload)
+
+    batch: List[Tuple[int, Any]] = []
+    index = 0
+    async for item in items:
+        batch.append((index, item))
+        index += 1
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _iter_list(payload: List[Any]) -> AsyncIterator[Any]:
+    for item in payload:
+        yield item
+
+
+class BulkImportReport:
+    """Acumula o resultado por linha e os destinatarios do email de boas-vindas"""
+
+    def __init__(self):
+        self.rows: List[BulkImportRow] = []
+
+    def prepare(self, batch: List[Tuple[int, Any]]) -> Tuple[List[int], List[User]]:
+        """Valida o payload (UserRequest) e retorna os usuarios que seguem para o service"""
+        indexes: List[int] = []
+        users: List[User] = []
+        for index, item in batch:
+            data, error = self._parse(item)
+            if data is None:
+                email = item.get("email") if isinstance(item, dict) else None
+                self.rows.append(
+                    BulkImportRow(
+                        index=index, status=BulkCreateResult.INVALID, email=email, error=error
+                    )
+                )
+                continue
+            indexes.append(index)
+            users.append(User(name=data.name, email=data.email))
+        return indexes, users
+
+    @staticmethod
+    def _parse(item: Any) -> Tuple[Optional[UserRequest], Optional[str]]:
+        if isinstance(item, _InvalidLine):
+            return None, item.error
+        try:
+            return UserRequest.model_validate(item), None
+        except PydanticValidationError as e:
+            return None, "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+
+    def record(self, indexes: List[int], results: List[BulkCreateResult]) -> None:
+        for index, result in zip(indexes, results):
+            user = result.user
+            self.rows.append(
+                BulkImportRow(
+                    index=index,
+                    status=result.status,
+                    email=result.email,
+                    id=user.id if user else None,
+                    error=result.error,
+                )
+            )
+
+    def response(self) -> BulkImportResponse:
+        self.rows.sort(key=lambda row: row.index)
+        counts = {
+            BulkCreateResult.CREATED: 0,
+            BulkCreateResult.DUPLICATE: 0,
+            BulkCreateResult.INVALID: 0,
+        }
+        for row in self.rows:
+            counts[row.status] += 1
+        return BulkImportResponse(
+            created=counts[BulkCreateResult.CREATED],
+            duplicates=counts[BulkCreateResult.DUPLICATE],
+            invalid=counts[BulkCreateResult.INVALID],
+            results=self.rows,
+        )
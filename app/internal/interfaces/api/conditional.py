@@ -0,0 +1,101 @@
+"""conditional requests: ETag, Last-Modified, If-None-Match, If-Modified-Since and If-Match"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.internal.core.domain.exceptions import VersionConflictError
+from app.internal.core.domain.user import PageVersion, UserVersion
+
+# updated_at e gravado como UTC sem timezone (datetime.utcnow)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _micros(updated_at: Optional[datetime]) -> int:
+    if updated_at is None:
+        return 0
+    return (updated_at.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+
+
+def user_etag(version: UserVersion) -> str:
+    """W/"<id>-<updated_at em microssegundos, hex>"; reversivel para o If-Match"""
+    return f'W/"{version.id}-{_micros(version.updated_at):x}"'
+
+
+def page_etag(limit: int, after: Optional[int], version: PageVersion) -> str:
+    key = f"{limit}:{after}:{version.count}:{version.last_id}:{_micros(version.updated_at)}"
+    return f'W/"p-{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    # comparacao fraca: W/"x" e "x" sao equivalentes
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_conditional(request: Request) -> bool:
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime], exists: bool = True
+) -> bool:
+    """If-None-Match tem precedencia; If-Modified-Since so vale sem ele (RFC 9110)
+
+    `*` so bate quando o recurso existe (`exists`).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return exists
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(
+            last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True
+        )
+
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    """304 sem corpo; nada e serializado"""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def parse_if_match(if_match: Optional[str], user_id: int) -> Optional[UserVersion]:
+    """Converte o If-Match na versao esperada do usuario
+
+    None (sem header ou `*`) significa sem precondicao; um ETag que nao e deste
+    usuario nunca vai bater, entao vira VersionConflictError direto.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    for tag in if_match.split(","):
+        try:
+            tag_id, micros = _opaque(tag).strip('"').split("-")
+            if int(tag_id) != user_id:
+                continue
+            micros = int(micros, 16)
+        except ValueError:
+            continue
+        updated_at = _EPOCH + timedelta(microseconds=micros) if micros else None
+        return UserVersion(id=user_id, updated_at=updated_at)
+    raise VersionConflictError(f"User with id {user_id} does not match If-Match")
@@ -1,15 +1,190 @@
 """ dependencies injections """
-from fastapi import Depends
+import math
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncGenerator, Generator, List, Optional
+from fastapi import Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
-from app.internal.infrastructure.database.connection import get_db
+from app.internal.infrastructure.database.connection import SessionLocal, get_async_db, get_db
+from app.internal.infrastructure.database.group_commit import (
+    GroupCommitter,
+    GroupCommitUserRepository,
+)
 from app.internal.infrastructure.database.user_repository import UserRepoImpl
-from app.internal.core.services.user_service import UserService
+from app.internal.infrastructure.cache.backends import CacheBackend, InMemoryCache, SharedCache
+from app.internal.infrastructure.cache.cached_user_repository import (
+    AsyncCachedUserRepository,
+    CachedUserRepository,
+)
+from app.internal.infrastructure.tasks.queue import JobQueue, create_job_queue
+from app.internal.interfaces.api.idempotency import IdempotencyStore
+from app.internal.core.domain.user import AsyncUserRepository, UserRepository, UserSearch
+from app.internal.core.services.single_flight import AsyncSingleFlight, SingleFlight
+from app.internal.core.services.user_service import AsyncUserService, UserService
+from app.config.config import get_settings
 
+if TYPE_CHECKING:
+    # so importado com DB_ASYNC=true (ver get_async_user_repository)
+    from sqlalchemy.ext.asyncio import AsyncSession
 
-def get_user_repository(db: Session = Depends(get_db)) -> UserRepoImpl:
-    return UserRepoImpl(db)
+settings = get_settings()
 
 
-def get_user_service(repo: UserRepoImpl = Depends(get_user_repository)) -> UserService:
-    return UserService(user_repo=repo)
+@lru_cache()
+def get_user_cache() -> CacheBackend:
+    """Cache de usuarios compartilhado por todas as requests do processo"""
+    if settings.user_cache_backend == "shared":
+        return SharedCache.from_url(settings.user_cache_url)
+    return InMemoryCache(max_entries=settings.user_cache_max_entries)
+
+
+@lru_cache()
+def get_group_committer() -> GroupCommitter:
+    """Group commit do processo; as escritas vao sempre para o primario"""
+    return GroupCommitter(
+        SessionLocal,
+        window=settings.db_group_commit_window_ms / 1000,
+        max_batch=settings.db_group_commit_max_batch,
+    )
+
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    if settings.idempotency_backend == "shared":
+        backend: CacheBackend = SharedCache.from_url(settings.idempotency_url)
+    else:
+        backend = InMemoryCache(max_entries=settings.idempotency_max_entries)
+    return IdempotencyStore(backend, ttl=settings.idempotency_ttl_seconds)
+
+
+@lru_cache()
+def get_user_flights() -> SingleFlight:
+    """Single flight de leituras do processo (handlers sync)"""
+    return SingleFlight()
+
+
+@lru_cache()
+def get_async_user_flights() -> AsyncSingleFlight:
+    return AsyncSingleFlight()
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    return create_job_queue(settings.job_queue_backend)
+
+
+# prazo (epoch) ate o qual o cliente le do primario; num cookie vale entre workers
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+def use_primary_db(request: Request, response: Response) -> bool:
+    """Escritas ficam no primario e o cliente segue nele por DB_READ_YOUR_WRITES_SECONDS"""
+    if request.method in ("GET", "HEAD"):
+        try:
+            return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, "0")) > time.time()
+        except ValueError:
+            return False
+
+    seconds = settings.db_read_your_writes_seconds
+    if settings.db_replica_urls and seconds > 0:
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            f"{time.time() + seconds:.3f}",
+            max_age=math.ceil(seconds),
+            httponly=True,
+            samesite="lax",
+        )
+    return True
+
+
+def get_db_session(primary: bool = Depends(use_primary_db)) -> Generator[Session, None, None]:
+    yield from get_db(use_primary=primary)
+
+
+async def get_async_db_session(
+    primary: bool = Depends(use_primary_db),
+) -> AsyncGenerator["AsyncSession", None]:
+    async for db in get_async_db(use_primary=primary):
+        yield db
+
+
+def get_user_repository(db: Session = Depends(get_db_session)) -> UserRepository:
+    repo: UserRepository = UserRepoImpl(db)
+    if settings.db_group_commit:
+        repo = GroupCommitUserRepository(repo, get_group_committer())
+    if settings.user_cache_enabled:
+        return CachedUserRepository(
+            repo,
+            get_user_cache(),
+            ttl=settings.user_cache_ttl_seconds,
+            negative_ttl=settings.user_cache_negative_ttl_seconds,
+        )
+    return repo
+
+
+def get_user_service(
+    repo: UserRepository = Depends(get_user_repository),
+    primary: bool = Depends(use_primary_db),
+) -> UserService:
+    # quem acabou de escrever nao pode pegar carona numa leitura iniciada antes da escrita
+    coalesce = settings.users_coalesce_reads and not primary
+    return UserService(user_repo=repo, flights=get_user_flights() if coalesce else None)
+
+
+def get_async_user_repository(
+    db: "AsyncSession" = Depends(get_async_db_session),
+) -> AsyncUserRepository:
+    from app.internal.infrastructure.database.async_user_repository import AsyncUserRepoImpl
+
+    repo: AsyncUserRepository = AsyncUserRepoImpl(db)
+    if settings.user_cache_enabled:
+        return AsyncCachedUserRepository(
+            repo,
+            get_user_cache(),
+            ttl=settings.user_cache_ttl_seconds,
+            negative_ttl=settings.user_cache_negative_ttl_seconds,
+        )
+    return repo
+
+
+def get_async_user_service(
+    repo: AsyncUserRepository = Depends(get_async_user_repository),
+    primary: bool = Depends(use_primary_db),
+) -> AsyncUserService:
+    coalesce = settings.users_coalesce_reads and not primary
+    return AsyncUserService(user_repo=repo, flights=get_async_user_flights() if coalesce else None)
+
+
+def get_user_search(
+    email: Optional[str] = Query(None, description="Email exato (sem diferenciar maiusculas)"),
+    name: Optional[str] = Query(None, min_length=1, description="Trecho do nome"),
+    name_match: str = Query(UserSearch.PREFIX, pattern="^(prefix|contains)$"),
+    created_from: Optional[datetime] = Query(None, description="created_at >= created_from"),
+    created_to: Optional[datetime] = Query(None, description="created_at < created_to"),
+) -> UserSearch:
+    return UserSearch(
+        email=email,
+        name=name,
+        name_match=name_match,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+
+def get_batch_ids(
+    ids: str = Query(..., description="Ids separados por virgula, ex: 1,2,3"),
+) -> List[int]:
+    try:
+        user_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="ids must be integers")
+    if not user_ids:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="ids must not be empty")
+    if len(user_ids) > settings.users_batch_get_max_ids:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.users_batch_get_max_ids} ids per request",
+        )
+    return user_ids
@@ -0,0 +1,70 @@
+"""Idempotency-Key: retries de um POST devolvem a resposta original sem ir ao banco"""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from app.internal.infrastructure.cache.backends import CacheBackend
+from app.config.logging import get_logger
+
+logger = get_logger("api.idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Hash do corpo da request; a mesma chave com outro corpo e erro do cliente"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class IdempotencyStore:
+    """Respostas de sucesso por (operacao, chave), guardadas num CacheBackend com TTL
+
+    Com varios workers use o backend compartilhado: no backend em memoria um retry que
+    cai em outro worker nao encontra a resposta original.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(operation: str, key: str) -> str:
+        return f"idempotency:{operation}:{key}"
+
+    def replay(self, operation: str, key: str, payload: Dict[str, Any]) -> Optional[JSONResponse]:
+        """Resposta original para esta chave, ou None se ela ainda nao foi usada"""
+        # store fora do ar nao derruba o POST: a request segue como se nao tivesse chave
+        try:
+            saved = self.backend.get(self._key(operation, key))
+        except Exception as e:
+            logger.error("Idempotency store read failed: operation=%s, error=%s", operation, e)
+            return None
+        if saved is None:
+            return None
+        if saved["fingerprint"] != fingerprint(payload):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_HEADER} was already used with a different payload",
+            )
+        return JSONResponse(
+            saved["body"], status_code=saved["status"], headers={REPLAYED_HEADER: "true"}
+        )
+
+    def save(
+        self,
+        operation: str,
+        key: str,
+        payload: Dict[str, Any],
+        status_code: int,
+        body: Dict[str, Any],
+    ) -> None:
+        entry = {"fingerprint": fingerprint(payload), "status": status_code, "body": body}
+        try:
+            self.backend.set(self._key(operation, key), entry, self.ttl)
+        except Exception as e:
+            logger.error("Idempotency store write failed: operation=%s, error=%s", operation, e)
@@ -0,0 +1,52 @@
+"""fast JSON rendering for the users API (USERS_FAST_JSON)"""
+import json
+from dataclasses import fields
+from typing import Any, Iterable, List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.internal.core.domain.user import User, UserBatch
+from app.internal.interfaces.dto.user import UserResponse
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional: sem ela fica o json da stdlib
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+# montados uma vez no import; serializam os dataclasses User direto, sem o asdict +
+# validacao por item do response_model. Campos fora de UserResponse ficam de fora
+_HIDDEN = {field.name for field in fields(User)} - set(UserResponse.model_fields)
+_USER_ADAPTER = TypeAdapter(User)
+_USER_LIST_ADAPTER = TypeAdapter(List[User])
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse renderizado com orjson quando instalado"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+def dump_user(user: User) -> bytes:
+    return _USER_ADAPTER.dump_json(user, exclude=_HIDDEN)
+
+
+def dump_users(users: Iterable[User]) -> bytes:
+    return _USER_LIST_ADAPTER.dump_json(list(users), exclude={"__all__": _HIDDEN})
+
+
+def user_list_response(users: List[User], response: Response) -> Response:
+    """Resposta ja serializada da lista, com os headers definidos no `response` injetado"""
+    return Response(dump_users(users), media_type=JSON_MEDIA_TYPE, headers=dict(response.headers))
+
+
+def user_batch_response(batch: UserBatch) -> Response:
+    missing = json.dumps(batch.missing, separators=(",", ":")).encode()
+    content = b'{"users":' + dump_users(batch.users) + b',"missing":' + missing + b"}"
+    return Response(content, media_type=JSON_MEDIA_TYPE)
@@ -1,96 +1,207 @@
 """usr handlers"""
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
-from typing import List
+from fastapi import Depends, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Iterable, Iterator, List, Optional
 
 from app.internal.core.services.user_service import UserService
-from app.internal.core.domain.user import User
-from app.internal.core.domain.exceptions import (
-    DuplicateEmailError,
-    UserNotFoundError,
-    ValidationError,
+from app.internal.core.domain.user import BulkCreateResult, User, UserSearch
+from app.internal.interfaces.dto.user import (
+    BulkImportResponse,
+    UserBatchResponse,
+    UserRequest,
+    UserUpdate,
+    UserResponse,
 )
-from app.internal.interfaces.dto.user import UserRequest, UserUpdate, UserResponse
-from app.internal.interfaces.api.dependencies import get_user_service
-from app.internal.infrastructure.tasks.email_tasks import send_welcome_email
-from app.config.logging import get_logger
+from app.internal.interfaces.api.conditional import is_conditional, parse_if_match
+from app.internal.interfaces.api.responses import dump_user
+from app.internal.interfaces.api.idempotency import IDEMPOTENCY_HEADER, IdempotencyStore
+from app.internal.interfaces.api.bulk import BulkImportReport, read_bulk_batches
+from app.internal.interfaces.api.dependencies import (
+    get_batch_ids,
+    get_db_session,
+    get_idempotency_store,
+    get_job_queue,
+    get_user_service,
+    get_user_search,
+)
+from app.internal.interfaces.api.user_routes import (
+    CREATE_OPERATION,
+    bad_request,
+    batch_response,
+    created_body,
+    domain_errors,
+    page_not_modified,
+    page_response,
+    search_response,
+    user_not_found,
+    user_not_modified,
+    user_response,
+    users_router,
+    welcome_email,
+    welcome_emails,
+)
+from app.internal.infrastructure.tasks.queue import JobQueue
+from app.config.config import get_settings
+
+settings = get_settings()
+
+router = users_router()
 
-logger = get_logger("api.user_handler")
 
-router = APIRouter(prefix="/users", tags=["users"])
+def _create_batch(
+    service: UserService, queue: JobQueue, db: Session, users: List[User]
+) -> List[BulkCreateResult]:
+    # os emails de boas-vindas do lote entram no mesmo commit que os usuarios (outbox)
+    with service.unit_of_work():
+        results = service.create_many(users)
+        job = welcome_emails(results)
+        if job:
+            queue.enqueue_in(db, *job)
+    return results
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create(
     data: UserRequest,
-    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias=IDEMPOTENCY_HEADER,
+        max_length=255,
+        description="Retries devolvem o 201 original",
+    ),
     service: UserService = Depends(get_user_service),
+    queue: JobQueue = Depends(get_job_queue),
+    db: Session = Depends(get_db_session),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
 ):
+    # um retry com a mesma chave devolve o 201 guardado sem abrir conexao com o banco
+    payload = data.model_dump()
+    if idempotency_key:
+        replayed = idempotency.replay(CREATE_OPERATION, idempotency_key, payload)
+        if replayed is not None:
+            return replayed
+
+    with domain_errors("POST /users", email=data.email):
+        # outbox: o job do email e gravado na mesma transacao do usuario, nunca um sem o outro
+        with service.unit_of_work():
+            created_user = service.create(User(name=data.name, email=data.email))
+            queue.enqueue_in(db, *welcome_email(created_user))
+
+    if idempotency_key:
+        idempotency.save(
+            CREATE_OPERATION,
+            idempotency_key,
+            payload,
+            status.HTTP_201_CREATED,
+            created_body(created_user),
+        )
+    return created_user
+
+
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_create(
+    request: Request,
+    service: UserService = Depends(get_user_service),
+    queue: JobQueue = Depends(get_job_queue),
+    db: Session = Depends(get_db_session),
+):
+    report = BulkImportReport()
     try:
-        user = User(name=data.name, email=data.email)
-        created_user = service.create(user)
+        async for batch in read_bulk_batches(request, settings.users_bulk_batch_size):
+            indexes, users = report.prepare(batch)
+            if users:
+                results = await run_in_threadpool(_create_batch, service, queue, db, users)
+                report.record(indexes, results)
+    except ValueError as e:
+        raise bad_request("POST /users/bulk", e)
 
-        background_tasks.add_task(send_welcome_email, created_user.email, created_user.name)
+    return report.response()
 
-        return created_user
 
-    except DuplicateEmailError as e:
-        logger.error(f"POST /users failed - duplicate email: {data.email}")
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
-    except ValidationError as e:
-        logger.error(f"POST /users failed - validation error: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+def _ndjson(users: Iterable[User]) -> Iterator[bytes]:
+    for user in users:
+        yield dump_user(user) + b"\n"
 
 
 @router.get("/", response_model=List[UserResponse])
-def list_all(service: UserService = Depends(get_user_service)):
-    return service.list()
+def list_all(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.users_page_size, ge=1, le=settings.users_max_page_size),
+    after: Optional[int] = Query(None, ge=0, description="Cursor: id do ultimo usuario recebido"),
+    stream: bool = Query(False, description="Retorna todos os usuarios em NDJSON"),
+    service: UserService = Depends(get_user_service),
+):
+    if stream:
+        users = service.stream(batch_size=settings.users_stream_batch_size)
+        return StreamingResponse(_ndjson(users), media_type="application/x-ndjson")
+
+    # 304 sai de um agregado sobre (id, updated_at) da pagina, sem carregar as linhas
+    if is_conditional(request):
+        cached = page_not_modified(request, limit, after, service.page_version(limit, after=after))
+        if cached is not None:
+            return cached
+
+    return page_response(response, service.list(limit=limit, after=after), limit, after)
+
+
+@router.get("/search", response_model=List[UserResponse])
+def search(
+    response: Response,
+    criteria: UserSearch = Depends(get_user_search),
+    limit: int = Query(settings.users_page_size, ge=1, le=settings.users_max_page_size),
+    after: Optional[int] = Query(None, ge=0, description="Cursor: id do ultimo usuario recebido"),
+    service: UserService = Depends(get_user_service),
+):
+    with domain_errors("GET /users/search"):
+        users = service.search(criteria, limit=limit, after=after)
+    return search_response(response, users, limit)
+
+
+@router.get("/batch", response_model=UserBatchResponse)
+def batch_get(
+    user_ids: List[int] = Depends(get_batch_ids),
+    service: UserService = Depends(get_user_service),
+):
+    return batch_response(service.get_many(user_ids))
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_by_id(user_id: int, service: UserService = Depends(get_user_service)):
+def get_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    service: UserService = Depends(get_user_service),
+):
+    # requests condicionais leem so (id, updated_at); o 304 nao carrega nem serializa o usuario
+    if is_conditional(request):
+        cached = user_not_modified(request, service.get_version(user_id))
+        if cached is not None:
+            return cached
+
     user = service.get_by_id(user_id)
     if not user:
-        logger.error(f"GET /users/{user_id} failed - not found")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found"
-        )
-    return user
+        raise user_not_found(f"GET /users/{user_id}", user_id)
+    return user_response(response, user)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update(user_id: int, data: UserUpdate, service: UserService = Depends(get_user_service)):
-    try:
-        existing_user = service.get_by_id(user_id)
-        if not existing_user:
-            logger.error(f"PUT /users/{user_id} failed - not found")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found"
-            )
-
-        if data.name is not None:
-            existing_user.name = data.name
-        if data.email is not None:
-            existing_user.email = data.email
-
-        updated_user = service.update(existing_user)
-        return updated_user
-
-    except DuplicateEmailError as e:
-        logger.error(f"PUT /users/{user_id} failed - duplicate email: {data.email}")
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
-    except UserNotFoundError as e:
-        logger.error(f"PUT /users/{user_id} failed - not found")
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-    except ValidationError as e:
-        logger.error(f"PUT /users/{user_id} failed - validation error: {str(e)}")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+def update(
+    user_id: int,
+    data: UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag de GET /users/{id}"),
+    service: UserService = Depends(get_user_service),
+):
+    with domain_errors(f"PUT /users/{user_id}", email=data.email):
+        expected = parse_if_match(if_match, user_id)
+        user = service.patch(user_id, name=data.name, email=data.email, expected=expected)
+    return user_response(response, user)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete(user_id: int, service: UserService = Depends(get_user_service)):
-    success = service.delete(user_id)
-    if not success:
-        logger.error(f"DELETE /users/{user_id} failed - not found")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found"
-        )
+    if not service.delete(user_id):
+        raise user_not_found(f"DELETE /users/{user_id}", user_id)
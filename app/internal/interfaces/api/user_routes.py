@@ -0,0 +1,149 @@
+"""partes comuns dos handlers de /users: router, erros -> HTTP e montagem das respostas
+
+user_handler (sync, no threadpool) e async_user_handler (DB_ASYNC=true) so diferem em como
+chamam o service; o resto da logica de cada rota vive aqui.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+
+from app.internal.core.domain.exceptions import (
+    DuplicateEmailError,
+    UserNotFoundError,
+    ValidationError,
+    VersionConflictError,
+)
+from app.internal.core.domain.user import (
+    BulkCreateResult,
+    PageVersion,
+    User,
+    UserBatch,
+    UserVersion,
+)
+from app.internal.interfaces.api.conditional import (
+    is_not_modified,
+    not_modified,
+    page_etag,
+    set_validators,
+    user_etag,
+)
+from app.internal.interfaces.api.responses import (
+    FastJSONResponse,
+    user_batch_response,
+    user_list_response,
+)
+from app.internal.interfaces.dto.user import UserResponse
+from app.config.config import get_settings
+from app.config.logging import get_logger
+
+logger = get_logger("api.user_handler")
+settings = get_settings()
+
+CREATE_OPERATION = "create_user"
+WELCOME_EMAIL = "send_welcome_email"
+WELCOME_EMAILS = "send_welcome_emails"
+
+
+def users_router() -> APIRouter:
+    return APIRouter(
+        prefix="/users",
+        tags=["users"],
+        default_response_class=FastJSONResponse if settings.users_fast_json else JSONResponse,
+    )
+
+
+@contextmanager
+def domain_errors(route: str, email: Optional[str] = None) -> Iterator[None]:
+    """Excecoes do dominio viram o status HTTP da rota `route` (ex.: "PUT /users/1")"""
+    try:
+        yield
+    except VersionConflictError as e:
+        logger.warning("%s failed - precondition failed", route)
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(e))
+    except DuplicateEmailError as e:
+        logger.warning("%s failed - duplicate email: %s", route, email)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except UserNotFoundError as e:
+        logger.error("%s failed - not found", route)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValidationError as e:
+        logger.error("%s failed - validation error: %s", route, e)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def bad_request(route: str, error: Exception) -> HTTPException:
+    logger.error("%s failed - invalid body: %s", route, error)
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
+
+
+def user_not_found(route: str, user_id: int) -> HTTPException:
+    logger.error("%s failed - not found", route)
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found"
+    )
+
+
+def welcome_email(user: User) -> Tuple[str, Dict[str, Any]]:
+    return WELCOME_EMAIL, {"email": user.email, "name": user.name}
+
+
+def welcome_emails(results: List[BulkCreateResult]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Job com os criados de um lote da importacao (None se nenhum foi criado)"""
+    recipients = [(result.user.email, result.user.name) for result in results if result.user]
+    return (WELCOME_EMAILS, {"recipients": recipients}) if recipients else None
+
+
+def created_body(user: User) -> Dict[str, Any]:
+    """Corpo do 201, guardado para o replay do Idempotency-Key"""
+    return UserResponse.model_validate(user).model_dump()
+
+
+def user_not_modified(request: Request, version: Optional[UserVersion]) -> Optional[Response]:
+    """304 a partir de (id, updated_at), sem carregar o usuario"""
+    if version is None:
+        return None
+    etag = user_etag(version)
+    if is_not_modified(request, etag, version.updated_at):
+        return not_modified(etag, version.updated_at)
+    return None
+
+
+def user_response(response: Response, user: User) -> User:
+    set_validators(response, user_etag(UserVersion(user.id, user.updated_at)), user.updated_at)
+    return user
+
+
+def page_not_modified(
+    request: Request, limit: int, after: Optional[int], version: PageVersion
+) -> Optional[Response]:
+    """304 de uma pagina a partir do agregado (count, ultimo id, max updated_at)"""
+    etag = page_etag(limit, after, version)
+    if not is_not_modified(request, etag, version.updated_at, exists=version.count > 0):
+        return None
+    cached = not_modified(etag, version.updated_at)
+    if version.count == limit:
+        cached.headers["X-Next-Cursor"] = str(version.last_id)
+    return cached
+
+
+def page_response(response: Response, users: List[User], limit: int, after: Optional[int]):
+    version = PageVersion.of(users)
+    set_validators(response, page_etag(limit, after, version), version.updated_at)
+    return search_response(response, users, limit)
+
+
+def search_response(response: Response, users: List[User], limit: int):
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
+    if settings.users_fast_json:
+        return user_list_response(users, response)
+    return users
+
+
+def batch_response(batch: UserBatch):
+    # uma query (por lote de ids) no lugar de N GET /users/{id}; a ordem dos ids e mantida
+    if settings.users_fast_json:
+        return user_batch_response(batch)
+    return batch
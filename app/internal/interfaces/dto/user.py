@@ -1,6 +1,6 @@
 """user schemas"""
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class UserBase(BaseModel):
@@ -22,3 +22,26 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+
+
+class UserBatchResponse(BaseModel):
+    users: List[UserResponse]
+    missing: List[int]
+
+    class Config:
+        from_attributes = True
+
+
+class BulkImportRow(BaseModel):
+    index: int
+    status: str
+    email: Optional[str] = None
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkImportResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[BulkImportRow]
@@ -1,16 +1,41 @@
 """ app entrypoint """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from dataclasses import asdict
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.pool import QueuePool
 
 from app.config.config import get_settings
 from app.config.logging import setup_logging, get_logger
 from app.config.tracing import setup_tracing, instrument_app, instrument_db
-from app.internal.interfaces.api.user_handler import router as user_router
-from app.internal.infrastructure.database.connection import engine
+from app.config.metrics import CONTENT_TYPE, get_metrics_registry, instrument_metrics
+from app.config.startup import StartupTimer
+from app.internal.infrastructure.database.connection import (
+    compiled_cache_stats,
+    engine,
+    get_async_engine,
+    get_async_replica_engines,
+    get_async_replicas,
+    pool_stats,
+    replicas,
+    warm_up_async_pool,
+    warm_up_pool,
+    warmup_connections,
+)
+from app.internal.interfaces.api.dependencies import (
+    get_async_user_flights,
+    get_group_committer,
+    get_job_queue,
+    get_user_cache,
+    get_user_flights,
+)
+from app.internal.infrastructure.tasks.worker import create_worker
+
+startup = StartupTimer()
 
-setup_logging()
-setup_tracing()
+with startup.phase("logging"):
+    setup_logging()
 logger = get_logger("main")
 
 settings = get_settings()
@@ -18,19 +43,70 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    # tudo que abre thread ou conexao fica aqui, e nao no import: roda no processo do
+    # worker, depois do fork/spawn (ver app/server.py)
+    startup.mark("app")
+    logger.info("Starting %s v%s", settings.app_name, settings.app_version)
     try:
-        instrument_db(engine)
-        logger.info("Application startup completed")
+        with startup.phase("tracing"):
+            setup_tracing()
+        with startup.phase("database"):
+            if settings.db_async:
+                for async_engine in (get_async_engine(), *get_async_replica_engines()):
+                    instrument_db(async_engine.sync_engine)
+            else:
+                for sync_engine in (engine, *(replicas.engines if replicas else ())):
+                    instrument_db(sync_engine)
     except Exception as e:
-        logger.error(f"Application startup failed: {str(e)}")
+        logger.error("Application startup failed: %s", e)
         raise
 
+    with startup.phase("pool_warmup"):
+        await _warm_up_pools()
+
+    # com a fila em memoria nao existe worker externo: os jobs rodam neste processo
+    worker = None
+    if settings.job_queue_backend == "memory":
+        with startup.phase("job_worker"):
+            worker = create_worker(get_job_queue())
+            worker.start()
+
+    logger.info("Application startup completed: %s", startup.report())
+
     yield
 
+    if worker is not None:
+        worker.stop(timeout=10)
+    if settings.db_group_commit and not settings.db_async:
+        get_group_committer().stop(timeout=10)
+
+    if settings.db_async:
+        for async_engine in (get_async_engine(), *get_async_replica_engines()):
+            await async_engine.dispose()
+    else:
+        for sync_engine in (engine, *(replicas.engines if replicas else ())):
+            sync_engine.dispose()
     logger.info("Application shutdown")
 
 
+async def _warm_up_pools() -> None:
+    """Abre as conexoes do pool antes da primeira request; banco fora do ar nao impede o startup"""
+    connections = warmup_connections()
+    if not connections:
+        return
+    try:
+        if settings.db_async:
+            for async_engine in (get_async_engine(), *get_async_replica_engines()):
+                await warm_up_async_pool(async_engine, connections)
+        else:
+            for sync_engine in (engine, *(replicas.engines if replicas else ())):
+                await run_in_threadpool(warm_up_pool, sync_engine, connections)
+    except Exception as e:
+        logger.warning("Database pool warm-up failed: %s", e)
+        return
+    logger.info("Database pool warmed up: connections=%s", connections)
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
@@ -47,14 +123,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    instrument_metrics(app)
+
+# so o modo em uso e importado
+if settings.db_async:
+    from app.internal.interfaces.api.async_user_handler import router as user_router
+else:
+    from app.internal.interfaces.api.user_handler import router as user_router
+
 app.include_router(user_router)
 
 
+def _pool_gauges():
+    target = get_async_engine().sync_engine if settings.db_async else engine
+    pool = target.pool
+    if not isinstance(pool, QueuePool):
+        return  # NullPool: as conexoes ficam no pooler externo
+    yield "db_pool_size", "Connections kept in the pool", {}, pool.size()
+    yield "db_pool_checked_out", "Connections currently in use", {}, pool.checkedout()
+    yield "db_pool_overflow", "Connections opened beyond pool_size", {}, pool.overflow()
+    stats = pool_stats(target)
+    if stats is not None:
+        yield "db_pool_checkouts", "Connection checkouts since start", {}, stats.checkouts
+        yield "db_pool_connects", "Connections opened since start", {}, stats.connects
+        yield "db_pool_connect_seconds", "Time spent opening connections", {}, stats.connect_seconds
+
+
+def _compiled_cache_gauges():
+    target = get_async_engine().sync_engine if settings.db_async else engine
+    stats = compiled_cache_stats(target)
+    if stats is None:
+        return
+    for result, value in asdict(stats).items():
+        yield "db_compiled_cache_events", "Statement executions by compiled cache result", {
+            "result": result
+        }, value
+    yield "db_compiled_cache_hit_ratio", "Compiled cache hits per execution", {}, stats.hit_ratio
+
+
+def _replica_gauges():
+    replica_set = get_async_replicas() if settings.db_async else replicas
+    if replica_set is None:
+        return
+    for index, replica in enumerate(replica_set.engines):
+        up = 1 if replica_set.is_healthy(replica) else 0
+        yield "db_replica_up", "Read replica in rotation", {"replica": str(index)}, up
+    for index, replica in enumerate(replica_set.engines):
+        if not isinstance(replica.pool, QueuePool):
+            continue
+        checked_out = replica.pool.checkedout()
+        yield "db_replica_pool_checked_out", "Replica connections in use", {
+            "replica": str(index)
+        }, checked_out
+
+
+def _startup_gauges():
+    for phase, seconds in startup.phases:
+        yield "app_startup_seconds", "Worker startup time by phase", {"phase": phase}, seconds
+
+
+def _job_queue_gauges():
+    yield "job_queue_depth", "Pending background jobs", {}, get_job_queue().depth()
+
+
+def _user_cache_gauges():
+    if settings.user_cache_enabled:
+        for event, value in asdict(get_user_cache().stats).items():
+            yield "user_cache_events", "User cache hits/misses/evictions", {"event": event}, value
+
+
+def _group_commit_gauges():
+    if settings.db_group_commit and not settings.db_async:
+        for event, value in asdict(get_group_committer().stats).items():
+            yield "db_group_commit_events", "Group commit writes/commits/fallbacks", {
+                "event": event
+            }, value
+
+
+def _user_flight_gauges():
+    if settings.users_coalesce_reads:
+        flights = get_async_user_flights() if settings.db_async else get_user_flights()
+        for result, value in asdict(flights.stats).items():
+            yield "user_read_calls", "User reads executed or coalesced", {"result": result}, value
+
+
+# cada collector falha isoladamente: fila fora do ar nao esconde as metricas do pool
+for collector in (
+    _pool_gauges,
+    _compiled_cache_gauges,
+    _replica_gauges,
+    _group_commit_gauges,
+    _startup_gauges,
+    _job_queue_gauges,
+    _user_cache_gauges,
+    _user_flight_gauges,
+):
+    get_metrics_registry().add_collector(collector)
+
+
 @app.get("/", tags=["health"])
 def health():
-    return {
+    payload = {
         "status": "ok",
         "app": settings.app_name,
         "version": settings.app_version,
         "environment": settings.environment,
     }
+    if settings.user_cache_enabled:
+        payload["user_cache"] = asdict(get_user_cache().stats)
+    return payload
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(get_metrics_registry().render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,68 @@
+"""production server
+
+    python -m app --workers 8
+
+Sobe o uvicorn com N workers (padrao: um por core disponivel). Os workers sao processos
+novos (spawn) que importam app.main sozinhos; o processo pai so le as configuracoes, entao
+engine, listener de log e exportador OTLP nunca sao criados antes do fork.
+
+SIGTERM/SIGINT no pai repassa SIGTERM aos workers: cada um para de aceitar conexoes,
+espera as requests em andamento por ate --graceful-timeout segundos e roda o shutdown
+do lifespan (fila de jobs, engines).
+"""
+import argparse
+import os
+from typing import List, Optional
+
+import uvicorn
+
+from app.config.config import get_settings
+
+APP = "app.main:app"
+
+
+def default_workers() -> int:
+    """Um worker por core que o processo pode usar (respeita cpuset/affinity)"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cores = os.cpu_count() or 1
+    return max(1, cores)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Shape API production server")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.server_workers or default_workers(),
+        help="Processos; 0 em SERVER_WORKERS usa um por core",
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=float, default=settings.server_graceful_timeout_seconds
+    )
+    parser.add_argument(
+        "--access-log",
+        action=argparse.BooleanOptionalAction,
+        default=settings.server_access_log,
+    )
+    args = parser.parse_args(argv)
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        proxy_headers=True,
+        server_header=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
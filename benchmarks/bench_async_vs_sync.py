@@ -0,0 +1,115 @@
+"""benchmark: sync (threadpool + psycopg2) vs async (AsyncSession + asyncpg) request path
+
+Sobe um uvicorn para cada modo (DB_ASYNC=false/true) apontando para o mesmo banco,
+dispara GET /users/{id} com concorrencia fixa e reporta requests/sec e latencias.
+
+    python -m benchmarks.bench_async_vs_sync --db-url postgresql+psycopg2://... --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from app.internal.infrastructure.database.models import Base, UserModel
+from benchmarks.load import drive
+
+
+def seed(db_url: str, users: int) -> None:
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(UserModel),
+            [{"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(users)],
+        )
+    engine.dispose()
+
+
+def start_server(db_url: str, db_async: bool, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_URL=db_url, DB_ASYNC=str(db_async).lower(), LOG_LEVEL="WARNING")
+    env.setdefault("TRACING_ENABLED", "false")
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+async def run_load(base_url: str, requests: int, concurrency: int, users: int) -> Dict[str, float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        return await drive(
+            client,
+            lambda _: ("GET", f"/users/{random.randint(1, users)}", {}),
+            requests,
+            concurrency,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    seed(args.db_url, args.users)
+
+    results = {}
+    for mode, db_async in (("sync", False), ("async", True)):
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.db_url, db_async, args.port)
+        try:
+            asyncio.run(wait_ready(base_url))
+            results[mode] = asyncio.run(
+                run_load(base_url, args.requests, args.concurrency, args.users)
+            )
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print(f"{'mode':<8}{'req/s':>12}{'p50 ms':>12}{'p99 ms':>12}{'errors':>10}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<8}{result['requests_per_sec']:>12.1f}{result['p50_ms']:>12.2f}"
+            f"{result['p99_ms']:>12.2f}{result['errors']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
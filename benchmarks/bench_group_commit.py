@@ -0,0 +1,92 @@
+"""benchmark: escritas por segundo com um commit por escrita vs group commit
+
+Cada thread simula uma request: abre a propria sessao e cria usuarios um a um. Sem grupo,
+cada create e uma transacao (um fsync); com DB_GROUP_COMMIT as escritas concorrentes
+dividem o commit. Por padrao usa um SQLite em arquivo temporario.
+
+    python -m benchmarks.bench_group_commit --threads 16 --writes 200
+    python -m benchmarks.bench_group_commit --db-url postgresql+psycopg2://...
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.internal.core.domain.user import User, UserRepository
+from app.internal.infrastructure.database.group_commit import (
+    GroupCommitter,
+    GroupCommitUserRepository,
+)
+from app.internal.infrastructure.database.models import Base
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+
+
+def run(
+    factory, wrap: Callable[[UserRepository], UserRepository], threads: int, writes: int, tag: str
+) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        for n in range(writes):
+            with factory() as db:
+                wrap(UserRepoImpl(db)).create(
+                    User(name=f"User {n}", email=f"{tag}-{index}-{n}@example.com")
+                )
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return threads * writes / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="writes/sec with and without group commit")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--db-url", default=None)
+    args = parser.parse_args()
+
+    path: Optional[str] = None
+    url = args.db_url
+    if url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    try:
+        engine = create_engine(url, pool_size=args.threads + 1)
+        Base.metadata.create_all(engine)
+        commits = []
+        event.listen(engine, "commit", lambda conn: commits.append(1))
+        factory = sessionmaker(bind=engine)
+        committer = GroupCommitter(factory, window=args.window_ms / 1000, max_batch=100)
+
+        modes = (
+            ("per-write", lambda repo: repo),
+            ("group", lambda repo: GroupCommitUserRepository(repo, committer)),
+        )
+        print(f"{'mode':<12}{'writes':>10}{'commits':>10}{'writes/s':>12}")
+        tag = str(int(time.time()))
+        for name, wrap in modes:
+            commits.clear()
+            rate = run(factory, wrap, args.threads, args.writes, f"{tag}-{name}")
+            print(f"{name:<12}{args.threads * args.writes:>10}{len(commits):>10}{rate:>12.0f}")
+        committer.stop()
+        engine.dispose()
+    finally:
+        if path is not None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
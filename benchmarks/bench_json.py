@@ -0,0 +1,76 @@
+"""benchmark: serializacao da lista de usuarios (GET /users) em 10k e 100k itens
+
+Compara o caminho padrao do FastAPI (response_model validando cada item + JSONResponse)
+com o caminho rapido de USERS_FAST_JSON (TypeAdapter pre-compilado direto nos User).
+
+    python -m benchmarks.bench_json --sizes 10000 100000
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+
+from app.internal.core.domain.user import User
+from app.internal.interfaces.api.responses import FastJSONResponse, dump_users, orjson
+from app.internal.interfaces.dto.user import UserResponse
+
+_FIELD = create_response_field(name="Response_list_all", type_=List[UserResponse])
+
+
+def make_users(count: int) -> List[User]:
+    return [User(id=i, name=f"User {i}", email=f"user{i}@example.com") for i in range(count)]
+
+
+def default_path(users: List[User]) -> bytes:
+    # o que fastapi.routing.serialize_response faz com um response_model
+    value, errors = _FIELD.validate(jsonable_encoder(users), {}, loc=("response",))
+    assert not errors
+    return JSONResponse(_FIELD.serialize(value, mode="json")).body
+
+
+def fast_path(users: List[User]) -> bytes:
+    return dump_users(users)
+
+
+def fast_response_class(users: List[User]) -> bytes:
+    return FastJSONResponse(jsonable_encoder(users)).body
+
+
+def measure(fn: Callable[[List[User]], bytes], users: List[User], repeat: int) -> float:
+    """Melhor tempo em ms"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(users)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Users list JSON serialization benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = {
+        "fastapi_default": default_path,
+        "fast_json_class": fast_response_class,
+        "users_fast_json": fast_path,
+    }
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json)'}")
+    print(f"{'users':>8}  {'path':<18}{'ms':>10}{'speedup':>10}")
+    for size in args.sizes:
+        users = make_users(size)
+        assert default_path(users[:10]) == fast_path(users[:10])
+        baseline = None
+        for name, fn in paths.items():
+            elapsed = measure(fn, users, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{size:>8}  {name:<18}{elapsed:>10.1f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
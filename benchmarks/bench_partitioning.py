@@ -0,0 +1,115 @@
+"""benchmark: leituras do repositorio e arquivamento numa tabela users grande
+
+Rode contra bancos ja populados pelo gen_users, um por esquema, e compare:
+
+    USERS_PARTITIONING=none  DB_URL=.../users_plain make migrate
+    USERS_PARTITIONING=hash  DB_URL=.../users_hash  make migrate
+    python -m benchmarks.gen_users --db-url .../users_plain --rows 10000000
+    python -m benchmarks.gen_users --db-url .../users_hash  --rows 10000000
+    python -m benchmarks.bench_partitioning --db-url .../users_plain
+    python -m benchmarks.bench_partitioning --db-url .../users_hash
+
+Latencia p50/p95/p99 de get por id, pagina por keyset e get_many de 100 ids em ids
+aleatorios; no Postgres tambem mostra quantas particoes o plano de cada query toca. Por
+ultimo mede o arquivamento dos usuarios com soft delete (--archive-batches lotes).
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import sessionmaker
+
+from app.internal.infrastructure.database.archive import UserArchiver
+from app.internal.infrastructure.database.models import UserModel
+from app.internal.infrastructure.database.user_repository import (
+    GET_BY_ID,
+    UserRepoImpl,
+    get_many_statement,
+    list_statement,
+)
+
+
+def latencies(fn: Callable[[], object], requests: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def partitions_scanned(conn: Connection, stmt, params: Dict) -> int:
+    """Particoes users_pNNNN no plano (EXPLAIN sem executar)"""
+    sql = str(stmt.compile(conn, compile_kwargs={"render_postcompile": True}))
+    plan = conn.exec_driver_sql(f"EXPLAIN (COSTS OFF) {sql}", params).scalars().all()
+    return len(set(re.findall(r"users_p\d+", "\n".join(plan))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="users reads and archival at volume")
+    parser.add_argument("--db-url", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--archive-batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        max_id = db.execute(select(func.max(UserModel.id))).scalar() or 0
+        rows = db.execute(select(func.count()).select_from(UserModel)).scalar()
+    if not max_id:
+        raise SystemExit("empty users table: run benchmarks.gen_users first")
+    print(f"users: {rows:,} rows, max id {max_id:,}")
+
+    def random_id() -> int:
+        return random.randint(1, max_id)
+
+    with factory() as db:
+        repository = UserRepoImpl(db)
+        queries = {
+            "get_by_id": lambda: repository.get_by_id(random_id()),
+            "list_page": lambda: repository.list(limit=100, after=random_id()),
+            "get_many_100": lambda: repository.get_many([random_id() for _ in range(100)]),
+        }
+        print(f"\n{'query':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, query in queries.items():
+            result = latencies(query, args.requests)
+            print(f"{name:<16}{result['p50']:>10.3f}{result['p95']:>10.3f}{result['p99']:>10.3f}")
+
+    if engine.dialect.name == "postgresql":
+        user_id = random_id()
+        with engine.connect() as conn:
+            partitions = conn.execute(
+                text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'users'::regclass")
+            ).scalar_one()
+            plans = {
+                "get_by_id": (GET_BY_ID, {"user_id": user_id}),
+                "list_page": (list_statement(True, True), {"after": user_id, "limit": 100}),
+                "get_many_100": (
+                    get_many_statement("postgresql"),
+                    {"ids": [random_id() for _ in range(100)]},
+                ),
+            }
+            print(f"\npartitions scanned (of {partitions}):")
+            for name, (stmt, params) in plans.items():
+                print(f"  {name:<14}{partitions_scanned(conn, stmt, params):>6}")
+
+    archiver = UserArchiver(factory, batch_size=args.batch_size, pause=0)
+    started = time.perf_counter()
+    stats = archiver.run(datetime.utcnow(), max_batches=args.archive_batches)
+    archived = stats.archived
+    elapsed = time.perf_counter() - started
+    print(f"\narchived {archived:,} users in {elapsed:.2f}s ({archived / elapsed:,.0f} rows/s)")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""benchmark: listar N usuarios com hidratacao ORM vs SELECT so de colunas
+
+Compara o caminho antigo de UserRepoImpl.list (UserModel completo, copiado para User)
+com o atual (select das colunas mapeado direto para o User com __slots__). Reporta tempo
+e pico de memoria (tracemalloc) de cada um, num SQLite em arquivo temporario.
+
+    python -m benchmarks.bench_rows --rows 1000000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database.models import Base, UserModel
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+
+
+def seed(engine, rows: int, chunk: int = 50_000) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, chunk):
+            conn.execute(
+                insert(UserModel),
+                [
+                    {"name": f"User {i}", "email": f"user{i}@example.com"}
+                    for i in range(start, min(start + chunk, rows))
+                ],
+            )
+
+
+def orm_list(session: Session) -> List[User]:
+    # o que UserRepoImpl.list fazia: UserModel no identity map e depois uma copia em User
+    users = session.query(UserModel).order_by(UserModel.id).all()
+    return [
+        User(id=user.id, name=user.name, email=user.email, updated_at=user.updated_at)
+        for user in users
+    ]
+
+
+def column_list(session: Session) -> List[User]:
+    return UserRepoImpl(session).list()
+
+
+def run(factory, fn: Callable[[Session], List[User]], trace: bool):
+    gc.collect()
+    session = factory()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    users = fn(session)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    count = len(users)
+    session.close()
+    return elapsed, peak, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ORM hydration vs column-only reads")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        engine = create_engine(f"sqlite:///{path}")
+        seed(engine, args.rows)
+        factory = sessionmaker(bind=engine)
+
+        print(f"{'path':<10}{'rows':>10}{'seconds':>10}{'peak MB':>10}")
+        for name, fn in (("orm", orm_list), ("columns", column_list)):
+            # tempo sem tracemalloc (que distorce); memoria numa segunda passada
+            elapsed, _, count = run(factory, fn, trace=False)
+            _, peak, _ = run(factory, fn, trace=True)
+            print(f"{name:<10}{count:>10}{elapsed:>10.2f}{peak / 2**20:>10.1f}")
+        engine.dispose()
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""benchmark: custo de montar/compilar o statement por chamada vs statements pre-montados
+
+Compara o GET por id como era (select montado a cada chamada), o mesmo sem o compiled cache
+(query_cache_size=0, compila toda vez) e o GET_BY_ID pre-montado com bindparam. Mede so a
+construcao e a execucao completa num SQLite em memoria, para isolar o custo no Python.
+
+    python -m benchmarks.bench_statements
+"""
+import timeit
+from typing import Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.internal.infrastructure.database.connection import track_compiled_cache
+from app.internal.infrastructure.database.models import Base, UserModel
+from app.internal.infrastructure.database.user_repository import (
+    GET_BY_ID,
+    row_to_entity,
+    select_users,
+)
+
+
+def bench(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Melhor de `repeat` rodadas, em microssegundos por chamada"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def session(cache_size: int) -> Session:
+    engine = create_engine("sqlite://", poolclass=StaticPool, query_cache_size=cache_size)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add(UserModel(name="John Doe", email="john@example.com"))
+    db.commit()
+    return db
+
+
+def main() -> None:
+    cached, uncached = session(500), session(0)
+    stats = track_compiled_cache(cached.get_bind())
+
+    def built(db: Session) -> Callable[[], object]:
+        return lambda: row_to_entity(db.execute(select_users().where(UserModel.id == 1)).first())
+
+    def prebuilt(db: Session) -> Callable[[], object]:
+        return lambda: row_to_entity(db.execute(GET_BY_ID, {"user_id": 1}).first())
+
+    rows = (
+        ("build only", bench(lambda: select_users().where(UserModel.id == 1)), None),
+        ("build+compile", bench(built(uncached)), "execute, no compiled cache"),
+        ("build", bench(built(cached)), "execute, compiled cache"),
+        ("prebuilt", bench(prebuilt(cached)), "execute, compiled cache"),
+    )
+    print(f"{'mode':<16}{'us/op':>10}  notes")
+    for name, micros, notes in rows:
+        print(f"{name:<16}{micros:>10.1f}  {notes or 'statement construction'}")
+    print(f"\ncompiled cache: hit_ratio={stats.hit_ratio:.4f}, misses={stats.misses}")
+    cached.close()
+    uncached.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""benchmark: per-request overhead of each tracing mode
+
+Monta o mesmo app (GET /users/{id} sobre SQLite) para cada modo de tracing e mede o tempo
+medio por request. Os spans vao para um exportador nulo, entao o resultado e o custo da
+instrumentacao e da amostragem, sem rede.
+
+    python -m benchmarks.bench_tracing --requests 5000
+"""
+import argparse
+import time
+from typing import Dict, Optional
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.pool import StaticPool
+
+from app.config.config import Settings
+from app.config.tracing import build_tracer_provider
+from app.internal.infrastructure.database.models import Base, UserModel
+
+MODES: Dict[str, Dict[str, object]] = {
+    "disabled": {"tracing_enabled": False},
+    "ratio_0": {"tracing_sampler": "ratio", "tracing_sample_ratio": 0.0},
+    "ratio_0.1": {"tracing_sampler": "ratio", "tracing_sample_ratio": 0.1},
+    "rate_limited_10": {"tracing_sampler": "rate_limited", "tracing_rate_limit_per_second": 10},
+    "ratio_1_no_db": {"tracing_sample_ratio": 1.0, "tracing_instrument_db": False},
+    "ratio_1": {"tracing_sample_ratio": 1.0},
+}
+
+
+class NullExporter(SpanExporter):
+    def export(self, spans):
+        return SpanExportResult.SUCCESS
+
+
+def build_app(config: Settings) -> FastAPI:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel), [{"name": "User 1", "email": "user1@example.com"}])
+
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    def get_user(user_id: int):
+        with engine.connect() as conn:
+            row = conn.execute(select(UserModel).where(UserModel.id == user_id)).first()
+        return {"id": row.id, "name": row.name, "email": row.email}
+
+    provider = build_tracer_provider(config, exporter=NullExporter())
+    if provider is not None:
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+        if config.tracing_instrument_db:
+            SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=provider)
+    return app
+
+
+def measure(client: TestClient, requests: int) -> float:
+    """Tempo medio por request em microssegundos"""
+    for _ in range(min(200, requests)):
+        client.get("/users/1")
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get("/users/1")
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tracing overhead benchmark")
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    baseline: Optional[float] = None
+    print(f"{'mode':<18}{'us/request':>12}{'overhead':>12}")
+    for mode, overrides in MODES.items():
+        config = Settings(**{"tracing_enabled": True, **overrides})
+        try:
+            with TestClient(build_app(config)) as client:
+                elapsed = measure(client, args.requests)
+        finally:
+            if SQLAlchemyInstrumentor().is_instrumented_by_opentelemetry:
+                SQLAlchemyInstrumentor().uninstrument()
+        if baseline is None:
+            baseline = elapsed
+        print(f"{mode:<18}{elapsed:>12.1f}{(elapsed / baseline - 1):>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
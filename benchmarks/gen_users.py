@@ -0,0 +1,86 @@
+"""gera usuarios sinteticos para os benchmarks de volume (ex.: 10M linhas)
+
+No Postgres cada lote e um INSERT ... SELECT de generate_series, sem trafegar as linhas pela
+rede; nos demais bancos, executemany. Uma fracao (--deleted) ja sai com soft delete antigo,
+pronta para o arquivamento. Emails repetidos sao ignorados, entao da para rodar de novo.
+
+    python -m benchmarks.gen_users --db-url postgresql+psycopg2://... --rows 10000000
+    python -m benchmarks.gen_users --db-url sqlite:///users.db --rows 100000 --create-schema
+
+O schema vem das migrations (`USERS_PARTITIONING=hash make migrate` para a versao
+particionada); --create-schema usa o metadata, sem particionamento.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Connection
+
+from app.internal.infrastructure.database.models import Base, UserModel
+
+_POSTGRES_BATCH = """
+INSERT INTO users (name, email, created_at, updated_at, deleted_at)
+SELECT
+    'User ' || n,
+    'user' || n || '@example.com',
+    localtimestamp - (n % 1000) * interval '1 day',
+    localtimestamp - (n % 500) * interval '1 day',
+    CASE WHEN random() < :deleted THEN localtimestamp - interval '30 days' END
+FROM generate_series(:start, :stop) AS n
+ON CONFLICT DO NOTHING
+"""
+
+
+def insert_batch(conn: Connection, start: int, stop: int, deleted: float) -> None:
+    """Usuarios start..stop (inclusive)"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(_POSTGRES_BATCH), {"start": start, "stop": stop, "deleted": deleted})
+        return
+    now = datetime.utcnow()
+    rows = [
+        {
+            "name": f"User {n}",
+            "email": f"user{n}@example.com",
+            "created_at": now - timedelta(days=n % 1000),
+            "updated_at": now - timedelta(days=n % 500),
+            "deleted_at": now - timedelta(days=30) if random.random() < deleted else None,
+        }
+        for n in range(start, stop + 1)
+    ]
+    conn.execute(insert(UserModel).prefix_with("OR IGNORE"), rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="generate synthetic users")
+    parser.add_argument("--db-url", required=True)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--start", type=int, default=1, help="first user number")
+    parser.add_argument("--batch", type=int, default=None, help="rows per transaction")
+    parser.add_argument("--deleted", type=float, default=0.05, help="fraction soft deleted")
+    parser.add_argument("--create-schema", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+    batch = args.batch or (1_000_000 if engine.dialect.name == "postgresql" else 10_000)
+
+    started = time.perf_counter()
+    stop = args.start + args.rows - 1
+    for first in range(args.start, stop + 1, batch):
+        last = min(first + batch - 1, stop)
+        with engine.begin() as conn:
+            insert_batch(conn, first, last, args.deleted)
+        done = last - args.start + 1
+        elapsed = time.perf_counter() - started
+        print(f"{done:>12,} / {args.rows:,} rows  {done / elapsed:>10,.0f} rows/s", flush=True)
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE users"))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""end-to-end load harness for the /users routes
+
+Sobe o app num uvicorn em thread (mesmo processo, para ler as estatisticas do pool)
+e dispara cada rota com concorrencia configuravel. O banco vem de DB_URL, que precisa
+estar definido antes de importar o app (ver benchmarks/run.py).
+"""
+import asyncio
+import itertools
+import statistics
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_request: Callable[[int], Request],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Executa `requests` chamadas com `concurrency` clientes e retorna throughput/latencias"""
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            method, url, kwargs = make_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "errors": errors,
+    }
+
+
+def seed(users: int) -> None:
+    from sqlalchemy import insert
+
+    from app.internal.infrastructure.database.connection import engine
+    from app.internal.infrastructure.database.models import Base, UserModel
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(UserModel),
+            [{"name": f"User {i}", "email": f"user{i}@example.com"} for i in range(users)],
+        )
+
+
+def scenarios(users: int, requests: int) -> List[Tuple[str, Callable[[int], Request], int]]:
+    """(rota, gerador de request, quantidade) na ordem em que devem rodar"""
+    run = uuid.uuid4().hex[:8]
+    created_base = users + 1
+
+    def bulk_body(i: int) -> List[Dict[str, str]]:
+        return [
+            {"name": f"Bulk {i}-{j}", "email": f"bulk-{run}-{i}-{j}@example.com"} for j in range(50)
+        ]
+
+    return [
+        ("GET /users", lambda i: ("GET", "/users/", {"params": {"limit": 100}}), requests),
+        (
+            "GET /users/{id}",
+            lambda i: ("GET", f"/users/{i % users + 1}", {}),
+            requests,
+        ),
+        (
+            "GET /users/search",
+            lambda i: ("GET", "/users/search", {"params": {"name": f"user {i % users}"}}),
+            requests,
+        ),
+        (
+            "GET /users?stream",
+            lambda i: ("GET", "/users/", {"params": {"stream": "true"}}),
+            max(requests // 100, 2),
+        ),
+        (
+            "POST /users",
+            lambda i: (
+                "POST",
+                "/users/",
+                {"json": {"name": f"Load {i}", "email": f"load-{run}-{i}@example.com"}},
+            ),
+            requests,
+        ),
+        (
+            "POST /users/bulk",
+            lambda i: ("POST", "/users/bulk", {"json": bulk_body(i)}),
+            max(requests // 50, 2),
+        ),
+        (
+            "PUT /users/{id}",
+            lambda i: ("PUT", f"/users/{i % users + 1}", {"json": {"name": f"Updated {i}"}}),
+            requests,
+        ),
+        (
+            "DELETE /users/{id}",
+            lambda i: ("DELETE", f"/users/{created_base + i}", {}),
+            requests,
+        ),
+    ]
+
+
+class _ServerThread:
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        config.access_log = False
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("benchmark server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+def _pool_stats(engine) -> Tuple[float, int]:
+    from app.internal.infrastructure.database.connection import pool_stats
+
+    stats = pool_stats(engine)
+    return (stats.connect_seconds, stats.connects) if stats else (0.0, 0)
+
+
+def run_load(
+    users: int = 1000, requests: int = 2000, concurrency: int = 50, port: int = 8766
+) -> Dict[str, Dict[str, float]]:
+    from app.main import app
+    from app.internal.infrastructure.database.connection import engine
+
+    seed(users)
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def run_all():
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            for route, make_request, count in scenarios(users, requests):
+                seconds_before, connects_before = _pool_stats(engine)
+                result = await drive(client, make_request, count, concurrency)
+                seconds_after, connects_after = _pool_stats(engine)
+                connects = connects_after - connects_before
+                result["pool_connects"] = connects
+                result["pool_connect_ms_total"] = (seconds_after - seconds_before) * 1000
+                result["pool_connect_ms_mean"] = result["pool_connect_ms_total"] / max(connects, 1)
+                results[route] = result
+
+    with _ServerThread(app, port):
+        asyncio.run(run_all())
+    return results
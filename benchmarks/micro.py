@@ -0,0 +1,42 @@
+"""micro-benchmarks for the per-row hot paths (mapping, serialization, validation)"""
+import timeit
+from typing import Callable, Dict
+
+from sqlalchemy import create_engine, insert
+
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database.models import Base, UserModel
+from app.internal.infrastructure.database.user_repository import row_to_entity, select_users
+from app.internal.interfaces.dto.user import UserResponse
+
+
+def bench(fn: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    """Melhor de `repeat` rodadas, em nanossegundos por chamada"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"ns_per_op": best * 1e9}
+
+
+def _user_row():
+    """Uma Row de verdade de select_users(), como as que o repositorio mapeia"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel).values(name="João Silva", email="joao@example.com"))
+        row = conn.execute(select_users()).first()
+    engine.dispose()
+    return row
+
+
+def run_micro() -> Dict[str, Dict[str, float]]:
+    row = _user_row()
+    user = User(id=1, name="João Silva", email="joao@example.com")
+
+    return {
+        "row_to_entity": bench(lambda: row_to_entity(row)),
+        "user_response_serialize": bench(
+            lambda: UserResponse.model_validate(user).model_dump_json()
+        ),
+        "user_validate": bench(user.validate),
+    }
@@ -0,0 +1,66 @@
+"""benchmark results: persistence and regression check against a baseline"""
+import json
+import os
+from typing import Dict, List
+
+# metricas comparadas com o baseline e se maior (True) ou menor (False) e melhor
+TRACKED_METRICS = {
+    "requests_per_sec": True,
+    "p95_ms": False,
+    "ns_per_op": False,
+}
+
+
+def save(path: str, results: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = 0.15) -> List[str]:
+    """Lista as metricas que pioraram mais que `tolerance` (fracao) em relacao ao baseline"""
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    for name, value in sorted(current.items()):
+        metric = name.rsplit(".", 1)[-1]
+        if name not in previous:
+            continue
+        if metric == "errors":
+            if value > previous[name]:
+                regressions.append(f"{name}: {previous[name]:g} -> {value:g}")
+            continue
+        if metric not in TRACKED_METRICS or not previous[name]:
+            continue
+        change = (value - previous[name]) / previous[name]
+        worse = -change if TRACKED_METRICS[metric] else change
+        if worse > tolerance:
+            regressions.append(f"{name}: {previous[name]:.2f} -> {value:.2f} ({worse:+.0%} worse)")
+    return regressions
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    if not rows:
+        return
+    columns = sorted({column for row in rows.values() for column in row})
+    print(f"\n{title}")
+    print(f"{'':<26}" + "".join(f"{column:>20}" for column in columns))
+    for name, row in rows.items():
+        cells = "".join(f"{row.get(column, float('nan')):>20.2f}" for column in columns)
+        print(f"{name:<26}{cells}")
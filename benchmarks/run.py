@@ -0,0 +1,83 @@
+"""benchmark runner: micro-benchmarks + load harness, saved as JSON and compared to a baseline
+
+    python -m benchmarks.run                       # roda tudo e compara com benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline       # grava o resultado atual como baseline
+    python -m benchmarks.run --only micro
+"""
+import argparse
+import os
+import platform
+import shutil
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import report
+
+DEFAULT_OUTPUT = "benchmarks/results/latest.json"
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Shape benchmarks")
+    parser.add_argument("--only", choices=["micro", "load"])
+    parser.add_argument("--db-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # o engine e as settings sao criados no import do app, entao o ambiente vem antes
+    os.environ["DB_URL"] = args.db_url
+    os.environ.setdefault("JOB_QUEUE_BACKEND", "memory")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # sem collector local o exportador OTLP so gera retries; o custo do tracing fica em
+    # benchmarks.bench_tracing
+    os.environ.setdefault("TRACING_ENABLED", "false")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "db_url": args.db_url.split("@")[-1],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        }
+    }
+    if args.only in (None, "micro"):
+        from benchmarks.micro import run_micro
+
+        results["micro"] = run_micro()
+        report.print_table("micro-benchmarks", results["micro"])
+    if args.only in (None, "load"):
+        from benchmarks.load import run_load
+
+        results["load"] = run_load(args.users, args.requests, args.concurrency)
+        report.print_table("load (/users)", results["load"])
+
+    report.save(args.output, results)
+    print(f"\nresults saved to {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = report.compare(results, report.load(args.baseline), args.tolerance)
+    if regressions:
+        print(f"\nregressions (> {args.tolerance:.0%} worse than baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("no regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
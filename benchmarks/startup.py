@@ -0,0 +1,128 @@
+"""startup profiling: tempo de import de app.main (estilo -X importtime) e time-to-first-request
+
+    python -m benchmarks.startup                  # breakdown do import + primeira request
+    python -m benchmarks.startup --top 30 --no-request
+    TRACING_ENABLED=true python -m benchmarks.startup
+
+Cada medicao roda num processo novo, entao nada vem do cache de modulos deste processo.
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def startup_env(**overrides: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("TRACING_ENABLED", "false")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env.update(overrides)
+    return env
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(
+                ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2)
+            )
+    return records
+
+
+def profile_imports(module: str = "app.main", env: Optional[Dict[str, str]] = None):
+    """Roda `python -X importtime -c "import <module>"` num processo novo"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env or startup_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def by_package(records: List[ImportRecord]) -> Dict[str, int]:
+    """Tempo proprio (us) somado por pacote de topo: quanto cada dependencia custa"""
+    totals: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(env: Optional[Dict[str, str]] = None, timeout: float = 60.0) -> float:
+    """Segundos entre subir `python -m app --workers 1` e a primeira resposta de GET /"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app", "--workers", "1", "--port", str(port)],
+        env=env or startup_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup profiling for app.main")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--request", action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args()
+
+    records = profile_imports(args.module)
+    total = next(r.cumulative_us for r in records if r.module == args.module)
+    print(f"import {args.module}: {total / 1000:.1f}ms")
+
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in list(by_package(records).items())[: args.top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total:>8.1%}")
+
+    print(f"\n{'module (cumulative)':<56}{'ms':>10}")
+    slowest = sorted(records, key=lambda r: r.cumulative_us, reverse=True)
+    for record in slowest[1 : args.top + 1]:
+        name = "  " * record.depth + record.module
+        print(f"{name:<56}{record.cumulative_us / 1000:>10.1f}")
+
+    if args.request:
+        print(f"\ntime to first request: {time_to_first_request() * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
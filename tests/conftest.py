@@ -0,0 +1,5 @@
+""" shared test configuration """
+import os
+
+# sem collector OTLP nos testes: o exportador ficaria tentando reenviar spans ao sair
+os.environ.setdefault("TRACING_ENABLED", "false")
@@ -0,0 +1,37 @@
+""" test benchmark regression check """
+from benchmarks.report import compare, flatten
+
+
+class TestBenchReport:
+    def test_flatten(self):
+        flat = flatten({"load": {"GET /users": {"p95_ms": 10.0}}, "meta": {"python": "3.9"}})
+
+        assert flat == {"load.GET /users.p95_ms": 10.0}
+
+    def test_no_regression_within_tolerance(self):
+        baseline = {"load": {"get": {"requests_per_sec": 100.0, "p95_ms": 10.0}}}
+        results = {"load": {"get": {"requests_per_sec": 90.0, "p95_ms": 11.0}}}
+
+        assert compare(results, baseline, tolerance=0.15) == []
+
+    def test_throughput_and_latency_regressions(self):
+        baseline = {
+            "load": {"get": {"requests_per_sec": 100.0, "p95_ms": 10.0}},
+            "micro": {"validate": {"ns_per_op": 100.0}},
+        }
+        results = {
+            "load": {"get": {"requests_per_sec": 50.0, "p95_ms": 20.0}},
+            "micro": {"validate": {"ns_per_op": 90.0}},
+        }
+
+        regressions = compare(results, baseline, tolerance=0.15)
+
+        assert len(regressions) == 2
+        assert regressions[0].startswith("load.get.p95_ms")
+        assert regressions[1].startswith("load.get.requests_per_sec")
+
+    def test_new_errors_are_regressions(self):
+        baseline = {"load": {"get": {"errors": 0}}}
+        results = {"load": {"get": {"errors": 3}}}
+
+        assert compare(results, baseline) == ["load.get.errors: 0 -> 3"]
@@ -1,6 +1,6 @@
 """unit tests for User domain"""
 import pytest
-from app.internal.core.domain.user import User
+from app.internal.core.domain.user import PageVersion, User, UserVersion
 from app.internal.core.domain.exceptions import ValidationError
 
 
@@ -35,3 +35,28 @@ class TestUserEntity:
     def test_user_with_id(self):
         user = User(id=1, name="John Doe", email="john@example.com")
         assert user.id == 1
+
+    def test_validate_changes_only_checks_given_fields(self):
+        User.validate_changes(name="John Doe")
+        User.validate_changes(email="john@example.com")
+        User.validate_changes()
+
+    def test_validate_changes_invalid_email(self):
+        with pytest.raises(ValidationError, match="Invalid email format"):
+            User.validate_changes(email="invalid-email")
+
+    def test_validate_changes_empty_name(self):
+        with pytest.raises(ValidationError, match="Name is required"):
+            User.validate_changes(name="")
+
+    def test_user_is_slotted(self):
+        user = User(name="João Silva", email="joao@example.com", id=1)
+
+        assert not hasattr(user, "__dict__")
+        with pytest.raises(AttributeError):
+            user.nickname = "joao"
+
+    def test_versions_are_slotted(self):
+        assert not hasattr(UserVersion(id=1, updated_at=None), "__dict__")
+        assert not hasattr(PageVersion(count=0), "__dict__")
+        assert PageVersion.of([User(name="João", email="joao@example.com", id=3)]).last_id == 3
@@ -0,0 +1,166 @@
+"""unit tests for group commit"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.internal.core.domain.exceptions import DuplicateEmailError, UserNotFoundError
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database.group_commit import (
+    GroupCommitter,
+    GroupCommitUserRepository,
+)
+from app.internal.infrastructure.database.models import Base
+from app.internal.core.services.user_service import UserService
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.internal.infrastructure.tasks.queue import DatabaseJobQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def commits(engine):
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(conn))
+    return commits
+
+
+@pytest.fixture
+def committer(engine):
+    # janela longa: as escritas concorrentes do teste sempre caem no mesmo lote
+    committer = GroupCommitter(sessionmaker(bind=engine), window=0.5, max_batch=8)
+    yield committer
+    committer.stop(timeout=5)
+
+
+def _concurrently(count, fn):
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        return fn(index)
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(run, index) for index in range(count)]
+        return [future.exception() or future.result() for future in futures]
+
+
+class TestGroupCommitter:
+    def test_concurrent_writes_share_one_commit(self, engine, committer, commits):
+        SessionLocal = sessionmaker(bind=engine)
+
+        def create(index):
+            with SessionLocal() as db:
+                repo = GroupCommitUserRepository(UserRepoImpl(db), committer)
+                return repo.create(User(name=f"User {index}", email=f"u{index}@example.com"))
+
+        users = _concurrently(8, create)
+
+        assert sorted(user.email for user in users) == sorted(
+            f"u{index}@example.com" for index in range(8)
+        )
+        assert len(commits) == 1
+        assert (committer.stats.commits, committer.stats.writes) == (1, 8)
+        with SessionLocal() as db:
+            assert len(UserRepoImpl(db).list()) == 8
+
+    def test_domain_error_only_reaches_its_writer(self, engine, committer, commits):
+        with sessionmaker(bind=engine)() as db:
+            UserRepoImpl(db).create(User(name="Taken", email="taken@example.com"))
+        commits.clear()
+
+        def write(index):
+            if index == 0:
+                return committer.submit(
+                    lambda repo: repo.create(User(name="Again", email="taken@example.com"))
+                )
+            if index == 1:
+                return committer.submit(lambda repo: repo.patch(999, name="Nobody"))
+            return committer.submit(
+                lambda repo: repo.create(User(name="New", email=f"new{index}@example.com"))
+            )
+
+        results = _concurrently(4, write)
+
+        assert isinstance(results[0], DuplicateEmailError)
+        assert isinstance(results[1], UserNotFoundError)
+        assert [user.email for user in results[2:]] == ["new2@example.com", "new3@example.com"]
+        assert len(commits) == 1
+
+    def test_database_error_falls_back_to_one_commit_per_write(self, engine, committer):
+        def failing(repo):
+            raise OperationalError("UPDATE", {}, Exception("database is locked"))
+
+        def write(index):
+            if index == 0:
+                return committer.submit(failing)
+            return committer.submit(
+                lambda repo: repo.create(User(name="New", email=f"new{index}@example.com"))
+            )
+
+        results = _concurrently(3, write)
+
+        assert isinstance(results[0], OperationalError)
+        assert [user.email for user in results[1:]] == ["new1@example.com", "new2@example.com"]
+        assert committer.stats.fallbacks == 1
+
+    def test_domain_error_from_a_failed_statement_falls_back(self, engine, committer, commits):
+        with sessionmaker(bind=engine)() as db:
+            repo = UserRepoImpl(db)
+            repo.create(User(name="Taken", email="taken@example.com"))
+            other = repo.create(User(name="Other", email="other@example.com"))
+        commits.clear()
+
+        def write(index):
+            if index == 0:
+                # o UPDATE falha no banco: o lote nao pode ser commitado junto
+                return committer.submit(
+                    lambda repo: repo.patch(other.id, email="taken@example.com")
+                )
+            return committer.submit(
+                lambda repo: repo.create(User(name="New", email=f"new{index}@example.com"))
+            )
+
+        results = _concurrently(3, write)
+
+        assert isinstance(results[0], DuplicateEmailError)
+        assert [user.email for user in results[1:]] == ["new1@example.com", "new2@example.com"]
+        assert committer.stats.fallbacks == 1
+        assert len(commits) == 2
+
+    def test_writes_in_a_unit_of_work_skip_the_committer(self, engine, committer, commits):
+        with sessionmaker(bind=engine)() as db:
+            repo = GroupCommitUserRepository(UserRepoImpl(db), committer)
+            with repo.transaction():
+                repo.create(User(name="João Silva", email="joao@example.com"))
+                repo.create(User(name="Maria Souza", email="maria@example.com"))
+
+        assert len(commits) == 1
+        assert committer.stats.writes == 0
+
+    def test_outbox_writes_commit_on_the_request_session(self, engine, committer, commits):
+        # create + job de POST /users: atomicos na sessao da request, fora do committer
+        SessionLocal = sessionmaker(bind=engine)
+        queue = DatabaseJobQueue(SessionLocal)
+        with SessionLocal() as db:
+            service = UserService(GroupCommitUserRepository(UserRepoImpl(db), committer))
+            with service.unit_of_work():
+                user = service.create(User(name="João Silva", email="joao@example.com"))
+                queue.enqueue_in(db, "send_welcome_email", {"email": user.email})
+            with pytest.raises(DuplicateEmailError):
+                with service.unit_of_work():
+                    service.create(User(name="João Silva", email="joao@example.com"))
+                    queue.enqueue_in(db, "send_welcome_email", {"email": user.email})
+
+        assert len(commits) == 1
+        assert committer.stats.writes == 0
+        assert [job.payload for job in queue.claim(10)] == [{"email": "joao@example.com"}]
@@ -0,0 +1,212 @@
+""" test job queue and worker """
+import threading
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.internal.core.domain.exceptions import DuplicateEmailError
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database.models import Base
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.internal.infrastructure.tasks.queue import (
+    DEAD,
+    DONE,
+    PENDING,
+    RUNNING,
+    DatabaseJobQueue,
+    InMemoryJobQueue,
+)
+from app.internal.infrastructure.tasks.worker import Worker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # arquivo em vez de :memory: com StaticPool: as threads do Worker nao podem dividir
+    # a mesma conexao sqlite
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(params=["memory", "database"])
+def queue(request, session_factory):
+    if request.param == "memory":
+        return InMemoryJobQueue(max_attempts=3, lock_timeout=60)
+    return DatabaseJobQueue(session_factory, max_attempts=3, lock_timeout=60)
+
+
+def statuses(queue, job_ids):
+    if isinstance(queue, InMemoryJobQueue):
+        return [queue.jobs[job_id].status for job_id in job_ids]
+    return [job.status for job in _all_jobs(queue, job_ids)]
+
+
+def _all_jobs(queue, job_ids):
+    from app.internal.infrastructure.database.models import JobModel
+
+    with queue.session_factory() as db:
+        return [db.get(JobModel, job_id) for job_id in job_ids]
+
+
+class TestJobQueue:
+    def test_enqueue_and_claim(self, queue):
+        job = queue.enqueue("send_welcome_email", {"email": "joao@example.com", "name": "João"})
+
+        assert queue.depth() == 1
+        [claimed] = queue.claim(10)
+
+        assert claimed.id == job.id
+        assert claimed.payload == {"email": "joao@example.com", "name": "João"}
+        assert claimed.attempts == 1
+        assert claimed.status == RUNNING
+        assert queue.depth() == 0
+        assert queue.claim(10) == []
+
+    def test_claim_respects_limit(self, queue):
+        for i in range(5):
+            queue.enqueue("job", {"i": i})
+
+        assert len(queue.claim(2)) == 2
+        assert len(queue.claim(10)) == 3
+
+    def test_complete(self, queue):
+        job = queue.enqueue("job", {})
+        queue.claim(1)
+
+        queue.complete(job)
+
+        assert statuses(queue, [job.id]) == [DONE]
+
+    def test_fail_with_retry_reschedules(self, queue):
+        job = queue.enqueue("job", {})
+        [claimed] = queue.claim(1)
+
+        queue.fail(claimed, "boom", retry_at=datetime.utcnow() + timedelta(hours=1))
+
+        assert statuses(queue, [job.id]) == [PENDING]
+        assert queue.claim(1) == []
+
+    def test_fail_without_retry_goes_to_dead_letter(self, queue):
+        job = queue.enqueue("job", {})
+        [claimed] = queue.claim(1)
+
+        queue.fail(claimed, "boom", retry_at=None)
+
+        assert statuses(queue, [job.id]) == [DEAD]
+
+    def test_expired_lock_is_reclaimed(self, queue):
+        queue.lock_timeout = -1
+        queue.enqueue("job", {})
+        queue.claim(1)
+
+        [reclaimed] = queue.claim(1)
+
+        assert reclaimed.attempts == 2
+
+
+class TestOutbox:
+    def test_job_commits_with_the_callers_transaction(self, session_factory):
+        queue = DatabaseJobQueue(session_factory)
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            with repository.transaction():
+                user = repository.create(User(name="João", email="joao@example.com"))
+                queue.enqueue_in(db, "send_welcome_email", {"email": user.email})
+                assert queue.depth() == 0  # ainda nao commitado
+
+        jobs = queue.claim(10)
+        assert [(job.name, job.payload) for job in jobs] == [
+            ("send_welcome_email", {"email": "joao@example.com"})
+        ]
+
+    def test_job_is_rolled_back_with_the_callers_transaction(self, session_factory):
+        queue = DatabaseJobQueue(session_factory)
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            repository.create(User(name="João", email="joao@example.com"))
+            with pytest.raises(DuplicateEmailError):
+                with repository.transaction():
+                    queue.enqueue_in(db, "send_welcome_email", {"email": "joao@example.com"})
+                    repository.create(User(name="João", email="joao@example.com"))
+
+        assert queue.depth() == 0
+
+    def test_memory_queue_enqueues_after_the_commit(self, session_factory):
+        queue = InMemoryJobQueue()
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            with repository.transaction():
+                repository.create(User(name="João", email="joao@example.com"))
+                queue.enqueue_in(db, "send_welcome_email", {"email": "joao@example.com"})
+                assert queue.depth() == 0
+
+        assert [job.name for job in queue.claim(10)] == ["send_welcome_email"]
+
+    def test_memory_queue_drops_jobs_on_rollback(self, session_factory):
+        queue = InMemoryJobQueue()
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            repository.create(User(name="João", email="joao@example.com"))
+            with pytest.raises(DuplicateEmailError):
+                with repository.transaction():
+                    queue.enqueue_in(db, "send_welcome_email", {"email": "joao@example.com"})
+                    repository.create(User(name="João", email="joao@example.com"))
+            db.commit()
+
+        assert queue.depth() == 0
+
+
+class TestWorker:
+    def test_runs_batch_and_completes_jobs(self, queue):
+        handler = Mock()
+        jobs = [queue.enqueue("send", {"email": f"user{i}@example.com"}) for i in range(3)]
+        worker = Worker(queue, {"send": handler}, concurrency=2, batch_size=10)
+
+        assert worker.run_once() == 3
+
+        assert handler.call_count == 3
+        assert statuses(queue, [job.id for job in jobs]) == [DONE] * 3
+
+    def test_failed_job_is_retried_with_backoff(self, queue):
+        handler = Mock(side_effect=RuntimeError("smtp down"))
+        job = queue.enqueue("send", {})
+        worker = Worker(queue, {"send": handler}, backoff_base=60)
+
+        worker.run_once()
+
+        assert statuses(queue, [job.id]) == [PENDING]
+        assert worker.run_once() == 0
+
+    def test_job_goes_to_dead_letter_after_max_attempts(self, queue):
+        handler = Mock(side_effect=RuntimeError("smtp down"))
+        job = queue.enqueue("send", {})
+        worker = Worker(queue, {"send": handler}, backoff_base=0)
+
+        for _ in range(3):
+            worker.run_once()
+
+        assert handler.call_count == 3
+        assert statuses(queue, [job.id]) == [DEAD]
+
+    def test_unknown_job_goes_to_dead_letter(self, queue):
+        job = queue.enqueue("unknown", {})
+        worker = Worker(queue, {})
+
+        worker.run_once()
+
+        assert statuses(queue, [job.id]) == [DEAD]
+
+    def test_start_and_stop_in_background(self):
+        queue = InMemoryJobQueue()
+        done = threading.Event()
+        worker = Worker(queue, {"send": lambda: done.set()}, poll_interval=0.01)
+
+        worker.start()
+        job = queue.enqueue("send", {})
+
+        assert done.wait(timeout=5)
+        worker.stop(timeout=5)
+        assert queue.jobs[job.id].status == DONE
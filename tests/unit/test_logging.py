@@ -0,0 +1,131 @@
+""" test logging pipeline """
+import json
+import logging
+import queue
+import sys
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from app.config import logging as logging_config
+from app.config.logging import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    RateLimitFilter,
+    TraceContextFilter,
+)
+
+
+def _record(msg, *args, level=logging.ERROR, name="shape.test"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJsonFormatter:
+    def test_formats_lazy_args(self):
+        record = _record("GET /users/%s failed - not found", 42)
+        TraceContextFilter().filter(record)
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        assert payload["message"] == "GET /users/42 failed - not found"
+        assert payload["level"] == "ERROR"
+        assert payload["logger"] == "shape.test"
+        assert "trace_id" not in payload
+
+    def test_carries_trace_and_span_ids(self):
+        tracer = TracerProvider().get_tracer("test")
+        with tracer.start_as_current_span("request") as span:
+            record = _record("boom")
+            TraceContextFilter().filter(record)
+
+        payload = json.loads(JsonFormatter().format(record))
+
+        context = span.get_span_context()
+        assert payload["trace_id"] == format(context.trace_id, "032x")
+        assert payload["span_id"] == format(context.span_id, "016x")
+
+
+class TestRateLimitFilter:
+    def test_suppresses_repeated_messages_and_reports_count(self):
+        clock = FakeClock()
+        rate_limit = RateLimitFilter(limit=2, interval=60, clock=clock)
+
+        allowed = [
+            rate_limit.filter(_record("POST /users failed - duplicate email: %s", f"u{i}@x.com"))
+            for i in range(5)
+        ]
+        assert allowed == [True, True, False, False, False]
+
+        clock.now = 61
+        record = _record("POST /users failed - duplicate email: %s", "u9@x.com")
+        assert rate_limit.filter(record)
+        assert record.getMessage() == (
+            "POST /users failed - duplicate email: u9@x.com (3 similar messages suppressed)"
+        )
+
+    def test_different_messages_and_info_are_not_limited(self):
+        rate_limit = RateLimitFilter(limit=1, clock=FakeClock())
+
+        assert rate_limit.filter(_record("first"))
+        assert rate_limit.filter(_record("second"))
+        assert rate_limit.filter(_record("first", name="shape.other"))
+        assert all(rate_limit.filter(_record("info", level=logging.INFO)) for _ in range(3))
+
+
+class TestDroppingQueueHandler:
+    def test_drops_instead_of_blocking_when_full(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+        for i in range(5):
+            handler.handle(_record("message %s", i))
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_prepare_resolves_args_and_keeps_exception(self):
+        handler = DroppingQueueHandler(queue.Queue())
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord(
+                "shape.test", logging.ERROR, __file__, 1, "failed: %s", ("x",), sys.exc_info()
+            )
+
+        prepared = handler.prepare(record)
+
+        assert prepared.msg == "failed: x"
+        assert prepared.args is None
+        payload = json.loads(JsonFormatter().format(prepared))
+        assert payload["message"] == "failed: x"
+        assert "ValueError: boom" in payload["exception"]
+
+
+class TestSetupLogging:
+    def test_second_call_replaces_the_previous_handler(self, monkeypatch, capsys):
+        monkeypatch.setattr(logging_config.settings, "log_async", True)
+        monkeypatch.setattr(logging_config.settings, "log_format", "text")
+        root = logging.getLogger()
+        before = list(root.handlers)
+        try:
+            logging_config.setup_logging()
+            first = logging_config._root_handler
+            logging_config.setup_logging()
+
+            assert first not in root.handlers
+            logging.getLogger("shape.test").warning("after second setup")
+            logging_config._stop_listener()
+
+            assert capsys.readouterr().out.count("after second setup") == 1
+        finally:
+            logging_config._stop_listener()
+            for handler in root.handlers:
+                if handler not in before:
+                    root.removeHandler(handler)
+            logging_config._root_handler = None
@@ -0,0 +1,85 @@
+""" test metrics """
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.config.metrics import MetricsMiddleware, MetricsRegistry
+
+
+def _app(registry):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/users/{user_id}")
+    def get_user(user_id: int):
+        if user_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": user_id}
+
+    return app
+
+
+class TestMetricsRegistry:
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.request_started()
+        registry.request_finished("GET", "/users", 200, 0.05)
+        registry.request_started()
+        registry.request_finished("GET", "/users", 200, 0.5)
+
+        text = registry.render()
+
+        assert (
+            'http_request_duration_seconds_bucket{method="GET",route="/users",le="0.1"} 1' in text
+        )
+        assert (
+            'http_request_duration_seconds_bucket{method="GET",route="/users",le="1.0"} 2' in text
+        )
+        assert (
+            'http_request_duration_seconds_bucket{method="GET",route="/users",le="+Inf"} 2' in text
+        )
+        assert 'http_request_duration_seconds_count{method="GET",route="/users"} 2' in text
+        assert "http_requests_in_flight 0" in text
+
+    def test_collectors_add_gauges_and_failures_are_skipped(self):
+        registry = MetricsRegistry()
+
+        def broken():
+            raise RuntimeError("db down")
+
+        registry.add_collector(broken)
+        registry.add_collector(lambda: [("job_queue_depth", "Pending jobs", {}, 3)])
+
+        text = registry.render()
+
+        assert "# TYPE job_queue_depth gauge" in text
+        assert "job_queue_depth 3" in text
+
+
+class TestMetricsMiddleware:
+    def test_records_route_template_and_status(self):
+        registry = MetricsRegistry()
+        client = TestClient(_app(registry))
+
+        client.get("/users/1")
+        client.get("/users/2")
+        client.get("/users/0")
+        client.get("/missing")
+
+        text = registry.render()
+        assert 'http_requests_total{method="GET",route="/users/{user_id}",status="200"} 2' in text
+        assert (
+            'http_request_errors_total{method="GET",route="/users/{user_id}",status="404"} 1'
+            in text
+        )
+        assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in text
+
+    def test_metrics_endpoint(self):
+        from app.main import app
+
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "db_pool_checked_out" in response.text
+        assert 'db_compiled_cache_events{result="hits"}' in response.text
@@ -0,0 +1,232 @@
+"""unit tests for the online migration helpers"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+from unittest.mock import Mock
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import StaticPool
+
+from app.internal.infrastructure.database import online_migration as online
+from app.internal.infrastructure.database.models import Base, UserModel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def _db_error(pgcode):
+    return DBAPIError("ALTER TABLE users ...", {}, PgError(pgcode))
+
+
+def _index_sql(conn, name):
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+    ).scalar()
+
+
+def _revision(filename):
+    path = Path(__file__).parents[2] / "alembic" / "versions" / filename
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(UserModel),
+            [{"name": f"user {n}", "email": f"user{n}@example.com"} for n in range(10)],
+        )
+    yield engine
+    engine.dispose()
+
+
+class TestRunWithRetries:
+    def test_retries_lock_timeouts(self):
+        calls = []
+
+        def ddl():
+            calls.append(1)
+            if len(calls) < 3:
+                raise _db_error(online.LOCK_NOT_AVAILABLE)
+            return "done"
+
+        clock = FakeClock()
+        assert online.run_with_retries(ddl, retries=5, backoff=1.0, sleep=clock.sleep) == "done"
+        assert len(calls) == 3
+        assert len(clock.sleeps) == 2
+        assert 1.0 <= clock.sleeps[1] <= 2.0  # backoff dobra, com jitter
+
+    def test_gives_up_after_retries(self):
+        def ddl():
+            raise _db_error(online.LOCK_NOT_AVAILABLE)
+
+        with pytest.raises(DBAPIError):
+            online.run_with_retries(ddl, retries=2, backoff=0.0, sleep=lambda _: None)
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        def ddl():
+            calls.append(1)
+            raise _db_error("23505")
+
+        with pytest.raises(DBAPIError):
+            online.run_with_retries(ddl, retries=5, backoff=0.0, sleep=lambda _: None)
+        assert len(calls) == 1
+
+
+class TestBackfill:
+    def test_updates_in_batches(self, engine):
+        with engine.connect() as conn:
+            progress = online.Backfill(
+                conn, "users", "name = upper(name)", where="name LIKE 'user%'", batch_size=3
+            ).run()
+            names = conn.execute(text("SELECT name FROM users ORDER BY id")).scalars().all()
+
+        assert (progress.rows, progress.batches, progress.percent) == (10, 4, 100.0)
+        assert names == [f"USER {n}" for n in range(10)]
+
+    def test_throttles_by_rows_per_second(self, engine):
+        clock = FakeClock()
+        with engine.connect() as conn:
+            online.Backfill(
+                conn,
+                "users",
+                "name = upper(name)",
+                batch_size=5,
+                rows_per_second=10,
+                sleep=clock.sleep,
+                clock=clock,
+            ).run()
+
+        assert clock.sleeps == [0.5, 0.5]
+
+    def test_waits_for_simulated_replica(self, engine):
+        clock = FakeClock()
+        replica = online.SimulatedReplica(rows_per_second=2, clock=clock)
+        with engine.connect() as conn:
+            progress = online.Backfill(
+                conn,
+                "users",
+                "name = upper(name)",
+                batch_size=5,
+                max_lag=1.0,
+                replica=replica,
+                sleep=clock.sleep,
+                clock=clock,
+            ).run()
+
+        # cada lote de 5 linhas atrasa a replica 2.5s e o backfill espera voltar a 1s:
+        # 1.5s depois do primeiro, 2.5s depois do segundo
+        assert progress.lag_wait_seconds == pytest.approx(4.0)
+        assert replica.lag() <= 1.0
+
+
+class TestCreateIndex:
+    def test_sql(self):
+        assert online.create_index_sql(
+            "ix_users_deleted_at", "users", ["deleted_at"], where="deleted_at IS NOT NULL"
+        ) == (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_deleted_at ON users (deleted_at) "
+            "WHERE deleted_at IS NOT NULL"
+        )
+        assert online.create_index_sql(
+            "ix_users_name_trgm",
+            "users",
+            ["lower(name) gin_trgm_ops"],
+            using="gin",
+            concurrently=False,
+            only=True,
+        ) == (
+            "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON ONLY users USING gin "
+            "(lower(name) gin_trgm_ops)"
+        )
+
+    def test_falls_back_to_create_index(self, engine):
+        with engine.begin() as conn:
+            op = Operations(MigrationContext.configure(conn))
+            online.create_index(
+                op, "ix_users_name_upper", "users", ["upper(name)"], where="name IS NOT NULL"
+            )
+            assert _index_sql(conn, "ix_users_name_upper") == (
+                "CREATE INDEX ix_users_name_upper ON users (upper(name)) WHERE name IS NOT NULL"
+            )
+
+            online.drop_index(op, "ix_users_name_upper", "users")
+            assert _index_sql(conn, "ix_users_name_upper") is None
+
+    def test_missing_partition_key(self):
+        assert online.missing_partition_key(["email", "id"], ["id"]) == []
+        assert online.missing_partition_key(["email text_pattern_ops", '"ID"'], ["ID"]) == []
+        assert online.missing_partition_key(["email"], ["id"]) == ["id"]
+        assert online.missing_partition_key(["lower(id::text)"], ["id"]) == ["id"]
+        assert online.missing_partition_key(["email"], [None]) == ["<expression>"]
+
+    def test_unique_index_on_partitioned_table_needs_partition_key(self, monkeypatch):
+        op = Mock()
+        op.get_bind.return_value.dialect.name = "postgresql"
+        monkeypatch.setattr(online, "_is_partitioned", lambda conn, table: True)
+        monkeypatch.setattr(online, "_partition_key", lambda conn, table: ["id"])
+
+        with pytest.raises(ValueError, match="partition key: missing id"):
+            online.create_index(op, "ix_users_email", "users", ["email"], unique=True)
+
+        # nenhum DDL: o erro sai antes do autocommit_block
+        op.get_context.assert_not_called()
+        op.get_bind.return_value.execute.assert_not_called()
+
+    def test_drop_invalid_index_is_scoped_to_the_table_schema(self):
+        conn = Mock()
+        conn.execute.return_value.scalar.return_value = "archive.ix_users_email"
+
+        online._drop_invalid_index(conn, "ix_users_email", "archive.users")
+
+        lookup, drop = conn.execute.call_args_list
+        assert "pg_namespace" in str(lookup.args[0])
+        assert lookup.args[1] == {"name": "ix_users_email", "table": "archive.users"}
+        assert str(drop.args[0]) == "DROP INDEX CONCURRENTLY IF EXISTS archive.ix_users_email"
+
+
+class TestSoftDeleteMigration:
+    def test_upgrade_reruns_after_the_column_was_committed(self):
+        # uma nova tentativa do make migrate-online refaz a revision com deleted_at ja criada
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        revisions = [
+            "a1f4c6e8b2d0_users_table.py",
+            "4e1f0c2a9d7b_create_jobs_table.py",
+            "c3a8d5e1f2b4_users_search_indexes.py",
+        ]
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                for filename in revisions:
+                    _revision(filename).upgrade()
+                conn.execute(text("ALTER TABLE users ADD COLUMN deleted_at DATETIME"))
+
+                _revision("d9e2b4f6a8c1_users_soft_delete_archive.py").upgrade()
+
+            assert _index_sql(conn, "ix_users_email").endswith("WHERE deleted_at IS NULL")
+        engine.dispose()
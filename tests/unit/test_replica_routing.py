@@ -0,0 +1,199 @@
+""" test read replica routing
+
+Primario e replica sao dois bancos independentes com o mesmo id e nomes diferentes, entao
+o nome lido mostra de onde veio a leitura. Por padrao sao dois arquivos SQLite; para rodar
+contra Postgres local, aponte TEST_PRIMARY_DB_URL e TEST_REPLICA_DB_URL para dois bancos.
+"""
+import os
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database.async_user_repository import AsyncUserRepoImpl
+from app.internal.infrastructure.database.connection import (
+    ReplicaSet,
+    RoutingSession,
+    to_async_url,
+)
+from app.internal.infrastructure.database.models import Base, UserModel
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.internal.interfaces.api import dependencies
+from app.internal.interfaces.api.dependencies import use_primary_db
+
+
+def _database(url: str, name: str):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel), [{"id": 1, "name": name, "email": "user@example.com"}])
+    return engine
+
+
+@pytest.fixture
+def primary(tmp_path):
+    engine = _database(
+        os.environ.get("TEST_PRIMARY_DB_URL", f"sqlite:///{tmp_path}/primary.db"), "Primary"
+    )
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path):
+    engine = _database(
+        os.environ.get("TEST_REPLICA_DB_URL", f"sqlite:///{tmp_path}/replica.db"), "Replica"
+    )
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _session(primary, replica_set, **kwargs):
+    factory = sessionmaker(class_=RoutingSession, bind=primary, replicas=replica_set)
+    return factory(**kwargs)
+
+
+class TestRoutingSession:
+    def test_reads_go_to_replica(self, primary, replica):
+        with _session(primary, ReplicaSet([replica])) as session:
+            repo = UserRepoImpl(session)
+
+            assert repo.get_by_id(1).name == "Replica"
+            assert [user.name for user in repo.list()] == ["Replica"]
+
+    def test_use_primary(self, primary, replica):
+        with _session(primary, ReplicaSet([replica]), use_primary=True) as session:
+            assert UserRepoImpl(session).get_by_id(1).name == "Primary"
+
+    def test_without_replicas_everything_goes_to_primary(self, primary):
+        with _session(primary, None) as session:
+            assert UserRepoImpl(session).get_by_id(1).name == "Primary"
+
+    def test_reads_after_a_write_stay_on_primary(self, primary, replica):
+        with _session(primary, ReplicaSet([replica])) as session:
+            repo = UserRepoImpl(session)
+
+            repo.patch(1, name="Primary Updated")
+
+            assert repo.get_by_id(1).name == "Primary Updated"
+        with replica.connect() as conn:
+            assert conn.exec_driver_sql("SELECT name FROM users").scalar() == "Replica"
+
+    def test_round_robin_between_sessions(self, primary, replica, tmp_path):
+        other = _database(f"sqlite:///{tmp_path}/other.db", "Other")
+        replica_set = ReplicaSet([replica, other])
+
+        names = []
+        for _ in range(4):
+            with _session(primary, replica_set) as session:
+                names.append(UserRepoImpl(session).get_by_id(1).name)
+
+        assert names == ["Replica", "Other", "Replica", "Other"]
+        other.dispose()
+
+    def test_replica_down_falls_back_to_primary(self, primary, tmp_path):
+        broken = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+        clock = FakeClock()
+        replica_set = ReplicaSet([broken], retry_seconds=30, clock=clock)
+
+        with _session(primary, replica_set) as session:
+            with pytest.raises(OperationalError):
+                UserRepoImpl(session).get_by_id(1)
+        assert not replica_set.is_healthy(broken)
+
+        with _session(primary, replica_set) as session:
+            assert UserRepoImpl(session).get_by_id(1).name == "Primary"
+
+        # volta ao rodizio depois de retry_seconds, se responder ao health check
+        (tmp_path / "missing").mkdir()
+        _database(f"sqlite:///{tmp_path}/missing/replica.db", "Recovered").dispose()
+        clock.now = 31
+        with _session(primary, replica_set) as session:
+            assert UserRepoImpl(session).get_by_id(1).name == "Recovered"
+        assert replica_set.is_healthy(broken)
+        broken.dispose()
+
+    def test_create_is_read_back_from_primary(self, primary, replica):
+        with _session(primary, ReplicaSet([replica])) as session:
+            created = UserRepoImpl(session).create(User(name="Novo", email="novo@example.com"))
+
+        assert created.id is not None
+        with _session(primary, ReplicaSet([replica]), use_primary=True) as session:
+            assert UserRepoImpl(session).get_by_id(created.id).name == "Novo"
+
+
+@pytest.mark.asyncio
+class TestAsyncRoutingSession:
+    async def test_async_reads_go_to_replica(self, primary, replica):
+        async_primary = create_async_engine(
+            to_async_url(primary.url.render_as_string(hide_password=False))
+        )
+        async_replica = create_async_engine(
+            to_async_url(replica.url.render_as_string(hide_password=False))
+        )
+        factory = async_sessionmaker(
+            bind=async_primary,
+            expire_on_commit=False,
+            sync_session_class=RoutingSession,
+            replicas=ReplicaSet([async_replica.sync_engine]),
+        )
+
+        async with factory() as session:
+            repo = AsyncUserRepoImpl(session)
+            assert (await repo.get_by_id(1)).name == "Replica"
+            await repo.patch(1, name="Primary Updated")
+            assert (await repo.get_by_id(1)).name == "Primary Updated"
+
+        await async_primary.dispose()
+        await async_replica.dispose()
+
+
+class TestReadYourWrites:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(dependencies.settings, "db_replica_urls", ["sqlite:///replica.db"])
+        monkeypatch.setattr(dependencies.settings, "db_read_your_writes_seconds", 5.0)
+        app = FastAPI()
+
+        @app.get("/")
+        def read(primary: bool = Depends(use_primary_db)):
+            return {"primary": primary}
+
+        @app.post("/")
+        def write(primary: bool = Depends(use_primary_db)):
+            return {"primary": primary}
+
+        return TestClient(app)
+
+    def test_reads_use_replica(self, client):
+        assert client.get("/").json() == {"primary": False}
+
+    def test_write_pins_client_to_primary(self, client):
+        response = client.post("/")
+
+        assert response.json() == {"primary": True}
+        assert dependencies.PRIMARY_UNTIL_COOKIE in response.cookies
+        assert client.get("/").json() == {"primary": True}
+
+    def test_expired_pin(self, client, monkeypatch):
+        client.post("/")
+        now = dependencies.time.time()
+        monkeypatch.setattr(dependencies.time, "time", lambda: now + 6)
+
+        assert client.get("/").json() == {"primary": False}
@@ -0,0 +1,53 @@
+""" test fast JSON responses """
+import json
+from datetime import datetime
+
+from fastapi import Response
+
+from app.internal.core.domain.user import User
+from app.internal.interfaces.api import responses
+from app.internal.interfaces.api.responses import (
+    FastJSONResponse,
+    dump_user,
+    dump_users,
+    user_list_response,
+)
+from app.internal.interfaces.dto.user import UserResponse
+
+
+class TestFastJSON:
+    def test_dump_users_matches_response_model(self):
+        users = [
+            User(
+                id=1, name="João Silva", email="joao@example.com", updated_at=datetime(2024, 5, 1)
+            ),
+            User(id=2, name="Maria Santos", email="maria@example.com"),
+        ]
+
+        data = json.loads(dump_users(users))
+
+        assert data == [UserResponse.model_validate(user).model_dump() for user in users]
+        assert "updated_at" not in data[0]
+
+    def test_dump_user_keeps_unicode(self):
+        body = dump_user(User(id=1, name="João", email="joao@example.com"))
+
+        assert "João".encode() in body
+
+    def test_user_list_response_copies_headers(self):
+        response = Response()
+        del response.headers["content-length"]
+        response.headers["X-Next-Cursor"] = "7"
+
+        result = user_list_response([User(id=7, name="Ana", email="ana@example.com")], response)
+
+        assert result.headers["x-next-cursor"] == "7"
+        assert result.media_type == "application/json"
+        assert json.loads(result.body)[0]["id"] == 7
+
+    def test_fast_json_response_without_orjson(self, monkeypatch):
+        monkeypatch.setattr(responses, "orjson", None)
+
+        response = FastJSONResponse({"name": "João", "id": 1})
+
+        assert response.body == '{"name":"João","id":1}'.encode()
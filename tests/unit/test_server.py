@@ -0,0 +1,83 @@
+""" test production server entry point and startup timing """
+import logging
+import os
+
+import pytest
+
+from app import server
+from app.config import logging as app_logging
+from app.config.startup import StartupTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestServer:
+    def test_default_workers_uses_available_cores(self, monkeypatch):
+        monkeypatch.setattr(os, "sched_getaffinity", lambda _pid: {0, 1, 2}, raising=False)
+
+        assert server.default_workers() == 3
+
+    def test_main_runs_uvicorn_with_import_string(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            server.uvicorn, "run", lambda app, **kwargs: calls.append((app, kwargs))
+        )
+
+        server.main(["--workers", "4", "--port", "9000", "--graceful-timeout", "5"])
+
+        app, kwargs = calls[0]
+        # string, nao o objeto: app.main so e importado dentro de cada worker
+        assert app == "app.main:app"
+        assert kwargs["workers"] == 4
+        assert kwargs["port"] == 9000
+        assert kwargs["timeout_graceful_shutdown"] == 5
+        assert kwargs["access_log"] is False
+
+
+class TestStartupTimer:
+    def test_phases_and_report(self):
+        clock = FakeClock()
+        timer = StartupTimer(clock=clock)
+
+        clock.now = 0.010
+        timer.mark("app")
+        with timer.phase("database"):
+            clock.now = 0.025
+
+        assert timer.phases == [("app", 0.010), ("database", pytest.approx(0.015))]
+        assert timer.report() == "app=10.0ms, database=15.0ms, total=25.0ms"
+
+    def test_failed_phase_is_recorded(self):
+        clock = FakeClock()
+        timer = StartupTimer(clock=clock)
+
+        with pytest.raises(RuntimeError):
+            with timer.phase("tracing"):
+                clock.now = 1.0
+                raise RuntimeError("collector down")
+
+        assert timer.phases == [("tracing", 1.0)]
+
+
+class TestLoggingAfterFork:
+    def test_listener_is_recreated(self, monkeypatch):
+        monkeypatch.setattr(app_logging.settings, "log_async", True)
+        app_logging.setup_logging()
+        old_listener = app_logging._listener
+        old_queue = app_logging._queue_handler.queue
+
+        app_logging._restart_listener_after_fork()
+
+        try:
+            assert app_logging._listener is not old_listener
+            assert app_logging._queue_handler.queue is not old_queue
+            assert app_logging._listener.queue is app_logging._queue_handler.queue
+            logging.getLogger("shape.test").info("after fork")
+        finally:
+            old_listener.stop()
@@ -0,0 +1,180 @@
+"""unit tests for request coalescing (single flight)"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from unittest.mock import AsyncMock, Mock
+
+from app.internal.core.domain.user import User
+from app.internal.core.services.single_flight import AsyncSingleFlight, SingleFlight
+from app.internal.core.services.user_service import AsyncUserService, UserService
+from app.internal.infrastructure.database.models import Base
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return User(id=1, name="John Doe", email="john@example.com")
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = [pool.submit(flights.do, ("get", 1), fetch) for _ in range(10)]
+            _wait_for(lambda: flights.stats.coalesced == 9)
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert (flights.stats.executed, flights.stats.coalesced) == (1, 9)
+
+    def test_error_reaches_every_waiter(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(5)
+            raise RuntimeError("database down")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flights.do, "key", fetch) for _ in range(3)]
+            _wait_for(lambda: flights.stats.coalesced == 2)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=5)
+
+    def test_finished_call_is_not_cached(self):
+        flights = SingleFlight()
+        fetch = Mock(side_effect=[1, 2])
+
+        assert flights.do("key", fetch) == 1
+        assert flights.do("key", fetch) == 2
+        assert flights.stats.coalesced == 0
+
+    def test_service_issues_one_query_for_concurrent_reads(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(bind=engine)
+        with SessionLocal() as db:
+            UserRepoImpl(db).create(User(name="John Doe", email="john@example.com"))
+
+        selects = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def slow_select(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                selects.append(statement)
+                time.sleep(0.2)
+
+        flights = SingleFlight()
+        barrier = threading.Barrier(8)
+
+        # cada thread e uma request: sessao e service proprios, single flight compartilhado
+        def request():
+            with SessionLocal() as db:
+                service = UserService(UserRepoImpl(db), flights=flights)
+                barrier.wait()
+                return service.get_by_id(1)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            users = list(pool.map(lambda _: request(), range(8)))
+
+        assert [user.email for user in users] == ["john@example.com"] * 8
+        assert len(selects) == 1
+        assert flights.stats.coalesced == 7
+        engine.dispose()
+
+    def test_list_pages_are_keyed_by_cursor(self):
+        flights = SingleFlight()
+        repo = Mock()
+        repo.list.return_value = []
+        service = UserService(repo, flights=flights)
+
+        service.list(limit=10, after=None)
+        service.list(limit=10, after=5)
+
+        assert repo.list.call_count == 2
+        assert flights.stats.executed == 2
+
+
+@pytest.mark.asyncio
+class TestAsyncSingleFlight:
+    async def test_concurrent_reads_share_one_query(self):
+        release = asyncio.Event()
+        repo = AsyncMock()
+
+        async def get_by_id(user_id):
+            await release.wait()
+            return User(id=user_id, name="John Doe", email="john@example.com")
+
+        repo.get_by_id.side_effect = get_by_id
+        flights = AsyncSingleFlight()
+        tasks = [
+            asyncio.ensure_future(AsyncUserService(repo, flights=flights).get_by_id(1))
+            for _ in range(50)
+        ]
+        while flights.stats.coalesced < 49:
+            await asyncio.sleep(0)
+        release.set()
+        users = await asyncio.gather(*tasks)
+
+        assert repo.get_by_id.await_count == 1
+        assert all(user is users[0] for user in users)
+
+    async def test_cancelled_leader_hands_over(self):
+        started = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            started.set()
+            await asyncio.sleep(0 if len(calls) > 1 else 10)
+            return "user"
+
+        flights = AsyncSingleFlight()
+        leader = asyncio.ensure_future(flights.do("key", fetch))
+        await started.wait()
+        follower = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "user"
+        assert len(calls) == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    async def test_cancelled_waiter_does_not_cancel_the_call(self):
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "user"
+
+        flights = AsyncSingleFlight()
+        leader = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+
+        assert await leader == "user"
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
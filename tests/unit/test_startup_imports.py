@@ -0,0 +1,56 @@
+""" guard against import-time regressions in app.main """
+import pytest
+
+from benchmarks.startup import by_package, parse_importtime, profile_imports, startup_env
+
+# nao devem ser importados com TRACING_ENABLED=false e DB_ASYNC=false
+LAZY_MODULES = (
+    "opentelemetry",
+    "grpc",
+    "pkg_resources",
+    "sqlalchemy.ext.asyncio",
+    "asyncpg",
+    "aiosqlite",
+    "app.config.sampling",
+    "app.internal.interfaces.api.async_user_handler",
+    "app.internal.infrastructure.database.async_user_repository",
+)
+
+
+@pytest.fixture(scope="module")
+def imported():
+    env = startup_env(TRACING_ENABLED="false", DB_ASYNC="false")
+    return {record.module for record in profile_imports("app.main", env)}
+
+
+class TestStartupImports:
+    def test_app_main_is_imported(self, imported):
+        assert "app.main" in imported
+
+    @pytest.mark.parametrize("module", LAZY_MODULES)
+    def test_optional_subsystems_are_not_imported(self, imported, module):
+        loaded = sorted(
+            name for name in imported if name == module or name.startswith(module + ".")
+        )
+        assert loaded == []
+
+
+class TestImportTimeParsing:
+    def test_parse_and_group_by_package(self):
+        stderr = "\n".join(
+            [
+                "import time: self [us] | cumulative | imported package",
+                "import time:       100 |        100 |     sqlalchemy.sql",
+                "import time:        50 |        150 |   sqlalchemy",
+                "import time:        30 |        180 | app.main",
+            ]
+        )
+
+        records = parse_importtime(stderr)
+
+        assert [(r.module, r.depth) for r in records] == [
+            ("sqlalchemy.sql", 2),
+            ("sqlalchemy", 1),
+            ("app.main", 0),
+        ]
+        assert by_package(records) == {"sqlalchemy": 150, "app": 30}
@@ -0,0 +1,69 @@
+""" test tracing configuration """
+import pytest
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import Decision
+
+from app.config.config import Settings
+from app.config.sampling import RateLimitingSampler, build_sampler
+from app.config.tracing import build_tracer_provider
+
+
+class NullExporter(SpanExporter):
+    def export(self, spans):
+        return SpanExportResult.SUCCESS
+
+
+class TestTracing:
+    def test_disabled_builds_no_provider(self):
+        assert build_tracer_provider(Settings(tracing_enabled=False)) is None
+
+    def test_ratio_sampler_is_parent_based(self):
+        sampler = build_sampler(Settings(tracing_sampler="ratio", tracing_sample_ratio=0.25))
+
+        description = sampler.get_description()
+        assert description.startswith("ParentBased")
+        assert "TraceIdRatioBased{0.25}" in description
+
+    def test_rate_limited_sampler(self):
+        sampler = build_sampler(
+            Settings(tracing_sampler="rate_limited", tracing_rate_limit_per_second=5)
+        )
+
+        assert "RateLimitingSampler{5.0}" in sampler.get_description()
+
+    def test_unknown_sampler(self):
+        with pytest.raises(ValueError):
+            build_sampler(Settings(tracing_sampler="sometimes"))
+
+    def test_rate_limiting_sampler_caps_traces_per_second(self):
+        sampler = RateLimitingSampler(rate=3)
+
+        decisions = [sampler.should_sample(None, i, "GET /users").decision for i in range(10)]
+
+        assert decisions.count(Decision.RECORD_AND_SAMPLE) == 3
+        assert decisions[-1] == Decision.DROP
+
+    def test_rate_limiting_sampler_with_fractional_rate(self):
+        now = [0.0]
+        sampler = RateLimitingSampler(rate=0.5, clock=lambda: now[0])
+
+        def sampled_at(seconds):
+            now[0] = seconds
+            return sampler.should_sample(None, 1, "GET /users").decision
+
+        assert sampled_at(0.0) == Decision.RECORD_AND_SAMPLE
+        assert sampled_at(1.0) == Decision.DROP
+        # um trace a cada 2s
+        assert sampled_at(2.0) == Decision.RECORD_AND_SAMPLE
+        assert sampled_at(3.0) == Decision.DROP
+        assert sampled_at(4.0) == Decision.RECORD_AND_SAMPLE
+
+    def test_provider_uses_configured_sampler_and_exporter(self):
+        provider = build_tracer_provider(
+            Settings(tracing_enabled=True, tracing_sample_ratio=0.0), exporter=NullExporter()
+        )
+        try:
+            with provider.get_tracer("test").start_as_current_span("span") as span:
+                assert not span.get_span_context().trace_flags.sampled
+        finally:
+            provider.shutdown()
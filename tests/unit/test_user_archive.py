@@ -0,0 +1,122 @@
+"""unit tests for users archival and partitioning DDL"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.internal.core.domain.user import User
+from app.internal.infrastructure.database import partitioning
+from app.internal.infrastructure.database.archive import UserArchiver
+from app.internal.infrastructure.database.models import Base, UserArchiveModel, UserModel
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _create_users(session_factory, count):
+    with session_factory() as db:
+        return UserRepoImpl(db).create_many(
+            [User(name=f"User {n}", email=f"user{n}@example.com") for n in range(count)]
+        )
+
+
+class TestUserArchiver:
+    def test_moves_deleted_users_in_batches(self, session_factory):
+        users = _create_users(session_factory, 7)
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            for user in users[:5]:
+                repository.delete(user.id)
+        transactions = []
+        event.listen(session_factory.kw["bind"], "commit", lambda conn: transactions.append(1))
+        pauses = []
+
+        stats = UserArchiver(session_factory, batch_size=2, sleep=pauses.append).run(
+            deleted_before=datetime.utcnow() + timedelta(seconds=1)
+        )
+
+        assert (stats.archived, stats.batches) == (5, 3)
+        assert len(transactions) == 3
+        assert len(pauses) == 2
+        with session_factory() as db:
+            archived = db.execute(select(UserArchiveModel).order_by(UserArchiveModel.id))
+            assert [row.id for row in archived.scalars()] == [user.id for user in users[:5]]
+            assert db.execute(select(UserModel.id)).scalars().all() == [users[5].id, users[6].id]
+
+    def test_keeps_recently_deleted_users(self, session_factory):
+        users = _create_users(session_factory, 2)
+        with session_factory() as db:
+            UserRepoImpl(db).delete(users[0].id)
+
+        stats = UserArchiver(session_factory).run(
+            deleted_before=datetime.utcnow() - timedelta(days=7)
+        )
+
+        assert stats.archived == 0
+
+    def test_archives_deleted_user_whose_email_was_reused(self, session_factory):
+        user = _create_users(session_factory, 1)[0]
+        with session_factory() as db:
+            repository = UserRepoImpl(db)
+            repository.delete(user.id)
+            again = repository.create(User(name="User again", email=user.email))
+
+        stats = UserArchiver(session_factory).run(deleted_before=datetime.utcnow() + timedelta(1))
+
+        assert stats.archived == 1
+        with session_factory() as db:
+            assert db.execute(select(UserModel.id)).scalars().all() == [again.id]
+
+    def test_moves_inactive_users_by_id_window(self, session_factory):
+        users = _create_users(session_factory, 5)
+        long_ago = datetime.utcnow() - timedelta(days=400)
+        with session_factory() as db:
+            for user in (users[1], users[3]):
+                db.get(UserModel, user.id).updated_at = long_ago
+            db.commit()
+
+        stats = UserArchiver(session_factory, batch_size=2, sleep=lambda _: None).run(
+            deleted_before=datetime.utcnow() - timedelta(days=7),
+            inactive_before=datetime.utcnow() - timedelta(days=365),
+        )
+
+        assert stats.archived == 2
+        with session_factory() as db:
+            archived = db.execute(select(UserArchiveModel.id)).scalars().all()
+        assert sorted(archived) == [users[1].id, users[3].id]
+
+
+class TestPartitioning:
+    def test_hash_partitions(self):
+        ddl = partitioning.partitioned_users_ddl(partitioning.HASH, 4, 0)
+
+        assert "PARTITION BY HASH (id)" in ddl[0]
+        assert ddl[1] == (
+            "CREATE TABLE users_p0000 PARTITION OF users FOR VALUES WITH (MODULUS 4, REMAINDER 0)"
+        )
+        assert len([stmt for stmt in ddl if "PARTITION OF users" in stmt]) == 4
+        assert any("CREATE TRIGGER users_claim_email" in stmt for stmt in ddl)
+
+    def test_range_partitions(self):
+        ddl = partitioning.partitioned_users_ddl(partitioning.RANGE, 2, 1000)
+
+        assert "PARTITION BY RANGE (id)" in ddl[0]
+        assert ddl[1].endswith("FOR VALUES FROM (0) TO (1000)")
+        assert ddl[2].endswith("FOR VALUES FROM (1000) TO (2000)")
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            partitioning.partitioned_users_ddl("list", 4, 1000)
+
+    def test_missing_range_partitions_keeps_ranges_ahead(self):
+        # ids ate 2500 em faixas de 1000: particoes 0..2 em uso, mais 2 de folga
+        assert partitioning.missing_range_partitions(3, 2500, 1000, ahead=2) == [3, 4]
+        assert partitioning.missing_range_partitions(5, 2500, 1000, ahead=2) == []
@@ -0,0 +1,254 @@
+""" test user cache """
+import time
+import pytest
+from contextlib import asynccontextmanager, nullcontext
+from unittest.mock import AsyncMock, Mock
+
+from datetime import datetime
+from app.internal.core.domain.user import User, UserVersion
+from app.internal.core.domain.exceptions import UserNotFoundError
+from app.internal.infrastructure.cache.backends import InMemoryCache, SharedCache
+from app.internal.infrastructure.cache.cached_user_repository import (
+    AsyncCachedUserRepository,
+    CachedUserRepository,
+)
+
+
+class FakeSharedClient:
+    """fake local de um client redis (get/set com px/delete)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, px=None):
+        self.data[key] = (time.monotonic() + px / 1000, value.encode())
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture(params=["memory", "shared"])
+def cache(request):
+    if request.param == "memory":
+        return InMemoryCache(max_entries=100)
+    return SharedCache(FakeSharedClient())
+
+
+@pytest.fixture
+def mock_repo():
+    repo = Mock()
+    repo.get_by_id.return_value = User(id=1, name="João Silva", email="joao@example.com")
+    return repo
+
+
+@pytest.fixture
+def async_repo():
+    repo = AsyncMock()
+    repo.get_by_id.return_value = User(id=1, name="João Silva", email="joao@example.com")
+    return repo
+
+
+class TestCacheBackends:
+    def test_get_set_delete(self, cache):
+        assert cache.get("user:1") is None
+
+        cache.set("user:1", {"id": 1}, ttl=10)
+
+        assert cache.get("user:1") == {"id": 1}
+        cache.delete("user:1")
+        assert cache.get("user:1") is None
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 2
+
+    def test_expired_entry_is_a_miss(self, cache):
+        cache.set("user:1", {"id": 1}, ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get("user:1") is None
+
+    def test_lru_eviction(self):
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", {"v": 1}, ttl=10)
+        cache.set("b", {"v": 2}, ttl=10)
+        cache.get("a")
+        cache.set("c", {"v": 3}, ttl=10)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": 1}
+        assert len(cache) == 2
+        assert cache.stats.evictions == 1
+
+
+class TestCachedUserRepository:
+    def test_get_by_id_is_read_through(self, cache, mock_repo):
+        repository = CachedUserRepository(mock_repo, cache)
+
+        first = repository.get_by_id(1)
+        second = repository.get_by_id(1)
+
+        assert first == second == User(id=1, name="João Silva", email="joao@example.com")
+        mock_repo.get_by_id.assert_called_once_with(1)
+        assert cache.stats.hits == 1
+
+    def test_cached_user_keeps_updated_at(self, cache, mock_repo):
+        updated_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+        mock_repo.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=updated_at
+        )
+        repository = CachedUserRepository(mock_repo, cache)
+
+        repository.get_by_id(1)
+
+        assert repository.get_by_id(1).updated_at == updated_at
+        assert repository.get_version(1) == UserVersion(id=1, updated_at=updated_at)
+        mock_repo.get_version.assert_not_called()
+
+    def test_get_version_miss_goes_to_repository(self, cache, mock_repo):
+        mock_repo.get_version.return_value = UserVersion(id=1, updated_at=None)
+        repository = CachedUserRepository(mock_repo, cache)
+
+        assert repository.get_version(1) == UserVersion(id=1, updated_at=None)
+        mock_repo.get_version.assert_called_once_with(1)
+
+    def test_negative_lookup_is_cached(self, cache, mock_repo):
+        mock_repo.get_by_id.return_value = None
+        repository = CachedUserRepository(mock_repo, cache, negative_ttl=10)
+
+        assert repository.get_by_id(999) is None
+        assert repository.get_by_id(999) is None
+        mock_repo.get_by_id.assert_called_once_with(999)
+
+    def test_update_invalidates_entry(self, cache, mock_repo):
+        repository = CachedUserRepository(mock_repo, cache)
+        user = repository.get_by_id(1)
+        mock_repo.update.return_value = user
+
+        repository.update(user)
+        repository.get_by_id(1)
+
+        assert mock_repo.get_by_id.call_count == 2
+
+    def test_failed_update_still_invalidates_entry(self, cache, mock_repo):
+        repository = CachedUserRepository(mock_repo, cache)
+        user = repository.get_by_id(1)
+        mock_repo.update.side_effect = UserNotFoundError("not found")
+
+        with pytest.raises(UserNotFoundError):
+            repository.update(user)
+
+        assert cache.get("user:1") is None
+
+    def test_patch_invalidates_entry(self, cache, mock_repo):
+        repository = CachedUserRepository(mock_repo, cache)
+        repository.get_by_id(1)
+
+        repository.patch(1, name="João Patched")
+
+        mock_repo.patch.assert_called_once_with(1, name="João Patched", email=None, expected=None)
+        assert cache.get("user:1") is None
+
+    def test_delete_invalidates_entry(self, cache, mock_repo):
+        repository = CachedUserRepository(mock_repo, cache)
+        repository.get_by_id(1)
+        mock_repo.delete.return_value = True
+
+        assert repository.delete(1) is True
+        assert cache.get("user:1") is None
+
+    def test_create_clears_negative_entry(self, cache, mock_repo):
+        mock_repo.get_by_id.return_value = None
+        repository = CachedUserRepository(mock_repo, cache, negative_ttl=10)
+        repository.get_by_id(1)
+        mock_repo.create.return_value = User(id=1, name="João Silva", email="joao@example.com")
+
+        repository.create(User(name="João Silva", email="joao@example.com"))
+
+        assert cache.get("user:1") is None
+
+    def test_list_is_not_cached(self, cache, mock_repo):
+        mock_repo.list.return_value = []
+        repository = CachedUserRepository(mock_repo, cache)
+
+        repository.list(limit=10, after=None)
+        repository.list(limit=10, after=None)
+
+        assert mock_repo.list.call_count == 2
+
+    def test_get_many_only_fetches_misses(self, cache, mock_repo):
+        mock_repo.get_many.return_value = [User(id=2, name="Maria", email="maria@example.com")]
+        repository = CachedUserRepository(mock_repo, cache)
+        repository.get_by_id(1)
+
+        users = repository.get_many([1, 2, 3])
+
+        assert sorted(user.id for user in users) == [1, 2]
+        mock_repo.get_many.assert_called_once_with([2, 3])
+        # os ids inexistentes ficam no cache negativo, como em get_by_id
+        assert repository.get_many([1, 2, 3]) == users
+        assert mock_repo.get_many.call_count == 1
+
+    def test_transaction_invalidates_again_after_commit(self, cache, mock_repo):
+        mock_repo.transaction.return_value = nullcontext()
+        mock_repo.patch.return_value = User(id=1, name="João Updated", email="joao@example.com")
+        repository = CachedUserRepository(mock_repo, cache)
+
+        with repository.transaction():
+            repository.patch(1, name="João Updated")
+            # uma leitura antes do commit ainda ve (e cacheia) a linha antiga
+            repository.get_by_id(1)
+            assert cache.get("user:1") is not None
+
+        assert cache.get("user:1") is None
+
+
+@pytest.mark.asyncio
+class TestAsyncCachedUserRepository:
+    async def test_get_by_id_is_read_through(self, cache, async_repo):
+        repository = AsyncCachedUserRepository(async_repo, cache)
+
+        first = await repository.get_by_id(1)
+        second = await repository.get_by_id(1)
+
+        assert first == second == User(id=1, name="João Silva", email="joao@example.com")
+        async_repo.get_by_id.assert_awaited_once_with(1)
+        assert await repository.get_version(1) == UserVersion(id=1, updated_at=None)
+        async_repo.get_version.assert_not_called()
+
+    async def test_get_many_only_fetches_misses(self, cache, async_repo):
+        async_repo.get_many.return_value = [User(id=2, name="Maria", email="maria@example.com")]
+        repository = AsyncCachedUserRepository(async_repo, cache)
+        await repository.get_by_id(1)
+
+        users = await repository.get_many([1, 2, 3])
+
+        assert sorted(user.id for user in users) == [1, 2]
+        async_repo.get_many.assert_awaited_once_with([2, 3])
+
+    async def test_patch_invalidates_entry(self, cache, async_repo):
+        repository = AsyncCachedUserRepository(async_repo, cache)
+        await repository.get_by_id(1)
+
+        await repository.patch(1, name="João Patched")
+
+        assert cache.get("user:1") is None
+
+    async def test_transaction_invalidates_again_after_commit(self, cache, async_repo):
+        @asynccontextmanager
+        async def transaction():
+            yield
+
+        async_repo.transaction = transaction
+        repository = AsyncCachedUserRepository(async_repo, cache)
+
+        async with repository.transaction():
+            await repository.patch(1, name="João Updated")
+            await repository.get_by_id(1)
+            assert cache.get("user:1") is not None
+
+        assert cache.get("user:1") is None
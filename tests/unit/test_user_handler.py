@@ -1,30 +1,94 @@
 """ test api handlers """
+import json
 import pytest
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from unittest.mock import AsyncMock, Mock
 
 from app.main import app
-from app.internal.core.domain.user import User
+from datetime import datetime
+from app.internal.core.domain.user import (
+    BulkCreateResult,
+    PageVersion,
+    User,
+    UserBatch,
+    UserSearch,
+    UserVersion,
+)
 from app.internal.core.domain.exceptions import (
     DuplicateEmailError,
+    UserNotFoundError,
     ValidationError,
+    VersionConflictError,
+)
+from app.internal.interfaces.api.dependencies import (
+    get_async_db_session,
+    get_async_user_service,
+    get_db_session,
+    get_job_queue,
+    get_user_service,
 )
-from app.internal.interfaces.api.dependencies import get_user_service
+from app.internal.core.services.user_service import AsyncUserService, UserService
+from app.internal.infrastructure.database.models import Base
+from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.internal.infrastructure.tasks.queue import DatabaseJobQueue, InMemoryJobQueue
+from app.internal.interfaces.api.async_user_handler import router as async_user_router
+
+
+@pytest.fixture
+def db_session():
+    # sessao sem banco: so o commit/rollback do unit_of_work, que liberam os jobs do outbox
+    return Session()
+
+
+@pytest.fixture
+def mock_user_service(db_session):
+    # spec: um metodo que o UserService nao tem falha aqui em vez de passar no Mock
+    service = Mock(spec=UserService)
+    service.unit_of_work.side_effect = db_session.begin
+    return service
 
 
 @pytest.fixture
-def mock_user_service():
-    return Mock()
+def job_queue():
+    return InMemoryJobQueue()
 
 
 @pytest.fixture
-def client(mock_user_service):
+def client(mock_user_service, job_queue, db_session):
     app.dependency_overrides[get_user_service] = lambda: mock_user_service
+    app.dependency_overrides[get_job_queue] = lambda: job_queue
+    app.dependency_overrides[get_db_session] = lambda: db_session
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def mock_async_user_service(db_session):
+    @asynccontextmanager
+    async def unit_of_work():
+        with db_session.begin():
+            yield
+
+    service = AsyncMock(spec=AsyncUserService)
+    service.unit_of_work = Mock(side_effect=unit_of_work)
+    return service
+
+
+@pytest.fixture
+def async_client(mock_async_user_service, job_queue, db_session):
+    async_app = FastAPI()
+    async_app.include_router(async_user_router)
+    async_app.dependency_overrides[get_async_user_service] = lambda: mock_async_user_service
+    async_app.dependency_overrides[get_job_queue] = lambda: job_queue
+    async_app.dependency_overrides[get_async_db_session] = lambda: db_session
+    return TestClient(async_app)
+
+
 class TestUserHandlers:
     def test_create_user_success(self, client, mock_user_service):
         mock_user_service.create.return_value = User(
@@ -40,6 +104,88 @@ class TestUserHandlers:
         assert data["email"] == "joao@example.com"
         mock_user_service.create.assert_called_once()
 
+    def test_create_user_enqueues_welcome_email(self, client, mock_user_service, job_queue):
+        mock_user_service.create.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+
+        client.post("/users/", json={"name": "João Silva", "email": "joao@example.com"})
+
+        [job] = job_queue.jobs.values()
+        assert job.name == "send_welcome_email"
+        assert job.payload == {"email": "joao@example.com", "name": "João Silva"}
+        assert job.status == "pending"
+
+    def test_create_user_writes_job_in_the_user_transaction(self, client, mock_user_service):
+        events = []
+
+        @contextmanager
+        def transaction():
+            events.append("begin")
+            yield
+            events.append("commit")
+
+        def create(user):
+            events.append("create")
+            return User(id=1, name=user.name, email=user.email)
+
+        mock_user_service.unit_of_work.side_effect = transaction
+        mock_user_service.create.side_effect = create
+        queue = Mock()
+        queue.enqueue_in.side_effect = lambda db, name, payload: events.append(name)
+        app.dependency_overrides[get_job_queue] = lambda: queue
+
+        response = client.post("/users/", json={"name": "João Silva", "email": "joao@example.com"})
+
+        assert response.status_code == 201
+        assert events == ["begin", "create", "send_welcome_email", "commit"]
+
+    def test_create_user_fails_without_its_job(self, client, mock_user_service):
+        mock_user_service.create.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+        failing_queue = Mock()
+        failing_queue.enqueue_in.side_effect = RuntimeError("jobs table unavailable")
+        app.dependency_overrides[get_job_queue] = lambda: failing_queue
+
+        # sem o job o usuario tambem nao e commitado: o cliente recebe erro e tenta de novo
+        with pytest.raises(RuntimeError):
+            client.post("/users/", json={"name": "João Silva", "email": "joao@example.com"})
+
+    def test_create_user_idempotency_key_replays_original_response(
+        self, client, mock_user_service, job_queue
+    ):
+        mock_user_service.create.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+        body = {"name": "João Silva", "email": "joao@example.com"}
+        headers = {"Idempotency-Key": "create-joao-1"}
+
+        first = client.post("/users/", json=body, headers=headers)
+        retry = client.post("/users/", json=body, headers=headers)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        mock_user_service.create.assert_called_once()
+        assert len(job_queue.jobs) == 1
+
+    def test_create_user_idempotency_key_with_other_payload(self, client, mock_user_service):
+        mock_user_service.create.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+        headers = {"Idempotency-Key": "create-joao-2"}
+        client.post(
+            "/users/", json={"name": "João Silva", "email": "joao@example.com"}, headers=headers
+        )
+
+        response = client.post(
+            "/users/", json={"name": "Maria Souza", "email": "maria@example.com"}, headers=headers
+        )
+
+        assert response.status_code == 422
+        mock_user_service.create.assert_called_once()
+
     def test_create_user_duplicate_email(self, client, mock_user_service):
         mock_user_service.create.side_effect = DuplicateEmailError(
             "Email 'joao@example.com' already exists"
@@ -65,6 +211,72 @@ class TestUserHandlers:
 
         assert response.status_code == 422
 
+    def test_bulk_create_json_array(self, client, mock_user_service, job_queue):
+        mock_user_service.create_many.return_value = [
+            BulkCreateResult(
+                BulkCreateResult.CREATED,
+                "joao@example.com",
+                user=User(id=1, name="João Silva", email="joao@example.com"),
+            ),
+            BulkCreateResult(
+                BulkCreateResult.DUPLICATE, "maria@example.com", error="Email already exists"
+            ),
+        ]
+
+        response = client.post(
+            "/users/bulk",
+            json=[
+                {"name": "João Silva", "email": "joao@example.com"},
+                {"name": "Jo", "email": "invalid"},
+                {"name": "Maria Santos", "email": "maria@example.com"},
+            ],
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["created"], data["duplicates"], data["invalid"]) == (1, 1, 1)
+        assert [row["status"] for row in data["results"]] == ["created", "invalid", "duplicate"]
+        assert data["results"][0]["id"] == 1
+        assert [u.email for u in mock_user_service.create_many.call_args[0][0]] == [
+            "joao@example.com",
+            "maria@example.com",
+        ]
+        [job] = job_queue.jobs.values()
+        assert job.name == "send_welcome_emails"
+        assert job.payload == {"recipients": [("joao@example.com", "João Silva")]}
+
+    def test_bulk_create_ndjson(self, client, mock_user_service):
+        mock_user_service.create_many.side_effect = lambda users: [
+            BulkCreateResult(
+                BulkCreateResult.CREATED,
+                user.email,
+                user=User(id=i, name=user.name, email=user.email),
+            )
+            for i, user in enumerate(users, start=1)
+        ]
+        body = "\n".join(
+            [
+                json.dumps({"name": "João Silva", "email": "joao@example.com"}),
+                "{not json",
+                json.dumps({"name": "Maria Santos", "email": "maria@example.com"}),
+            ]
+        )
+
+        response = client.post(
+            "/users/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["status"] for row in data["results"]] == ["created", "invalid", "created"]
+        assert "Invalid JSON" in data["results"][1]["error"]
+
+    def test_bulk_create_rejects_non_array(self, client, mock_user_service):
+        response = client.post("/users/bulk", json={"name": "João Silva"})
+
+        assert response.status_code == 400
+        mock_user_service.create_many.assert_not_called()
+
     def test_list_users_success(self, client, mock_user_service):
         mock_user_service.list.return_value = [
             User(id=1, name="João Silva", email="joao@example.com"),
@@ -80,6 +292,50 @@ class TestUserHandlers:
         assert data[1]["name"] == "Maria Santos"
         mock_user_service.list.assert_called_once()
 
+    def test_search_users(self, client, mock_user_service):
+        mock_user_service.search.return_value = [
+            User(id=1, name="Ana Souza", email="ana@example.com"),
+        ]
+
+        response = client.get(
+            "/users/search",
+            params={"name": "an", "name_match": "contains", "created_from": "2024-01-01T00:00:00"},
+        )
+
+        assert response.status_code == 200
+        assert response.json()[0]["name"] == "Ana Souza"
+        criteria = mock_user_service.search.call_args.args[0]
+        assert criteria.name == "an"
+        assert criteria.name_match == UserSearch.CONTAINS
+        assert criteria.created_from.year == 2024
+        assert mock_user_service.search.call_args.kwargs == {"limit": 100, "after": None}
+
+    def test_search_users_next_cursor(self, client, mock_user_service):
+        mock_user_service.search.return_value = [
+            User(id=4, name="Ana", email="ana@example.com"),
+            User(id=9, name="Anabela", email="anabela@example.com"),
+        ]
+
+        response = client.get("/users/search", params={"name": "ana", "limit": 2})
+
+        assert response.headers["X-Next-Cursor"] == "9"
+
+    def test_search_users_invalid_match(self, client, mock_user_service):
+        response = client.get("/users/search", params={"name": "ana", "name_match": "regex"})
+
+        assert response.status_code == 422
+        mock_user_service.search.assert_not_called()
+
+    def test_search_users_validation_error(self, client, mock_user_service):
+        mock_user_service.search.side_effect = ValidationError("created_from must be before")
+
+        response = client.get(
+            "/users/search",
+            params={"created_from": "2024-02-01T00:00:00", "created_to": "2024-01-01T00:00:00"},
+        )
+
+        assert response.status_code == 400
+
     def test_list_users_empty(self, client, mock_user_service):
         mock_user_service.list.return_value = []
 
@@ -89,6 +345,50 @@ class TestUserHandlers:
         data = response.json()
         assert data == []
 
+    def test_list_users_pagination(self, client, mock_user_service):
+        mock_user_service.list.return_value = [
+            User(id=3, name="João Silva", email="joao@example.com"),
+            User(id=7, name="Maria Santos", email="maria@example.com"),
+        ]
+
+        response = client.get("/users/?limit=2&after=2")
+
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert response.headers["X-Next-Cursor"] == "7"
+        mock_user_service.list.assert_called_once_with(limit=2, after=2)
+
+    def test_list_users_last_page_has_no_cursor(self, client, mock_user_service):
+        mock_user_service.list.return_value = [
+            User(id=3, name="João Silva", email="joao@example.com"),
+        ]
+
+        response = client.get("/users/?limit=2")
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_list_users_invalid_limit(self, client):
+        response = client.get("/users/?limit=0")
+
+        assert response.status_code == 422
+
+    def test_list_users_stream(self, client, mock_user_service):
+        mock_user_service.stream.return_value = iter(
+            [
+                User(id=1, name="João Silva", email="joao@example.com"),
+                User(id=2, name="Maria Santos", email="maria@example.com"),
+            ]
+        )
+
+        response = client.get("/users/?stream=true")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [1, 2]
+        mock_user_service.list.assert_not_called()
+
     def test_get_user_by_id_success(self, client, mock_user_service):
         mock_user_service.get_by_id.return_value = User(
             id=1, name="João Silva", email="joao@example.com"
@@ -102,6 +402,28 @@ class TestUserHandlers:
         assert data["name"] == "João Silva"
         mock_user_service.get_by_id.assert_called_once_with(1)
 
+    def test_batch_get_users(self, client, mock_user_service):
+        mock_user_service.get_many.return_value = UserBatch(
+            users=[
+                User(id=3, name="Maria Souza", email="maria@example.com"),
+                User(id=1, name="João Silva", email="joao@example.com"),
+            ],
+            missing=[2],
+        )
+
+        response = client.get("/users/batch?ids=3,2,1")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [user["id"] for user in data["users"]] == [3, 1]
+        assert data["missing"] == [2]
+        mock_user_service.get_many.assert_called_once_with([3, 2, 1])
+
+    def test_batch_get_rejects_invalid_ids(self, client, mock_user_service):
+        assert client.get("/users/batch?ids=1,abc").status_code == 400
+        assert client.get("/users/batch?ids=,").status_code == 400
+        mock_user_service.get_many.assert_not_called()
+
     def test_get_user_by_id_not_found(self, client, mock_user_service):
         mock_user_service.get_by_id.return_value = None
 
@@ -112,10 +434,7 @@ class TestUserHandlers:
         assert "not found" in data["detail"]
 
     def test_update_user_success(self, client, mock_user_service):
-        mock_user_service.get_by_id.return_value = User(
-            id=1, name="João Silva", email="joao@example.com"
-        )
-        mock_user_service.update.return_value = User(
+        mock_user_service.patch.return_value = User(
             id=1, name="João Updated", email="joao.updated@example.com"
         )
 
@@ -127,10 +446,13 @@ class TestUserHandlers:
         data = response.json()
         assert data["name"] == "João Updated"
         assert data["email"] == "joao.updated@example.com"
-        mock_user_service.update.assert_called_once()
+        mock_user_service.patch.assert_called_once_with(
+            1, name="João Updated", email="joao.updated@example.com", expected=None
+        )
+        mock_user_service.get_by_id.assert_not_called()
 
     def test_update_user_not_found(self, client, mock_user_service):
-        mock_user_service.get_by_id.return_value = None
+        mock_user_service.patch.side_effect = UserNotFoundError("User with id 999 not found")
 
         response = client.put(
             "/users/999", json={"name": "João Updated", "email": "joao.updated@example.com"}
@@ -141,10 +463,7 @@ class TestUserHandlers:
         assert "not found" in data["detail"]
 
     def test_update_user_duplicate_email(self, client, mock_user_service):
-        mock_user_service.get_by_id.return_value = User(
-            id=1, name="João Silva", email="joao@example.com"
-        )
-        mock_user_service.update.side_effect = DuplicateEmailError("Email already exists")
+        mock_user_service.patch.side_effect = DuplicateEmailError("Email already exists")
 
         response = client.put("/users/1", json={"name": "João Silva", "email": "maria@example.com"})
 
@@ -153,10 +472,7 @@ class TestUserHandlers:
         assert "already exists" in data["detail"]
 
     def test_update_user_validation_error(self, client, mock_user_service):
-        mock_user_service.get_by_id.return_value = User(
-            id=1, name="João Silva", email="joao@example.com"
-        )
-        mock_user_service.update.side_effect = ValidationError("Invalid email format")
+        mock_user_service.patch.side_effect = ValidationError("Invalid email format")
 
         response = client.put("/users/1", json={"name": "João Silva", "email": "invalid"})
 
@@ -165,10 +481,7 @@ class TestUserHandlers:
         assert "detail" in data
 
     def test_update_user_partial(self, client, mock_user_service):
-        mock_user_service.get_by_id.return_value = User(
-            id=1, name="João Silva", email="joao@example.com"
-        )
-        mock_user_service.update.return_value = User(
+        mock_user_service.patch.return_value = User(
             id=1, name="João Updated", email="joao@example.com"
         )
 
@@ -178,6 +491,9 @@ class TestUserHandlers:
         data = response.json()
         assert data["name"] == "João Updated"
         assert data["email"] == "joao@example.com"
+        mock_user_service.patch.assert_called_once_with(
+            1, name="João Updated", email=None, expected=None
+        )
 
     def test_delete_user_success(self, client, mock_user_service):
         mock_user_service.delete.return_value = True
@@ -195,3 +511,282 @@ class TestUserHandlers:
         assert response.status_code == 404
         data = response.json()
         assert "not found" in data["detail"]
+
+
+class TestUserHandlersWithRepository:
+    """UserService e repositorio de verdade (sqlite): um metodo inexistente nao passa num Mock"""
+
+    @pytest.fixture
+    def sqlite_client(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        db = session_factory()
+        queue = DatabaseJobQueue(session_factory)
+        app.dependency_overrides[get_user_service] = lambda: UserService(UserRepoImpl(db))
+        app.dependency_overrides[get_job_queue] = lambda: queue
+        app.dependency_overrides[get_db_session] = lambda: db
+        yield TestClient(app), queue
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+
+    def test_create_user_commits_user_and_job(self, sqlite_client):
+        client, queue = sqlite_client
+
+        response = client.post("/users/", json={"name": "João Silva", "email": "joao@example.com"})
+
+        assert response.status_code == 201
+        assert client.get(f"/users/{response.json()['id']}").status_code == 200
+        [job] = queue.claim(10)
+        assert (job.name, job.payload) == (
+            "send_welcome_email",
+            {"email": "joao@example.com", "name": "João Silva"},
+        )
+
+    def test_duplicate_email_writes_no_job(self, sqlite_client):
+        client, queue = sqlite_client
+        body = {"name": "João Silva", "email": "joao@example.com"}
+
+        assert client.post("/users/", json=body).status_code == 201
+        assert client.post("/users/", json=body).status_code == 409
+        assert queue.depth() == 1
+
+    def test_bulk_create_commits_users_and_job(self, sqlite_client):
+        client, queue = sqlite_client
+
+        response = client.post(
+            "/users/bulk",
+            json=[
+                {"name": "João Silva", "email": "joao@example.com"},
+                {"name": "Maria Santos", "email": "maria@example.com"},
+            ],
+        )
+
+        assert response.status_code == 200
+        assert [row["status"] for row in response.json()["results"]] == ["created"] * 2
+        [job] = queue.claim(10)
+        assert job.name == "send_welcome_emails"
+        assert len(job.payload["recipients"]) == 2
+
+
+class TestAsyncUserHandlers:
+    def test_create_user_success(self, async_client, mock_async_user_service):
+        mock_async_user_service.create.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+
+        response = async_client.post(
+            "/users/", json={"name": "João Silva", "email": "joao@example.com"}
+        )
+
+        assert response.status_code == 201
+        assert response.json()["id"] == 1
+
+    def test_list_users_pagination(self, async_client, mock_async_user_service):
+        mock_async_user_service.list.return_value = [
+            User(id=3, name="João Silva", email="joao@example.com"),
+        ]
+
+        response = async_client.get("/users/?limit=1")
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == "3"
+        mock_async_user_service.list.assert_awaited_once_with(limit=1, after=None)
+
+    def test_list_users_stream(self, async_client, mock_async_user_service):
+        async def users():
+            yield User(id=1, name="João Silva", email="joao@example.com")
+            yield User(id=2, name="Maria Santos", email="maria@example.com")
+
+        mock_async_user_service.stream = Mock(return_value=users())
+
+        response = async_client.get("/users/?stream=true")
+
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+
+    def test_batch_get_users(self, async_client, mock_async_user_service):
+        mock_async_user_service.get_many.return_value = UserBatch(
+            users=[User(id=1, name="João Silva", email="joao@example.com")], missing=[5]
+        )
+
+        response = async_client.get("/users/batch?ids=5,1")
+
+        assert response.json() == {
+            "users": [{"id": 1, "name": "João Silva", "email": "joao@example.com"}],
+            "missing": [5],
+        }
+        mock_async_user_service.get_many.assert_awaited_once_with([5, 1])
+
+    def test_get_user_by_id_not_found(self, async_client, mock_async_user_service):
+        mock_async_user_service.get_by_id.return_value = None
+
+        response = async_client.get("/users/999")
+
+        assert response.status_code == 404
+
+    def test_update_user_duplicate_email(self, async_client, mock_async_user_service):
+        mock_async_user_service.patch.side_effect = DuplicateEmailError("Email already exists")
+
+        response = async_client.put("/users/1", json={"email": "maria@example.com"})
+
+        assert response.status_code == 409
+
+    def test_delete_user_success(self, async_client, mock_async_user_service):
+        mock_async_user_service.delete.return_value = True
+
+        response = async_client.delete("/users/1")
+
+        assert response.status_code == 204
+        mock_async_user_service.delete.assert_awaited_once_with(1)
+
+
+UPDATED_AT = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+
+class TestConditionalRequests:
+    def test_get_user_sets_validators(self, client, mock_user_service):
+        mock_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT
+        )
+
+        response = client.get("/users/1")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"].startswith('W/"1-')
+        assert response.headers["Last-Modified"] == "Wed, 01 May 2024 12:30:15 GMT"
+        mock_user_service.get_version.assert_not_called()
+
+    def test_get_user_if_none_match_skips_row_load(self, client, mock_user_service):
+        mock_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT
+        )
+        etag = client.get("/users/1").headers["ETag"]
+        mock_user_service.get_by_id.reset_mock()
+        mock_user_service.get_version.return_value = UserVersion(id=1, updated_at=UPDATED_AT)
+
+        response = client.get("/users/1", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+        mock_user_service.get_by_id.assert_not_called()
+
+    def test_get_user_changed_returns_body(self, client, mock_user_service):
+        mock_user_service.get_version.return_value = UserVersion(id=1, updated_at=UPDATED_AT)
+        mock_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT
+        )
+
+        response = client.get("/users/1", headers={"If-None-Match": 'W/"1-0"'})
+
+        assert response.status_code == 200
+        assert response.json()["name"] == "João Silva"
+
+    def test_get_user_if_modified_since(self, client, mock_user_service):
+        mock_user_service.get_version.return_value = UserVersion(id=1, updated_at=UPDATED_AT)
+
+        response = client.get(
+            "/users/1", headers={"If-Modified-Since": "Wed, 01 May 2024 12:30:15 GMT"}
+        )
+
+        assert response.status_code == 304
+        mock_user_service.get_by_id.assert_not_called()
+
+    def test_list_users_if_none_match(self, client, mock_user_service):
+        users = [
+            User(id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT),
+            User(id=2, name="Maria Santos", email="maria@example.com", updated_at=UPDATED_AT),
+        ]
+        mock_user_service.list.return_value = users
+        etag = client.get("/users/", params={"limit": 2}).headers["ETag"]
+        mock_user_service.list.reset_mock()
+        mock_user_service.page_version.return_value = PageVersion.of(users)
+
+        response = client.get("/users/", params={"limit": 2}, headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["X-Next-Cursor"] == "2"
+        mock_user_service.page_version.assert_called_once_with(2, after=None)
+        mock_user_service.list.assert_not_called()
+
+    def test_list_users_if_none_match_any(self, client, mock_user_service):
+        mock_user_service.page_version.return_value = PageVersion.of(
+            [User(id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT)]
+        )
+
+        response = client.get("/users/", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 304
+        mock_user_service.list.assert_not_called()
+
+    def test_list_users_if_none_match_any_on_empty_page(self, client, mock_user_service):
+        mock_user_service.page_version.return_value = PageVersion(count=0)
+        mock_user_service.list.return_value = []
+
+        response = client.get("/users/", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_update_user_if_match(self, client, mock_user_service):
+        mock_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT
+        )
+        etag = client.get("/users/1").headers["ETag"]
+        mock_user_service.patch.return_value = User(
+            id=1, name="João Updated", email="joao@example.com", updated_at=datetime(2024, 6, 1)
+        )
+
+        response = client.put("/users/1", json={"name": "João Updated"}, headers={"If-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        mock_user_service.patch.assert_called_once_with(
+            1, name="João Updated", email=None, expected=UserVersion(id=1, updated_at=UPDATED_AT)
+        )
+
+    def test_update_user_if_match_without_updated_at(self, client, mock_user_service):
+        mock_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com"
+        )
+        etag = client.get("/users/1").headers["ETag"]
+        mock_user_service.patch.return_value = User(
+            id=1, name="João Updated", email="joao@example.com", updated_at=UPDATED_AT
+        )
+
+        response = client.put("/users/1", json={"name": "João Updated"}, headers={"If-Match": etag})
+
+        assert response.status_code == 200
+        mock_user_service.patch.assert_called_once_with(
+            1, name="João Updated", email=None, expected=UserVersion(id=1, updated_at=None)
+        )
+
+    def test_update_user_stale_if_match(self, client, mock_user_service):
+        mock_user_service.patch.side_effect = VersionConflictError("User with id 1 was modified")
+
+        response = client.put(
+            "/users/1", json={"name": "Novo Nome"}, headers={"If-Match": 'W/"1-abc"'}
+        )
+
+        assert response.status_code == 412
+
+    def test_update_user_if_match_other_user(self, client, mock_user_service):
+        response = client.put(
+            "/users/1", json={"name": "Novo Nome"}, headers={"If-Match": 'W/"2-abc"'}
+        )
+
+        assert response.status_code == 412
+        mock_user_service.patch.assert_not_called()
+
+    def test_async_get_user_if_none_match(self, async_client, mock_async_user_service):
+        mock_async_user_service.get_version.return_value = UserVersion(id=1, updated_at=UPDATED_AT)
+        mock_async_user_service.get_by_id.return_value = User(
+            id=1, name="João Silva", email="joao@example.com", updated_at=UPDATED_AT
+        )
+
+        first = async_client.get("/users/1", headers={"If-None-Match": 'W/"1-0"'})
+        response = async_client.get("/users/1", headers={"If-None-Match": first.headers["ETag"]})
+
+        assert first.status_code == 200
+        assert response.status_code == 304
@@ -1,12 +1,26 @@
 """ test repository  """
 import pytest
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import create_engine, event, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
-from app.internal.core.domain.user import User
-from app.internal.core.domain.exceptions import DuplicateEmailError, UserNotFoundError
+from app.internal.core.domain.user import PageVersion, User, UserSearch, UserVersion
+from app.internal.core.domain.exceptions import (
+    DuplicateEmailError,
+    UserNotFoundError,
+    VersionConflictError,
+)
+from app.internal.infrastructure.database import user_repository
 from app.internal.infrastructure.database.models import Base, UserModel
-from app.internal.infrastructure.database.user_repository import UserRepoImpl
+from app.internal.infrastructure.database.user_repository import (
+    UserRepoImpl,
+    get_many_statement,
+    is_duplicate_email,
+    search_statement,
+)
 
 
 @pytest.fixture
@@ -47,6 +61,43 @@ class TestUserRepository:
 
         assert "already exists" in str(exc_info.value)
 
+    def test_create_duplicate_does_not_fail_the_transaction(self, repository, db_session):
+        repository.create(User(name="João Silva", email="joao@example.com"))
+        statements = []
+        event.listen(
+            db_session.get_bind(),
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        rollbacks = []
+        event.listen(db_session.get_bind(), "rollback", lambda conn: rollbacks.append(conn))
+
+        with pytest.raises(DuplicateEmailError):
+            repository.create(User(name="Maria Santos", email="joao@example.com"))
+
+        # ON CONFLICT DO NOTHING: um unico INSERT, sem erro do banco nem rollback
+        assert len(statements) == 1
+        assert "ON CONFLICT DO NOTHING" in statements[0]
+        assert rollbacks == []
+
+    def test_create_many_skips_existing_emails(self, repository):
+        repository.create(User(name="João Silva", email="joao@example.com"))
+
+        created = repository.create_many(
+            [
+                User(name="João Again", email="joao@example.com"),
+                User(name="Maria Santos", email="maria@example.com"),
+                User(name="Ana Souza", email="ana@example.com"),
+            ]
+        )
+
+        assert [u.email for u in created] == ["maria@example.com", "ana@example.com"]
+        assert all(u.id is not None for u in created)
+        assert len(repository.list()) == 3
+
+    def test_create_many_empty(self, repository):
+        assert repository.create_many([]) == []
+
     def test_list_users_empty(self, repository):
         users = repository.list()
 
@@ -65,6 +116,37 @@ class TestUserRepository:
         assert users[0].name == "João Silva"
         assert users[1].name == "Maria Santos"
 
+    def test_list_users_keyset_pagination(self, repository):
+        for i in range(5):
+            repository.create(User(name=f"User {i}", email=f"user{i}@example.com"))
+
+        first_page = repository.list(limit=2)
+        second_page = repository.list(limit=2, after=first_page[-1].id)
+        last_page = repository.list(limit=2, after=second_page[-1].id)
+
+        assert [u.name for u in first_page] == ["User 0", "User 1"]
+        assert [u.name for u in second_page] == ["User 2", "User 3"]
+        assert [u.name for u in last_page] == ["User 4"]
+
+    def test_iter_all_users(self, repository):
+        for i in range(5):
+            repository.create(User(name=f"User {i}", email=f"user{i}@example.com"))
+
+        users = list(repository.iter_all(batch_size=2))
+
+        assert [u.name for u in users] == [f"User {i}" for i in range(5)]
+
+    def test_reads_skip_orm_hydration(self, repository, db_session):
+        created = repository.create(User(name="João Silva", email="joao@example.com"))
+        db_session.expunge_all()
+
+        users = repository.list(limit=10)
+        found = repository.get_by_id(created.id)
+
+        assert users == [found]
+        assert found.updated_at is not None
+        assert len(db_session.identity_map) == 0
+
     def test_get_by_id_success(self, repository):
         user = User(name="João Silva", email="joao@example.com")
         created_user = repository.create(user)
@@ -116,6 +198,80 @@ class TestUserRepository:
 
         assert "already exists" in str(exc_info.value)
 
+    def test_patch_user_partial(self, repository):
+        created_user = repository.create(User(name="João Silva", email="joao@example.com"))
+
+        patched_user = repository.patch(created_user.id, name="João Patched")
+
+        assert patched_user.name == "João Patched"
+        assert patched_user.email == "joao@example.com"
+        assert repository.get_by_id(created_user.id).name == "João Patched"
+
+    def test_patch_user_not_found(self, repository):
+        with pytest.raises(UserNotFoundError):
+            repository.patch(999, name="João Patched")
+
+    def test_patch_user_without_changes(self, repository):
+        created_user = repository.create(User(name="João Silva", email="joao@example.com"))
+
+        assert repository.patch(created_user.id) == created_user
+        with pytest.raises(UserNotFoundError):
+            repository.patch(999)
+
+    def test_patch_is_a_single_statement(self, repository, db_session):
+        created_user = repository.create(User(name="João Silva", email="joao@example.com"))
+        statements = []
+        event.listen(
+            db_session.get_bind(),
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        repository.patch(created_user.id, email="joao.patched@example.com")
+        repository.delete(created_user.id)
+
+        assert len(statements) == 2
+        assert statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
+        # soft delete
+        assert statements[1].startswith("UPDATE") and "deleted_at" in statements[1]
+
+    def test_soft_deleted_user_is_hidden(self, repository, db_session):
+        john = repository.create(User(name="John Doe", email="john@example.com"))
+        jane = repository.create(User(name="Jane Doe", email="jane@example.com"))
+
+        assert repository.delete(john.id) is True
+
+        assert repository.delete(john.id) is False
+        assert repository.get_by_id(john.id) is None
+        assert repository.get_version(john.id) is None
+        assert [user.id for user in repository.list()] == [jane.id]
+        assert repository.get_many([john.id, jane.id]) == [jane]
+        assert repository.page_version(10).count == 1
+        with pytest.raises(UserNotFoundError):
+            repository.patch(john.id, name="John Patched")
+        assert db_session.get(UserModel, john.id).deleted_at is not None
+
+    def test_deleted_user_email_can_be_reused(self, repository):
+        john = repository.create(User(name="John Doe", email="john@example.com"))
+        repository.delete(john.id)
+
+        again = repository.create(User(name="John Again", email="john@example.com"))
+
+        assert again.id != john.id
+        assert repository.get_by_id(again.id).email == "john@example.com"
+        # o email volta a ser unico entre os ativos
+        with pytest.raises(DuplicateEmailError):
+            repository.create(User(name="John Third", email="john@example.com"))
+
+    def test_patch_updates_timestamp(self, repository, db_session):
+        created_user = repository.create(User(name="João Silva", email="joao@example.com"))
+        before = db_session.get(UserModel, created_user.id).updated_at
+
+        repository.patch(created_user.id, name="João Patched")
+        db_session.expire_all()
+
+        assert db_session.get(UserModel, created_user.id).updated_at >= before
+
     def test_delete_user_success(self, repository):
         user = User(name="João Silva", email="joao@example.com")
         created_user = repository.create(user)
@@ -143,3 +299,338 @@ class TestUserRepository:
         assert db_user.email == "joao@example.com"
         assert db_user.created_at is not None
         assert db_user.updated_at is not None
+
+
+@pytest.fixture
+def search_data(db_session):
+    db_session.add_all(
+        [
+            UserModel(name="Ana Souza", email="Ana@Example.com", created_at=datetime(2024, 1, 10)),
+            UserModel(
+                name="Anabela Reis", email="anabela@example.com", created_at=datetime(2024, 2, 5)
+            ),
+            UserModel(
+                name="Bruno Silva", email="bruno@example.com", created_at=datetime(2024, 3, 1)
+            ),
+            UserModel(
+                name="Mariana Costa", email="mariana@example.com", created_at=datetime(2024, 3, 20)
+            ),
+            UserModel(name="100%_real", email="real@example.com", created_at=datetime(2024, 4, 1)),
+        ]
+    )
+    db_session.commit()
+
+
+def _plan(db_session, criteria):
+    stmt = search_statement("sqlite", criteria, limit=10)
+    compiled = stmt.compile(
+        dialect=db_session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+class TestUserRepositoryVersions:
+    def test_get_version(self, repository):
+        created = repository.create(User(name="João Silva", email="joao@example.com"))
+
+        version = repository.get_version(created.id)
+
+        assert version.id == created.id
+        assert version.updated_at == created.updated_at
+        assert repository.get_version(999) is None
+
+    def test_page_version_matches_loaded_page(self, repository):
+        for i in range(5):
+            repository.create(User(name=f"User {i}", email=f"user{i}@example.com"))
+        repository.patch(2, name="Changed")
+
+        for limit, after in ((2, None), (10, 1), (3, 4)):
+            page = repository.list(limit=limit, after=after)
+            assert repository.page_version(limit, after=after) == PageVersion.of(page)
+
+    def test_page_version_empty(self, repository):
+        assert repository.page_version(10) == PageVersion(count=0)
+
+    def test_patch_with_expected_version(self, repository):
+        created = repository.create(User(name="João Silva", email="joao@example.com"))
+        version = repository.get_version(created.id)
+
+        updated = repository.patch(created.id, name="João Updated", expected=version)
+
+        assert updated.name == "João Updated"
+        assert updated.updated_at != version.updated_at
+        with pytest.raises(VersionConflictError):
+            repository.patch(created.id, name="Lost Update", expected=version)
+        assert repository.get_by_id(created.id).name == "João Updated"
+
+    def test_patch_with_expected_version_without_updated_at(self, repository):
+        created = repository.create(User(name="João Silva", email="joao@example.com"))
+        repository.db.execute(update(UserModel).values(updated_at=None))
+        repository.db.commit()
+
+        updated = repository.patch(
+            created.id, name="João Updated", expected=UserVersion(created.id, None)
+        )
+
+        assert updated.name == "João Updated"
+        assert updated.updated_at is not None
+
+    def test_patch_with_expected_version_not_found(self, repository):
+        created = repository.create(User(name="João Silva", email="joao@example.com"))
+        version = repository.get_version(created.id)
+        repository.delete(created.id)
+
+        with pytest.raises(UserNotFoundError):
+            repository.patch(created.id, name="Gone", expected=version)
+
+
+class TestUserRepositorySearch:
+    def test_search_email_is_case_insensitive(self, repository, search_data):
+        result = repository.search(UserSearch(email="ana@EXAMPLE.com"), limit=10)
+
+        assert [user.name for user in result] == ["Ana Souza"]
+
+    def test_search_name_prefix(self, repository, search_data):
+        result = repository.search(UserSearch(name="ANA"), limit=10)
+
+        assert [user.name for user in result] == ["Ana Souza", "Anabela Reis"]
+
+    def test_search_name_contains(self, repository, search_data):
+        result = repository.search(UserSearch(name="ana", name_match=UserSearch.CONTAINS), limit=10)
+
+        assert [user.name for user in result] == ["Ana Souza", "Anabela Reis", "Mariana Costa"]
+
+    def test_search_name_prefix_with_accents(self, repository, search_data):
+        repository.create(User(name="Érica Lima", email="erica@example.com"))
+        repository.create(User(name="ÉRICO Dias", email="erico@example.com"))
+
+        result = repository.search(UserSearch(name="Éri"), limit=10)
+        contains = repository.search(UserSearch(name="É", name_match=UserSearch.CONTAINS), limit=10)
+        # o SQLite so ignora a caixa do ASCII: "Éri" casa "ÉRI", mas nao "éri"
+        assert [user.name for user in result] == ["Érica Lima", "ÉRICO Dias"]
+        assert [user.name for user in contains] == ["Érica Lima", "ÉRICO Dias"]
+
+    def test_search_name_prefix_at_max_code_point(self, repository, search_data):
+        repository.create(User(name="\U0010ffff", email="max@example.com"))
+
+        result = repository.search(UserSearch(name="\U0010ffff"), limit=10)
+
+        assert [user.email for user in result] == ["max@example.com"]
+
+    def test_search_escapes_like_wildcards(self, repository, search_data):
+        result = repository.search(UserSearch(name="%_", name_match=UserSearch.CONTAINS), limit=10)
+
+        assert [user.name for user in result] == ["100%_real"]
+
+    def test_search_created_at_range(self, repository, search_data):
+        criteria = UserSearch(created_from=datetime(2024, 2, 1), created_to=datetime(2024, 3, 20))
+
+        result = repository.search(criteria, limit=10)
+
+        assert [user.name for user in result] == ["Anabela Reis", "Bruno Silva"]
+
+    def test_search_keyset_pagination(self, repository, search_data):
+        first = repository.search(UserSearch(name="a", name_match=UserSearch.CONTAINS), limit=2)
+        second = repository.search(
+            UserSearch(name="a", name_match=UserSearch.CONTAINS), limit=2, after=first[-1].id
+        )
+
+        assert [user.name for user in first + second] == [
+            "Ana Souza",
+            "Anabela Reis",
+            "Bruno Silva",
+            "Mariana Costa",
+        ]
+
+    def test_email_search_uses_lower_email_index(self, db_session):
+        plan = _plan(db_session, UserSearch(email="ana@example.com"))
+
+        assert "USING INDEX ix_users_email_lower" in plan
+
+    def test_name_prefix_search_uses_lower_name_index(self, db_session):
+        plan = _plan(db_session, UserSearch(name="ana"))
+
+        assert "USING INDEX ix_users_name_lower" in plan
+
+    def test_created_at_search_uses_index(self, db_session):
+        # com estatisticas o planner troca o scan por id pelo indice quando o intervalo e estreito
+        db_session.execute(
+            UserModel.__table__.insert(),
+            [
+                {
+                    "name": f"User {i}",
+                    "email": f"user{i}@example.com",
+                    "created_at": datetime(2024, 1, 1) + timedelta(hours=i),
+                }
+                for i in range(2000)
+            ],
+        )
+        db_session.execute(text("ANALYZE"))
+
+        plan = _plan(
+            db_session,
+            UserSearch(created_from=datetime(2024, 2, 1), created_to=datetime(2024, 2, 2)),
+        )
+
+        assert "USING INDEX ix_users_created_at" in plan
+
+    def test_postgres_name_search_matches_index_operators(self):
+        def compiled(criteria):
+            stmt = search_statement("postgresql", criteria, limit=10)
+            return str(
+                stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            )
+
+        prefix = compiled(UserSearch(name="Ana"))
+        contains = compiled(UserSearch(name="Ana", name_match=UserSearch.CONTAINS))
+
+        # ix_users_name_lower (text_pattern_ops) e ix_users_name_trgm (gin_trgm_ops)
+        assert "lower(users.name) LIKE 'ana%%'" in prefix
+        assert "lower(users.name) LIKE '%%ana%%'" in contains
+
+
+class TestUserRepositoryTransaction:
+    def test_transaction_commits_once(self, repository, db_session):
+        commits = []
+        event.listen(db_session.get_bind(), "commit", lambda conn: commits.append(conn))
+
+        with repository.transaction():
+            user = repository.create(User(name="João Silva", email="joao@example.com"))
+            repository.patch(user.id, name="João Updated")
+            repository.create(User(name="Maria Souza", email="maria@example.com"))
+
+        assert len(commits) == 1
+        assert [u.name for u in repository.list()] == ["João Updated", "Maria Souza"]
+
+    def test_transaction_rolls_back_every_write(self, repository):
+        with pytest.raises(UserNotFoundError):
+            with repository.transaction():
+                repository.create(User(name="João Silva", email="joao@example.com"))
+                repository.patch(999, name="Nobody")
+
+        assert repository.list() == []
+
+    def test_nested_transaction_commits_with_the_outer_block(self, repository, db_session):
+        commits = []
+        event.listen(db_session.get_bind(), "commit", lambda conn: commits.append(conn))
+
+        with repository.transaction():
+            with repository.transaction():
+                repository.create(User(name="João Silva", email="joao@example.com"))
+            assert commits == []
+
+        assert len(commits) == 1
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode, constraint_name=None):
+        super().__init__("message text is not parsed")
+        self.pgcode = pgcode
+        self.diag = SimpleNamespace(constraint_name=constraint_name)
+
+
+class TestUserRepositoryWithoutOnConflict:
+    """Dialetos sem ON CONFLICT: INSERT ... RETURNING comum, simulados no sqlite"""
+
+    @pytest.fixture(autouse=True)
+    def plain_insert(self, monkeypatch):
+        monkeypatch.setattr(user_repository, "_UPSERT_INSERTS", {})
+
+    def test_statement_has_no_on_conflict(self):
+        stmt = user_repository.insert_user_statement("mysql", User(name="João", email="j@x.com"))
+
+        assert "ON CONFLICT" not in str(stmt.compile(dialect=postgresql.dialect()))
+
+    def test_create_user(self, repository):
+        created_user = repository.create(User(name="João Silva", email="joao@example.com"))
+
+        assert repository.get_by_id(created_user.id) == created_user
+
+    def test_create_duplicate_email(self, repository):
+        repository.create(User(name="João Silva", email="joao@example.com"))
+
+        with pytest.raises(DuplicateEmailError):
+            repository.create(User(name="Maria Santos", email="joao@example.com"))
+        assert len(repository.list()) == 1
+
+    def test_create_many_skips_existing_emails(self, repository):
+        repository.create(User(name="João Silva", email="joao@example.com"))
+
+        created = repository.create_many(
+            [
+                User(name="João Again", email="joao@example.com"),
+                User(name="Maria Santos", email="maria@example.com"),
+                User(name="Maria Again", email="maria@example.com"),
+            ]
+        )
+
+        assert [user.name for user in created] == ["Maria Santos"]
+
+
+class TestDuplicateEmailDetection:
+    def test_psycopg2_unique_violation_on_email_index(self):
+        error = IntegrityError("INSERT", {}, _PgError("23505", "ix_users_email"))
+
+        assert is_duplicate_email(error)
+
+    def test_other_constraints_are_not_duplicate_email(self):
+        assert not is_duplicate_email(IntegrityError("INSERT", {}, _PgError("23505", "users_pkey")))
+        assert not is_duplicate_email(IntegrityError("INSERT", {}, _PgError("23502")))
+
+    def test_asyncpg_constraint_comes_from_the_cause(self):
+        orig = Exception("adapted asyncpg error")
+        orig.pgcode = "23505"
+        orig.__cause__ = Exception("asyncpg UniqueViolationError")
+        orig.__cause__.constraint_name = "ix_users_email"
+
+        assert is_duplicate_email(IntegrityError("INSERT", {}, orig))
+
+    def test_sqlite_unique_violation(self, repository, db_session):
+        repository.create(User(name="João Silva", email="joao@example.com"))
+        db_session.add(UserModel(name="Maria Santos", email="joao@example.com"))
+
+        with pytest.raises(IntegrityError) as exc_info:
+            db_session.flush()
+
+        assert is_duplicate_email(exc_info.value)
+
+
+class TestUserRepositoryGetMany:
+    def test_get_many_skips_missing_ids(self, repository):
+        ids = [
+            repository.create(User(name=f"User {i}", email=f"u{i}@example.com")).id
+            for i in range(3)
+        ]
+
+        users = repository.get_many([ids[2], 999, ids[0], ids[2]])
+
+        assert sorted(user.id for user in users) == [ids[0], ids[2]]
+
+    def test_get_many_queries_in_chunks(self, repository, db_session, monkeypatch):
+        from app.internal.infrastructure.database import user_repository
+
+        ids = [
+            repository.create(User(name=f"User {i}", email=f"u{i}@example.com")).id
+            for i in range(5)
+        ]
+        monkeypatch.setattr(user_repository, "GET_MANY_CHUNK_SIZE", 2)
+        statements = []
+        event.listen(
+            db_session.get_bind(),
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+
+        users = repository.get_many(ids)
+
+        assert len(users) == 5
+        assert len(statements) == 3
+
+    def test_postgres_get_many_binds_one_array(self):
+        stmt = get_many_statement("postgresql")
+        compiled = stmt.compile(dialect=postgresql.dialect())
+
+        # = ANY(%(ids)s): o mesmo SQL (e plano em cache) para qualquer quantidade de ids
+        assert "users.id = ANY (%(ids)s::INTEGER[])" in str(compiled)
+        assert compiled.construct_params({"ids": [3, 1, 2]})["ids"] == [3, 1, 2]
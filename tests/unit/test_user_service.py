@@ -1,8 +1,10 @@
 """unit tests for UserService"""
+import asyncio
 import pytest
-from unittest.mock import Mock
-from app.internal.core.services.user_service import UserService
-from app.internal.core.domain.user import User
+from unittest.mock import AsyncMock, Mock
+from app.internal.core.services.user_service import AsyncUserService, UserService
+from datetime import datetime
+from app.internal.core.domain.user import User, UserSearch
 from app.internal.core.domain.exceptions import ValidationError, DuplicateEmailError
 
 
@@ -40,6 +42,36 @@ class TestUserService:
         with pytest.raises(DuplicateEmailError):
             service.create(user)
 
+    def test_create_many_reports_each_row(self):
+        mock_repo = Mock()
+        mock_repo.create_many.return_value = [
+            User(id=1, name="John Doe", email="john@example.com"),
+        ]
+
+        service = UserService(mock_repo)
+        results = service.create_many(
+            [
+                User(name="John Doe", email="john@example.com"),
+                User(name="", email="nameless@example.com"),
+                User(name="John Again", email="john@example.com"),
+                User(name="Jane Doe", email="jane@example.com"),
+            ]
+        )
+
+        assert [r.status for r in results] == ["created", "invalid", "duplicate", "duplicate"]
+        assert results[0].user.id == 1
+        sent = mock_repo.create_many.call_args[0][0]
+        assert [u.email for u in sent] == ["john@example.com", "jane@example.com"]
+
+    def test_create_many_all_invalid(self):
+        mock_repo = Mock()
+
+        service = UserService(mock_repo)
+        results = service.create_many([User(name="John Doe", email="invalid")])
+
+        assert results[0].status == "invalid"
+        mock_repo.create_many.assert_not_called()
+
     def test_list_users(self):
         mock_repo = Mock()
         mock_repo.list.return_value = [
@@ -54,6 +86,27 @@ class TestUserService:
         assert users[0].name == "John Doe"
         mock_repo.list.assert_called_once()
 
+    def test_list_users_with_cursor(self):
+        mock_repo = Mock()
+        mock_repo.list.return_value = []
+
+        service = UserService(mock_repo)
+        service.list(limit=10, after=5)
+
+        mock_repo.list.assert_called_once_with(limit=10, after=5)
+
+    def test_stream_users(self):
+        mock_repo = Mock()
+        mock_repo.iter_all.return_value = iter(
+            [User(id=1, name="John Doe", email="john@example.com")]
+        )
+
+        service = UserService(mock_repo)
+        users = list(service.stream(batch_size=50))
+
+        assert users[0].id == 1
+        mock_repo.iter_all.assert_called_once_with(batch_size=50)
+
     def test_get_by_id(self):
         mock_repo = Mock()
         mock_repo.get_by_id.return_value = User(id=1, name="John Doe", email="john@example.com")
@@ -76,6 +129,47 @@ class TestUserService:
         assert result.name == "John Updated"
         mock_repo.update.assert_called_once_with(user)
 
+    def test_search_users(self):
+        mock_repo = Mock()
+        mock_repo.search.return_value = [User(id=1, name="Ana", email="ana@example.com")]
+        criteria = UserSearch(name="an")
+
+        service = UserService(mock_repo)
+        result = service.search(criteria, limit=10, after=5)
+
+        assert len(result) == 1
+        mock_repo.search.assert_called_once_with(criteria, limit=10, after=5)
+
+    def test_search_users_invalid_range(self):
+        mock_repo = Mock()
+        service = UserService(mock_repo)
+        criteria = UserSearch(created_from=datetime(2024, 2, 1), created_to=datetime(2024, 1, 1))
+
+        with pytest.raises(ValidationError):
+            service.search(criteria, limit=10)
+
+        mock_repo.search.assert_not_called()
+
+    def test_patch_user(self):
+        mock_repo = Mock()
+        mock_repo.patch.return_value = User(id=1, name="John Updated", email="john@example.com")
+
+        service = UserService(mock_repo)
+        result = service.patch(1, name="John Updated")
+
+        assert result.name == "John Updated"
+        mock_repo.patch.assert_called_once_with(1, name="John Updated", email=None, expected=None)
+        mock_repo.get_by_id.assert_not_called()
+
+    def test_patch_user_validation_error(self):
+        mock_repo = Mock()
+        service = UserService(mock_repo)
+
+        with pytest.raises(ValidationError):
+            service.patch(1, email="invalid")
+
+        mock_repo.patch.assert_not_called()
+
     def test_delete_user(self):
         mock_repo = Mock()
         mock_repo.delete.return_value = True
@@ -85,3 +179,126 @@ class TestUserService:
 
         assert result is True
         mock_repo.delete.assert_called_once_with(1)
+
+    def test_unit_of_work_uses_repository_transaction(self):
+        mock_repo = Mock()
+        service = UserService(mock_repo)
+
+        assert service.unit_of_work() is mock_repo.transaction.return_value
+
+    def test_get_many_keeps_input_order_and_reports_missing(self):
+        mock_repo = Mock()
+        mock_repo.get_many.return_value = [
+            User(id=1, name="John Doe", email="john@example.com"),
+            User(id=3, name="Jane Doe", email="jane@example.com"),
+        ]
+
+        batch = UserService(mock_repo).get_many([3, 2, 1, 3])
+
+        assert [user.id for user in batch.users] == [3, 1]
+        assert batch.missing == [2]
+        mock_repo.get_many.assert_called_once_with([3, 2, 1, 3])
+
+    def test_loader_fetches_pending_ids_in_one_batch(self):
+        mock_repo = Mock()
+        mock_repo.get_many.return_value = [User(id=1, name="John Doe", email="john@example.com")]
+        loader = UserService(mock_repo).loader()
+
+        first = loader.load(1)
+        second = loader.load(2)
+
+        assert first.result().name == "John Doe"
+        assert second.result() is None
+        assert loader.load_many([1, 2]) == [first.result(), None]
+        mock_repo.get_many.assert_called_once_with([1, 2])
+
+
+@pytest.mark.asyncio
+class TestAsyncUserService:
+    async def test_create_user_success(self):
+        mock_repo = AsyncMock()
+        mock_repo.create.return_value = User(id=1, name="John Doe", email="john@example.com")
+
+        service = AsyncUserService(mock_repo)
+        user = User(name="John Doe", email="john@example.com")
+
+        result = await service.create(user)
+
+        assert result.id == 1
+        mock_repo.create.assert_awaited_once_with(user)
+
+    async def test_create_user_validation_error(self):
+        mock_repo = AsyncMock()
+        service = AsyncUserService(mock_repo)
+
+        with pytest.raises(ValidationError):
+            await service.create(User(name="", email="john@example.com"))
+
+        mock_repo.create.assert_not_called()
+
+    async def test_list_users_with_cursor(self):
+        mock_repo = AsyncMock()
+        mock_repo.list.return_value = []
+
+        service = AsyncUserService(mock_repo)
+        await service.list(limit=10, after=5)
+
+        mock_repo.list.assert_awaited_once_with(limit=10, after=5)
+
+    async def test_delete_user(self):
+        mock_repo = AsyncMock()
+        mock_repo.delete.return_value = True
+
+        service = AsyncUserService(mock_repo)
+
+        assert await service.delete(1) is True
+        mock_repo.delete.assert_awaited_once_with(1)
+
+    async def test_loader_batches_loads_in_one_tick(self):
+        mock_repo = AsyncMock()
+        mock_repo.get_many.return_value = [
+            User(id=1, name="John Doe", email="john@example.com"),
+            User(id=2, name="Jane Doe", email="jane@example.com"),
+        ]
+        loader = AsyncUserService(mock_repo).loader()
+
+        async def resolve(user_id):
+            user = await loader.load(user_id)
+            return user.name if user else None
+
+        names = await asyncio.gather(resolve(2), resolve(1), resolve(3), resolve(2))
+
+        assert names == ["Jane Doe", "John Doe", None, "Jane Doe"]
+        mock_repo.get_many.assert_awaited_once_with([2, 1, 3])
+        assert await loader.load(1) is not None
+        assert loader.batches == 1
+
+    async def test_loader_serializes_overlapping_batches(self):
+        in_flight = []
+        release = asyncio.Event()
+
+        async def get_many(user_ids):
+            # a sessao async rejeita duas queries ao mesmo tempo
+            assert not in_flight
+            in_flight.append(user_ids)
+            await release.wait()
+            in_flight.pop()
+            return [
+                User(id=user_id, name=f"User {user_id}", email="u@example.com")
+                for user_id in user_ids
+            ]
+
+        mock_repo = AsyncMock()
+        mock_repo.get_many.side_effect = get_many
+        loader = AsyncUserService(mock_repo).loader()
+
+        first = loader.load(1)
+        await asyncio.sleep(0)  # o primeiro lote comeca a buscar
+        second, third = loader.load(2), loader.load(3)
+        await asyncio.sleep(0)
+        release.set()
+
+        users = await asyncio.gather(first, second, third)
+
+        assert [user.id for user in users] == [1, 2, 3]
+        assert [call.args[0] for call in mock_repo.get_many.await_args_list] == [[1], [2, 3]]